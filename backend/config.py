@@ -8,6 +8,18 @@ class Config:
     # DeepSeek
     DEEPSEEK_API_KEY: str = os.getenv("DEEPSEEK_API_KEY", "")
     DEEPSEEK_BASE_URL: str = os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com/v1")
+    DEEPSEEK_MODEL: str = os.getenv("DEEPSEEK_MODEL", "deepseek-chat")
+
+    # LLM 连接池
+    LLM_MAX_CONNECTIONS: int = int(os.getenv("LLM_MAX_CONNECTIONS", "50"))
+    LLM_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    LLM_KEEPALIVE_EXPIRY: float = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60"))
+    LLM_HTTP2: bool = os.getenv("LLM_HTTP2", "true").lower() == "true"
+
+    # 结构化输出：planner/analyzer/summarizer 以 JSON 模式调用（response_format=json_object），
+    # 输出按 Pydantic 模型校验，失败时发送一次修复请求（只含错误、原输出和 schema）
+    LLM_JSON_MODE: bool = os.getenv("LLM_JSON_MODE", "true").lower() == "true"
+    LLM_REPAIR_MAX_CHARS: int = int(os.getenv("LLM_REPAIR_MAX_CHARS", "4000"))
 
     # Tavily
     TAVILY_API_KEY: str = os.getenv("TAVILY_API_KEY", "")
@@ -17,5 +29,112 @@ class Config:
     DEFAULT_MAX_DETAIL_FETCHES: int = int(os.getenv("DEFAULT_MAX_DETAIL_FETCHES", "5"))
     DEFAULT_MODE: str = os.getenv("DEFAULT_MODE", "balanced")
 
+    # Summarizer 并发设置
+    SUMMARIZER_CONCURRENCY: int = int(os.getenv("SUMMARIZER_CONCURRENCY", "5"))
+    SUMMARIZER_TIMEOUT: float = float(os.getenv("SUMMARIZER_TIMEOUT", "60"))
+
+    # 批量摘要：原文不超过 SUMMARIZER_BATCH_MAX_CHARS 的短内容（如 basic 搜索的摘录）打包进同一个 prompt，
+    # 每批内容的 token 预算和来源数上限；未通过校验的来源单独重新摘要
+    SUMMARIZER_BATCH_ENABLED: bool = os.getenv("SUMMARIZER_BATCH_ENABLED", "true").lower() == "true"
+    SUMMARIZER_BATCH_MAX_CHARS: int = int(os.getenv("SUMMARIZER_BATCH_MAX_CHARS", "1000"))
+    SUMMARIZER_BATCH_TOKEN_BUDGET: int = int(os.getenv("SUMMARIZER_BATCH_TOKEN_BUDGET", "2000"))
+    SUMMARIZER_BATCH_MAX_ITEMS: int = int(os.getenv("SUMMARIZER_BATCH_MAX_ITEMS", "8"))
+
+    # 搜索-摘要流水线：每个查询返回后其结果立即去重并交给摘要 worker，不等全部查询结束（关闭时按节点逐段执行）
+    PIPELINE_ENABLED: bool = os.getenv("PIPELINE_ENABLED", "true").lower() == "true"
+
+    # 近似重复检测（MinHash LSH，估计 Jaccard 相似度超过阈值的结果不再摘要）
+    NEAR_DUP_ENABLED: bool = os.getenv("NEAR_DUP_ENABLED", "true").lower() == "true"
+    NEAR_DUP_THRESHOLD: float = float(os.getenv("NEAR_DUP_THRESHOLD", "0.8"))
+
+    # Analyzer 增量分析（已分析来源只发送滚动摘要，超出 token 预算时压缩）
+    ANALYZER_INCREMENTAL: bool = os.getenv("ANALYZER_INCREMENTAL", "true").lower() == "true"
+    ANALYZER_DIGEST_TOKEN_BUDGET: int = int(os.getenv("ANALYZER_DIGEST_TOKEN_BUDGET", "1500"))
+    # 已有关键发现在 Analyzer prompt 中的 token 预算（超出时只保留最新的发现）
+    ANALYZER_FINDINGS_TOKEN_BUDGET: int = int(os.getenv("ANALYZER_FINDINGS_TOKEN_BUDGET", "500"))
+
+    # Writer 来源上下文的 token 预算
+    WRITER_CONTEXT_TOKEN_BUDGET: int = int(os.getenv("WRITER_CONTEXT_TOKEN_BUDGET", "12000"))
+
+    # Search 并发设置
+    SEARCH_CONCURRENCY: int = int(os.getenv("SEARCH_CONCURRENCY", "5"))
+    SEARCH_TIMEOUT: float = float(os.getenv("SEARCH_TIMEOUT", "30"))
+    SEARCH_MAX_RETRIES: int = int(os.getenv("SEARCH_MAX_RETRIES", "2"))
+    SEARCH_RETRY_BACKOFF: float = float(os.getenv("SEARCH_RETRY_BACKOFF", "0.5"))
+    SEARCH_EXTRACT_BATCH_SIZE: int = int(os.getenv("SEARCH_EXTRACT_BATCH_SIZE", "20"))
+    SEARCH_SESSION_MAX_REQUESTS: int = int(os.getenv("SEARCH_SESSION_MAX_REQUESTS", "60"))
+
+    # 深挖预取：摘要完成后在后台抓取相关度最高的 K 个来源的完整内容（0 关闭），预取结果的保留时间（秒）
+    PREFETCH_TOP_K: int = int(os.getenv("PREFETCH_TOP_K", "3"))
+    PREFETCH_TTL: float = float(os.getenv("PREFETCH_TTL", "300"))
+
+    # 缓存数据库（相对路径以项目根目录为基准，留空则只使用内存缓存）
+    CACHE_DB_PATH: str = os.getenv("CACHE_DB_PATH", "data/cache/cache.sqlite3")
+
+    # 搜索结果缓存
+    SEARCH_CACHE_ENABLED: bool = os.getenv("SEARCH_CACHE_ENABLED", "true").lower() == "true"
+    SEARCH_CACHE_TTL: float = float(os.getenv("SEARCH_CACHE_TTL", "3600"))
+    SEARCH_CACHE_URL_TTL: float = float(os.getenv("SEARCH_CACHE_URL_TTL", "86400"))
+    SEARCH_CACHE_MAX_MEMORY: int = int(os.getenv("SEARCH_CACHE_MAX_MEMORY", "1000"))
+    SEARCH_CACHE_MAX_DISK: int = int(os.getenv("SEARCH_CACHE_MAX_DISK", "50000"))
+    SEARCH_CACHE_URL_MEMORY_BYTES: int = int(os.getenv("SEARCH_CACHE_URL_MEMORY_BYTES", str(16 * 1024 * 1024)))
+
+    # LLM 响应缓存（planner / analyzer / summarizer）
+    LLM_CACHE_ENABLED: bool = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+    LLM_CACHE_TTL: float = float(os.getenv("LLM_CACHE_TTL", "604800"))
+    LLM_CACHE_MAX_MEMORY: int = int(os.getenv("LLM_CACHE_MAX_MEMORY", "2000"))
+    LLM_CACHE_MAX_DISK: int = int(os.getenv("LLM_CACHE_MAX_DISK", "100000"))
+
+    # 研究报告缓存（按规范化主题、mode、迭代/深挖上限缓存完成的报告）
+    # 过期后 REPORT_CACHE_STALE_TTL 秒内仍立即回放旧报告，同时后台重新研究（0 表示过期即重新研究）
+    REPORT_CACHE_ENABLED: bool = os.getenv("REPORT_CACHE_ENABLED", "true").lower() == "true"
+    REPORT_CACHE_TTL: float = float(os.getenv("REPORT_CACHE_TTL", "3600"))
+    REPORT_CACHE_STALE_TTL: float = float(os.getenv("REPORT_CACHE_STALE_TTL", "86400"))
+    REPORT_CACHE_MAX_MEMORY: int = int(os.getenv("REPORT_CACHE_MAX_MEMORY", "200"))
+    REPORT_CACHE_MAX_DISK: int = int(os.getenv("REPORT_CACHE_MAX_DISK", "5000"))
+
+    # SSE 发送：报告分块按时间（毫秒）或大小（字节）窗口合并；待发送事件队列上限（客户端慢时形成背压）
+    SSE_COALESCE_MS: float = float(os.getenv("SSE_COALESCE_MS", "30"))
+    SSE_COALESCE_BYTES: int = int(os.getenv("SSE_COALESCE_BYTES", "256"))
+    SSE_QUEUE_SIZE: int = int(os.getenv("SSE_QUEUE_SIZE", "64"))
+
+    # 会话内容存储：网页原文不进入图状态；单个会话内存上限（字节），超出后溢出到磁盘；是否 zstd 压缩
+    CONTENT_STORE_MEMORY_BYTES: int = int(os.getenv("CONTENT_STORE_MEMORY_BYTES", str(8 * 1024 * 1024)))
+    CONTENT_STORE_DIR: str = os.getenv("CONTENT_STORE_DIR", "data/content")
+    CONTENT_STORE_COMPRESS: bool = os.getenv("CONTENT_STORE_COMPRESS", "true").lower() == "true"
+
+    # 后台研究任务（POST /research）：worker 数即同时进行的研究数上限；排队任务上限；结束任务的事件日志保留时间（秒）；
+    # 单个任务事件日志的字节上限（超出后丢弃最早的事件，0 表示不限）
+    JOB_WORKERS: int = int(os.getenv("JOB_WORKERS", "4"))
+    JOB_QUEUE_SIZE: int = int(os.getenv("JOB_QUEUE_SIZE", "100"))
+    JOB_RETENTION: float = float(os.getenv("JOB_RETENTION", "3600"))
+    JOB_EVENTS_MAX_BYTES: int = int(os.getenv("JOB_EVENTS_MAX_BYTES", str(2 * 1024 * 1024)))
+
+    # 出站调用限速（所有会话共享的令牌桶，0 表示不限）：DeepSeek 每分钟请求数和 token 数、Tavily 每分钟请求数；
+    # 桶容量（可突发的秒数）；LLM 请求预估的输出 token 数（响应后按实际用量结算）；
+    # 收到 429 后重新排队的次数和没有 Retry-After 时的暂停秒数
+    LLM_RATE_LIMIT_RPM: float = float(os.getenv("LLM_RATE_LIMIT_RPM", "300"))
+    LLM_RATE_LIMIT_TPM: float = float(os.getenv("LLM_RATE_LIMIT_TPM", "0"))
+    SEARCH_RATE_LIMIT_RPM: float = float(os.getenv("SEARCH_RATE_LIMIT_RPM", "100"))
+    RATE_LIMIT_BURST_SECONDS: float = float(os.getenv("RATE_LIMIT_BURST_SECONDS", "10"))
+    LLM_RATE_LIMIT_OUTPUT_TOKENS: int = int(os.getenv("LLM_RATE_LIMIT_OUTPUT_TOKENS", "800"))
+    RATE_LIMIT_RETRIES: int = int(os.getenv("RATE_LIMIT_RETRIES", "3"))
+    RATE_LIMIT_BACKOFF: float = float(os.getenv("RATE_LIMIT_BACKOFF", "5"))
+
+    # 研究检查点：每个节点完成后保存状态，中断的研究可按 research_id 恢复（留空路径则不保存）
+    CHECKPOINT_ENABLED: bool = os.getenv("CHECKPOINT_ENABLED", "true").lower() == "true"
+    CHECKPOINT_DB_PATH: str = os.getenv("CHECKPOINT_DB_PATH", "data/checkpoints/checkpoints.sqlite3")
+
+    # 过程产物（搜索结果、摘要记录）落盘：按会话写 gzip JSONL，采样率按会话生效
+    ARTIFACTS_ENABLED: bool = os.getenv("ARTIFACTS_ENABLED", "true").lower() == "true"
+    ARTIFACTS_DIR: str = os.getenv("ARTIFACTS_DIR", "data/artifacts")
+    ARTIFACTS_SAMPLE_RATE: float = float(os.getenv("ARTIFACTS_SAMPLE_RATE", "1.0"))
+    ARTIFACTS_QUEUE_SIZE: int = int(os.getenv("ARTIFACTS_QUEUE_SIZE", "1000"))
+
+    # 启动时在后台线程预热（编译研究图、导入 LLM/搜索客户端）
+    WARMUP_ON_STARTUP: bool = os.getenv("WARMUP_ON_STARTUP", "true").lower() == "true"
+    # jieba 词典缓存路径（相对路径基于项目根目录，可用 python -m backend.startup 预先构建）
+    JIEBA_CACHE_PATH: str = os.getenv("JIEBA_CACHE_PATH", "data/cache/jieba.cache")
+
 
 config = Config()
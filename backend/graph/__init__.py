@@ -1,4 +1,14 @@
+from importlib import import_module
+
 from .state import ResearchState
-from .workflow import create_research_graph
 
 __all__ = ["ResearchState", "create_research_graph"]
+
+
+def __getattr__(name: str):
+    # workflow 依赖 langgraph 和全部节点，首次访问时才导入
+    if name == "create_research_graph":
+        value = import_module(".workflow", __name__).create_research_graph
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
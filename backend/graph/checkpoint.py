@@ -0,0 +1,87 @@
+"""
+研究运行检查点
+
+研究图编译时挂载 SQLite 检查点（langgraph-checkpoint-sqlite，见 backend.graph.checkpoint_saver），
+以研究 ID 作为 thread_id：每个节点完成后保存一次状态，客户端断开或 worker 重启后可以从最后完成的节点继续，
+已经花掉的搜索和 LLM 调用不会重做。
+- 状态中的网页原文只保存引用（content_ref），检查点写入的只是摘要和元数据
+- 每个研究只保留最新的检查点，状态压缩后写入
+- 检查点在图执行的同时异步写入（LangGraph 默认的 durability="async"），不阻塞下一个节点
+- 研究完成后删除该研究的检查点
+"""
+import asyncio
+import os
+from typing import Optional
+
+from backend.config import config
+from backend.utils.cache import resolve_db_path
+
+_checkpointer = None
+_checkpointer_lock: Optional[asyncio.Lock] = None
+_unavailable = False
+
+
+def thread_config(research_id: str) -> dict:
+    """研究 ID 对应的图运行配置"""
+    return {"configurable": {"thread_id": research_id}}
+
+
+def _compressed_serializer(serializer_class):
+    """zstandard 是可选依赖，未安装时检查点不压缩"""
+    try:
+        import zstandard
+    except ImportError:
+        return None
+    return serializer_class(zstandard)
+
+
+async def get_checkpointer():
+    """
+    获取检查点存储（首次使用时创建，绑定当前事件循环）
+
+    Returns:
+        LatestCheckpointSaver；CHECKPOINT_ENABLED 关闭、未配置路径或未安装依赖时返回 None
+    """
+    global _checkpointer, _checkpointer_lock, _unavailable
+    if _checkpointer is not None or _unavailable:
+        return _checkpointer
+
+    db_path = resolve_db_path(config.CHECKPOINT_DB_PATH) if config.CHECKPOINT_ENABLED else None
+    if not db_path:
+        _unavailable = True
+        return None
+
+    if _checkpointer_lock is None:
+        _checkpointer_lock = asyncio.Lock()
+    async with _checkpointer_lock:
+        if _checkpointer is None and not _unavailable:
+            try:
+                import aiosqlite
+                from backend.graph.checkpoint_saver import CompressedSerializer, LatestCheckpointSaver
+            except ImportError:
+                print("CHECKPOINT_ENABLED is set but 'langgraph-checkpoint-sqlite' is not installed, runs are not resumable")
+                _unavailable = True
+                return None
+
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+            conn = await aiosqlite.connect(db_path, timeout=5)
+            saver = LatestCheckpointSaver(conn, serde=_compressed_serializer(CompressedSerializer))
+            await saver.setup()
+            # WAL 下 NORMAL 同步级别已能保证崩溃后数据库一致，检查点写入不必每次 fsync
+            await conn.execute("PRAGMA synchronous=NORMAL")
+            _checkpointer = saver
+    return _checkpointer
+
+
+async def delete_checkpoints(research_id: str):
+    """删除一次研究的全部检查点（研究完成后调用）"""
+    if _checkpointer is not None:
+        await _checkpointer.adelete_thread(research_id)
+
+
+async def close_checkpointer():
+    """应用关闭时关闭检查点数据库连接"""
+    global _checkpointer
+    saver, _checkpointer = _checkpointer, None
+    if saver is not None:
+        await saver.conn.close()
@@ -9,8 +9,13 @@ class RawSearchResult(TypedDict):
     title: str
     url: str
     snippet: str         # Basic 模式的摘要
-    content: Optional[str]  # Advanced 模式的完整内容
+    content: Optional[str]  # Advanced 模式的完整内容（进入状态前移入内容存储）
+    content_ref: str     # 正文在会话内容存储中的引用
+    content_length: int  # 正文长度（字符）
     score: float         # 相关度评分
+    queries: List[str]   # 所有命中此结果的搜索词（跨查询去重后合并）
+    fingerprint: str     # 内容指纹，用于识别重复内容
+    minhash: List[int]   # MinHash 签名（近似重复检测时计算，空列表表示未计算）
 
 
 class ProcessedSource(TypedDict):
@@ -22,7 +27,59 @@ class ProcessedSource(TypedDict):
     summary: str           # LLM 生成的摘要
     key_points: List[str]  # 提取的要点
     relevance: float       # 与主题的相关度 0-1
-    raw_content: str       # 保留原文，供 Advanced 深挖
+    content_ref: str       # 原文在会话内容存储中的引用（原文不进入状态）
+    content_length: int    # 原文长度（字符）
+    queries: List[str]     # 来源出处：所有命中此来源的搜索词
+    fingerprint: str       # 内容指纹
+    minhash: List[int]     # MinHash 签名（内容更换后为空，需要重新计算）
+
+
+def merge_sources(existing: List[ProcessedSource], new: List[ProcessedSource]) -> List[ProcessedSource]:
+    """
+    sources 的 reducer：按来源 ID 合并
+
+    新 ID 追加到末尾；已有 ID 用新字段覆盖旧字段（如深挖后的新摘要），
+    queries 取并集。只包含 id 和 queries 的条目用于合并出处信息。
+    """
+    merged = list(existing)
+    positions = {source["id"]: i for i, source in enumerate(merged)}
+
+    for source in new:
+        idx = positions.get(source["id"])
+        if idx is None:
+            positions[source["id"]] = len(merged)
+            merged.append(source)
+            continue
+
+        current = merged[idx]
+        queries = list(current.get("queries", []))
+        for query in source.get("queries", []):
+            if query not in queries:
+                queries.append(query)
+        merged[idx] = {**current, **source, "queries": queries}
+
+    return merged
+
+
+def merge_findings(existing: List[str], new: List[str]) -> List[str]:
+    """
+    all_findings 的 reducer：去重后追加
+
+    Analyzer 每轮会复述之前的发现，按规范化文本（合并空白、小写）去重，
+    列表只随真正的新发现增长。
+    """
+    merged = list(existing)
+    seen = {_finding_key(finding) for finding in merged}
+    for finding in new:
+        key = _finding_key(finding)
+        if key and key not in seen:
+            seen.add(key)
+            merged.append(finding)
+    return merged
+
+
+def _finding_key(finding: str) -> str:
+    return " ".join(finding.split()).lower()
 
 
 class DetailTarget(TypedDict):
@@ -49,6 +106,14 @@ class AnalysisResult(TypedDict):
     gaps: List[str]              # 信息缺口
 
 
+class DigestEntry(TypedDict):
+    """Analyzer 滚动摘要中的一条（已分析过的来源）"""
+    id: str
+    relevance: float
+    gist: str        # 一行要点（压缩后可能为空）
+    sig: str         # 摘要签名，来源被重新摘要后需要重新送审
+
+
 class ProcessMessage(TypedDict):
     """过程消息（前端展示用）"""
     node: str           # 哪个节点产生的
@@ -61,6 +126,7 @@ class ResearchState(TypedDict):
     """研究状态 - LangGraph 的核心状态定义"""
 
     # === 输入 ===
+    session_id: str                         # 研究会话 ID（隔离来源编号、请求预算等）
     topic: str                              # 用户原始问题
     mode: Literal["depth", "breadth", "balanced"]  # 研究模式
 
@@ -72,13 +138,15 @@ class ResearchState(TypedDict):
     current_queries: List[str]              # 当前轮次的搜索词
     pending_detail_targets: List[DetailTarget]  # 待深挖的目标
     raw_results: List[RawSearchResult]      # Searcher 返回的原始搜索结果
+    near_duplicates: Annotated[List[dict], add]  # 被折叠的近似重复结果 {kept, collapsed, url, similarity}
 
     # === 来源管理 ===
-    sources: Annotated[List[ProcessedSource], add]  # 累积的所有来源
+    sources: Annotated[List[ProcessedSource], merge_sources]  # 累积的所有来源（按 ID 合并）
 
     # === 分析阶段 ===
     analysis: Optional[AnalysisResult]      # 最新的分析结果
-    all_findings: Annotated[List[str], add]  # 累积的关键发现
+    all_findings: Annotated[List[str], merge_findings]  # 累积的关键发现（去重）
+    analysis_digest: List[DigestEntry]      # 已分析来源的滚动摘要（增量分析）
 
     # === 控制变量 ===
     iteration: int                          # 当前迭代次数（仅 new_query 时 +1）
@@ -1,22 +1,28 @@
+import threading
+from typing import Optional
+
 from langgraph.graph import StateGraph, END
 
+from backend.config import config
 from backend.graph.state import ResearchState
 from backend.graph.edges import route_after_analyzer
 from backend.nodes import (
     planner_node,
     searcher_basic_node,
     searcher_advanced_node,
+    deduplicator_node,
     summarizer_node,
+    search_summarize_node,
     analyzer_node,
 )
 
 
-def create_research_graph() -> StateGraph:
+def create_research_graph(pipelined: Optional[bool] = None) -> StateGraph:
     """
     创建研究工作流图（不包含 writer 节点）
 
     工作流结构：
-        Planner → Searcher(Basic) → Summarizer → Analyzer
+        Planner → Searcher(Basic) → Deduplicator → Summarizer → Analyzer
                                                     ↓
                          ┌──────────────────────────┼──────────────────────────┐
                          ↓                          ↓                          ↓
@@ -24,6 +30,8 @@ def create_research_graph() -> StateGraph:
                          ↓                          ↓                          ↓
                         END               Searcher(Advanced)            Searcher(Basic)
                          ↑                          ↓                          ↓
+                         │                          │                    Deduplicator
+                         │                          ↓                          ↓
                          │                     Summarizer                 Summarizer
                          │                          ↓                          ↓
                          │                      Analyzer                   Analyzer
@@ -31,14 +39,25 @@ def create_research_graph() -> StateGraph:
                          └──────────────────────(循环...)──────────────────────┘
     
     注意：Writer 节点由流式 API 单独调用，以实现真正的 LLM 流式输出
+
+    pipelined（默认 PIPELINE_ENABLED）为 True 时，Searcher(Basic) → Deduplicator → Summarizer
+    合并为一个流水线节点 search_summarize（结果到达即去重、摘要），深挖路径不变：
+
+        Planner → Search-Summarize → Analyzer ─ new_query ──→ Search-Summarize
+                                              └ need_detail → Searcher(Advanced) → Summarizer → Analyzer
+
+    所有节点都是 async 函数（LLM 走 ainvoke，搜索走异步 HTTP 客户端），
+    需要通过 astream/ainvoke 执行，多个研究会话可在同一事件循环中并行推进
     """
 
+    if pipelined is None:
+        pipelined = config.PIPELINE_ENABLED
+
     # 创建状态图
     workflow = StateGraph(ResearchState)
 
     # 添加节点（不包含 writer）
     workflow.add_node("planner", planner_node)
-    workflow.add_node("searcher_basic", searcher_basic_node)
     workflow.add_node("searcher_advanced", searcher_advanced_node)
     workflow.add_node("summarizer", summarizer_node)
     workflow.add_node("analyzer", analyzer_node)
@@ -46,9 +65,18 @@ def create_research_graph() -> StateGraph:
     # 设置入口点
     workflow.set_entry_point("planner")
 
-    # 添加边
-    workflow.add_edge("planner", "searcher_basic")
-    workflow.add_edge("searcher_basic", "summarizer")
+    # 添加边（basic_search 为新搜索的入口节点）
+    if pipelined:
+        basic_search = "search_summarize"
+        workflow.add_node(basic_search, search_summarize_node)
+        workflow.add_edge(basic_search, "analyzer")
+    else:
+        basic_search = "searcher_basic"
+        workflow.add_node("searcher_basic", searcher_basic_node)
+        workflow.add_node("deduplicator", deduplicator_node)
+        workflow.add_edge("searcher_basic", "deduplicator")
+        workflow.add_edge("deduplicator", "summarizer")
+    workflow.add_edge("planner", basic_search)
     workflow.add_edge("searcher_advanced", "summarizer")
     workflow.add_edge("summarizer", "analyzer")
 
@@ -63,7 +91,7 @@ def create_research_graph() -> StateGraph:
         "analyzer",
         route_without_writer,
         {
-            "searcher_basic": "searcher_basic",
+            "searcher_basic": basic_search,
             "searcher_advanced": "searcher_advanced",
             END: END,
         }
@@ -72,19 +100,38 @@ def create_research_graph() -> StateGraph:
     return workflow
 
 
-def compile_research_graph():
-    """编译研究工作流图"""
+def compile_research_graph(checkpointer=None):
+    """
+    编译研究工作流图
+
+    Args:
+        checkpointer: 检查点存储（见 backend.graph.checkpoint），为空时不保存检查点
+    """
     workflow = create_research_graph()
-    return workflow.compile()
+    return workflow.compile(checkpointer=checkpointer)
 
 
 # 创建可复用的编译后图实例
 research_graph = None
+_checkpointed_graph = None
+_research_graph_lock = threading.Lock()
 
 
-def get_research_graph():
-    """获取或创建编译后的图实例"""
-    global research_graph
+def get_research_graph(checkpointer=None):
+    """
+    获取或创建编译后的图实例（启动预热线程和请求可能同时调用）
+
+    传入检查点存储时返回挂载该存储的图（复用已编译的图结构，只替换 checkpointer）
+    """
+    global research_graph, _checkpointed_graph
     if research_graph is None:
-        research_graph = compile_research_graph()
-    return research_graph
+        with _research_graph_lock:
+            if research_graph is None:
+                research_graph = compile_research_graph()
+    if checkpointer is None:
+        return research_graph
+
+    graph = _checkpointed_graph
+    if graph is None or graph.checkpointer is not checkpointer:
+        graph = _checkpointed_graph = research_graph.copy({"checkpointer": checkpointer})
+    return graph
@@ -1,5 +1,8 @@
-import json
 import asyncio
+import sys
+import time
+import uuid
+from contextlib import asynccontextmanager
 from datetime import datetime
 from typing import Literal, Optional
 
@@ -9,16 +12,42 @@ from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 
 from backend.config import config
-from backend.graph.workflow import get_research_graph
+from backend.startup import is_ready, record_first_request, start_warmup, startup_stats
+from backend.graph.checkpoint import close_checkpointer, delete_checkpoints, get_checkpointer, thread_config
 from backend.graph.state import ResearchState
-from backend.utils import logger
+from backend.utils import close_llm_clients, get_llm_cache, get_search_cache, logger, structured_output_stats
 from backend.nodes.writer import writer_node_streaming
+from backend.utils.artifacts import close_artifact_sink, get_artifact_sink
+from backend.utils.content_store import release_content_store
+from backend.utils.jobs import QueueFullError, close_job_manager, get_job_manager
+from backend.utils.report_cache import ReportCache, get_report_cache
+from backend.utils.scheduler import get_scheduler
+from backend.utils.sse import SSEEmitter
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """应用生命周期：启动时后台预热并启动研究任务 worker，关闭时停止任务、释放共享的连接池、关闭检查点数据库并写完过程产物"""
+    start_warmup()
+    get_job_manager().start()
+    yield
+    # 停止研究任务和报告缓存的后台刷新（已有检查点，之后可以恢复）
+    await close_job_manager()
+    await close_llm_clients()
+    # 搜索客户端（tavily SDK 导入较慢）在首次搜索时才导入，没有导入过就没有连接需要关闭
+    if "backend.utils.tavily_client" in sys.modules:
+        from backend.utils.tavily_client import close_search_transport
+        await close_search_transport()
+    await close_checkpointer()
+    # 写完队列中剩余的过程产物
+    await asyncio.to_thread(close_artifact_sink)
 
 
 app = FastAPI(
     title="Deep Research Agent API",
     description="AI 深度调研智能体 API",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 # CORS 配置
@@ -37,6 +66,13 @@ class ResearchRequest(BaseModel):
     mode: Literal["depth", "breadth", "balanced"] = "balanced"
     max_iterations: Optional[int] = None
     max_detail_fetches: Optional[int] = None
+    # False 时跳过报告缓存，总是重新研究（完成的报告仍会写入缓存）
+    use_cache: bool = True
+
+
+# 正在执行的研究 ID（同一研究不能同时被两个连接推进）
+_active_research = set()
+_research_stats = {"started": 0, "resumed": 0, "completed": 0}
 
 
 @app.get("/")
@@ -49,6 +85,14 @@ async def root():
     }
 
 
+@app.get("/ready")
+async def ready():
+    """就绪检查：启动预热完成前返回 503"""
+    if not is_ready():
+        raise HTTPException(status_code=503, detail="warming up")
+    return {"status": "ready", **startup_stats()}
+
+
 @app.get("/config")
 async def get_config():
     """获取默认配置"""
@@ -59,207 +103,573 @@ async def get_config():
     }
 
 
+@app.get("/stats")
+async def get_stats():
+    """运行时统计（缓存命中率等）"""
+    from backend.utils.tavily_client import prefetch_stats
+
+    return {
+        "search_cache": get_search_cache().stats(),
+        "llm_cache": get_llm_cache().stats(),
+        "structured_output": structured_output_stats(),
+        "jobs": get_job_manager().stats(),
+        "scheduler": get_scheduler().stats(),
+        "prefetch": prefetch_stats(),
+        "report_cache": get_report_cache().stats(),
+        "artifacts": get_artifact_sink().stats(),
+        "startup": startup_stats(),
+        "research": {**_research_stats, "active": len(_active_research)},
+    }
+
+
+def _sse_response(events) -> StreamingResponse:
+    """把事件流包装成 SSE 响应"""
+    emitter = SSEEmitter(
+        events,
+        max_queue=config.SSE_QUEUE_SIZE,
+        coalesce_delay=config.SSE_COALESCE_MS / 1000,
+        coalesce_bytes=config.SSE_COALESCE_BYTES,
+    )
+
+    return StreamingResponse(
+        emitter.stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
+def _initial_state(research_id: str, request: ResearchRequest) -> ResearchState:
+    """新研究的初始状态"""
+    return {
+        "session_id": research_id,
+        "topic": request.topic,
+        "mode": request.mode,
+        "sub_queries": [],
+        "keywords": [],
+        "current_queries": [],
+        "pending_detail_targets": [],
+        "raw_results": [],
+        "near_duplicates": [],
+        "sources": [],
+        "analysis": None,
+        "analysis_digest": [],
+        "all_findings": [],
+        "iteration": 1,
+        "max_iterations": request.max_iterations or config.DEFAULT_MAX_ITERATIONS,
+        "detail_fetches": 0,
+        "max_detail_fetches": request.max_detail_fetches or config.DEFAULT_MAX_DETAIL_FETCHES,
+        "report": "",
+        "messages": [],
+    }
+
+
+def _report_cache_key(state: ResearchState) -> str:
+    """研究状态对应的报告缓存键（新研究和从检查点恢复的研究一致）"""
+    return ReportCache.key(
+        state.get("topic", ""),
+        state.get("mode", config.DEFAULT_MODE),
+        state.get("max_iterations", config.DEFAULT_MAX_ITERATIONS),
+        state.get("max_detail_fetches", config.DEFAULT_MAX_DETAIL_FETCHES),
+    )
+
+
+async def _research_graph():
+    """
+    获取研究图（不包含 writer，由后续流式调用）
+
+    图依赖 langgraph 和全部节点，首次使用时才导入（通常已由启动预热完成）
+
+    Returns:
+        (图实例, 是否挂载了检查点)
+    """
+    from backend.graph.workflow import get_research_graph
+
+    checkpointer = await get_checkpointer()
+    return get_research_graph(checkpointer), checkpointer is not None
+
+
+async def replay_report(topic: str, mode: str, entry: dict, stale: bool):
+    """用缓存的报告回放一次研究，事件类型与 /research/stream 相同"""
+    yield {
+        "event": "start",
+        "data": {
+            "topic": topic,
+            "mode": mode,
+            "cached": True,
+            "stale": stale,
+            "timestamp": datetime.now().strftime("%H:%M:%S"),
+        },
+    }
+    yield {
+        "event": "node_start",
+        "data": {
+            "node": "writer",
+            "timestamp": datetime.now().strftime("%H:%M:%S"),
+        },
+    }
+    yield {
+        "event": "report_start",
+        "data": {
+            "timestamp": datetime.now().strftime("%H:%M:%S"),
+        },
+    }
+    yield {
+        "event": "report_chunk",
+        "data": {
+            "content": entry["report"],
+        },
+    }
+    yield {
+        "event": "complete",
+        "data": {
+            "sources_count": entry["sources_count"],
+            "iterations": entry["iterations"],
+            "cached": True,
+            "timestamp": datetime.now().strftime("%H:%M:%S"),
+        },
+    }
+    yield {
+        "event": "node_end",
+        "data": {
+            "node": "writer",
+            "timestamp": datetime.now().strftime("%H:%M:%S"),
+        },
+    }
+
+
+async def refresh_report(research_id: str, cache_key: str, request: ResearchRequest):
+    """后台重新研究一个过期的缓存报告（作为研究任务执行），完成后 run_research 会更新缓存"""
+    try:
+        graph, checkpointed = await _research_graph()
+        initial_state = _initial_state(research_id, request)
+        run_config = thread_config(research_id) if checkpointed else None
+        _active_research.add(research_id)
+        _research_stats["started"] += 1
+        async for event in run_research(research_id, graph, initial_state, initial_state, run_config):
+            if event["event"] == "error":
+                logger.log_info("report_cache", f"后台刷新失败: {event['data']['message']}")
+            yield event
+    finally:
+        get_report_cache().end_refresh(cache_key)
+
+
+def _start_refresh(cache_key: str, request: ResearchRequest):
+    """提交过期报告的后台刷新任务（与其他研究共用任务队列和 worker），同一报告同时只有一个刷新"""
+    if not get_report_cache().begin_refresh(cache_key):
+        return
+    research_id = uuid.uuid4().hex
+    try:
+        get_job_manager().submit(
+            research_id,
+            lambda: refresh_report(research_id, cache_key, request),
+            topic=request.topic,
+            mode=request.mode,
+            refresh=True,
+        )
+    except QueueFullError:
+        get_report_cache().end_refresh(cache_key)
+        logger.log_info("report_cache", "任务队列已满，跳过后台刷新")
+
+
+async def run_research(
+    research_id: str,
+    graph,
+    graph_input: Optional[ResearchState],
+    state: ResearchState,
+    run_config: Optional[dict],
+):
+    """
+    执行（或从检查点继续执行）研究图并流式生成报告，产出 SSE 事件
+
+    Args:
+        research_id: 研究 ID（即 session_id，也是检查点的 thread_id）
+        graph: 编译后的研究图
+        graph_input: 图的输入；从检查点继续时为 None
+        state: 当前已知的完整状态（初始状态或检查点中的状态）
+        run_config: 图运行配置（挂载检查点时包含 thread_id）
+    """
+    completed = False
+    try:
+        # 使用 stream 方法获取中间状态
+        current_node = None
+        last_iteration = state.get("iteration", 1)
+        final_state = state
+
+        # 执行工作流直到 analyzer 决定 sufficient
+        # updates 用于推送节点进度，values 是图按 reducer 归并后的完整状态（最后一次即最终状态），
+        # custom 是节点执行过程中推送的进度（如流水线节点每完成一个来源的摘要）
+        async for mode, chunk in graph.astream(
+            graph_input, run_config, stream_mode=["updates", "values", "custom"]
+        ):
+            if mode == "values":
+                final_state = chunk
+                continue
+            if mode == "custom":
+                yield {"event": "progress", "data": chunk}
+                continue
+
+            for node_name, node_output in chunk.items():
+                node_output = node_output or {}
+                # 节点开始
+                if node_name != current_node:
+                    if current_node:
+                        yield {
+                            "event": "node_end",
+                            "data": {
+                                "node": current_node,
+                                "timestamp": datetime.now().strftime("%H:%M:%S"),
+                            },
+                        }
+
+                    current_node = node_name
+                    yield {
+                        "event": "node_start",
+                        "data": {
+                            "node": node_name,
+                            "timestamp": datetime.now().strftime("%H:%M:%S"),
+                        },
+                    }
+
+                # 处理节点输出中的消息
+                messages = node_output.get("messages", [])
+                for msg in messages:
+                    yield {
+                        "event": "node_output",
+                        "data": {
+                            "node": msg.get("node", node_name),
+                            "type": msg.get("type", "info"),
+                            "content": msg.get("content", ""),
+                            "timestamp": msg.get("timestamp", datetime.now().strftime("%H:%M:%S")),
+                        },
+                    }
+
+                # 检查迭代更新
+                new_iteration = node_output.get("iteration")
+                if new_iteration and new_iteration != last_iteration:
+                    last_iteration = new_iteration
+                    yield {
+                        "event": "iteration",
+                        "data": {
+                            "current": new_iteration,
+                            "max": state["max_iterations"],
+                        },
+                    }
+
+        # 最后一个节点结束
+        if current_node:
+            yield {
+                "event": "node_end",
+                "data": {
+                    "node": current_node,
+                    "timestamp": datetime.now().strftime("%H:%M:%S"),
+                },
+            }
+
+        # 工作流完成，现在开始流式生成报告
+        yield {
+            "event": "node_start",
+            "data": {
+                "node": "writer",
+                "timestamp": datetime.now().strftime("%H:%M:%S"),
+            },
+        }
+
+        # 发送报告开始事件
+        yield {
+            "event": "report_start",
+            "data": {
+                "timestamp": datetime.now().strftime("%H:%M:%S"),
+            },
+        }
+
+        # 使用流式 writer 生成报告
+        report_parts = []
+        async for chunk in writer_node_streaming(final_state):
+            report_parts.append(chunk)
+            yield {
+                "event": "report_chunk",
+                "data": {
+                    "content": chunk,
+                },
+            }
+
+        completed = True
+        _research_stats["completed"] += 1
+        get_report_cache().set(
+            _report_cache_key(state),
+            "".join(report_parts),
+            sources_count=len(final_state.get("sources", [])),
+            iterations=last_iteration,
+        )
+
+        # 发送完成事件
+        yield {
+            "event": "complete",
+            "data": {
+                "research_id": research_id,
+                "sources_count": len(final_state.get("sources", [])),
+                "iterations": last_iteration,
+                "timestamp": datetime.now().strftime("%H:%M:%S"),
+            },
+        }
+
+        yield {
+            "event": "node_end",
+            "data": {
+                "node": "writer",
+                "timestamp": datetime.now().strftime("%H:%M:%S"),
+            },
+        }
+
+    except Exception as e:
+        yield {
+            "event": "error",
+            "data": {
+                "message": str(e),
+                "research_id": research_id,
+                "resumable": run_config is not None,
+                "timestamp": datetime.now().strftime("%H:%M:%S"),
+            },
+        }
+
+    finally:
+        _active_research.discard(research_id)
+        from backend.nodes.searcher import release_tavily_client
+        release_tavily_client(research_id)
+        # 未完成且有检查点的研究保留正文，供恢复时读取；完成后删除检查点
+        resumable = run_config is not None and not completed
+        release_content_store(research_id, keep=resumable)
+        if completed and run_config is not None:
+            await delete_checkpoints(research_id)
+
+
+async def cached_events(request: ResearchRequest):
+    """
+    报告缓存命中时返回回放的事件流，未命中（或 use_cache 为 False）时返回 None
+
+    过期的报告同样回放，同时提交后台刷新任务
+    """
+    if not request.use_cache:
+        return None
+    cache_key = ReportCache.key(
+        request.topic,
+        request.mode,
+        request.max_iterations or config.DEFAULT_MAX_ITERATIONS,
+        request.max_detail_fetches or config.DEFAULT_MAX_DETAIL_FETCHES,
+    )
+    cached = await get_report_cache().get(cache_key)
+    if cached is None:
+        return None
+    entry, stale = cached
+    if stale:
+        _start_refresh(cache_key, request)
+    return replay_report(request.topic, request.mode, entry, stale)
+
+
+async def research_events(research_id: str, request: ResearchRequest, received_at: float, check_cache: bool = True):
+    """
+    一次研究的完整事件流（由研究任务执行，事件写入任务的事件日志）
+
+    报告缓存命中时直接回放；check_cache 为 False 时跳过查找（调用方已经查过缓存）
+    """
+    cached = await cached_events(request) if check_cache else None
+    if cached is not None:
+        async for event in cached:
+            yield event
+        return
+
+    initial_state = _initial_state(research_id, request)
+
+    # 终端日志
+    logger.log_start(request.topic, request.mode)
+
+    # 发送开始事件
+    yield {
+        "event": "start",
+        "data": {
+            "research_id": research_id,
+            "topic": request.topic,
+            "mode": request.mode,
+            "timestamp": datetime.now().strftime("%H:%M:%S"),
+        },
+    }
+
+    _active_research.add(research_id)
+    try:
+        # 获取图实例（不包含 writer，由后续流式调用）
+        graph, checkpointed = await _research_graph()
+    except Exception as e:
+        _active_research.discard(research_id)
+        yield {
+            "event": "error",
+            "data": {
+                "message": str(e),
+                "timestamp": datetime.now().strftime("%H:%M:%S"),
+            },
+        }
+        return
+    record_first_request(time.perf_counter() - received_at)
+    _research_stats["started"] += 1
+
+    run_config = thread_config(research_id) if checkpointed else None
+    async for event in run_research(research_id, graph, initial_state, initial_state, run_config):
+        yield event
+
+
 @app.post("/research/stream")
 async def research_stream(request: ResearchRequest):
     """
     研究 API - 使用 SSE 实时推送进度和流式输出报告
 
     返回事件类型：
-    - start: 研究开始
+    - start: 研究开始（包含 research_id，中断后可用于恢复；命中报告缓存时带 cached/stale，直接回放报告）
     - node_start: 节点开始执行
     - node_output: 节点输出
     - node_end: 节点执行完成
     - iteration: 迭代计数更新
     - report_start: 开始生成报告
-    - report_chunk: 报告内容分块（LLM 逐 token 输出）
+    - report_chunk: 报告内容分块（连续 token 按时间/大小窗口合并后发送）
     - complete: 研究完成
     - error: 错误信息
+
+    报告缓存命中时直接回放；否则研究作为任务提交到任务队列（与 POST /research 共用 JOB_WORKERS 个 worker，
+    队列满时返回 503），本连接订阅任务的事件。连接断开不会中止研究，可以用 research_id 通过
+    GET /research/{research_id}/events 重新订阅。
     """
+    cached = await cached_events(request)
+    if cached is not None:
+        return _sse_response(cached)
 
-    async def event_generator():
-        try:
-            # 初始化状态
-            initial_state: ResearchState = {
-                "topic": request.topic,
-                "mode": request.mode,
-                "sub_queries": [],
-                "keywords": [],
-                "current_queries": [],
-                "pending_detail_targets": [],
-                "raw_results": [],
-                "sources": [],
-                "analysis": None,
-                "all_findings": [],
-                "iteration": 1,
-                "max_iterations": request.max_iterations or config.DEFAULT_MAX_ITERATIONS,
-                "detail_fetches": 0,
-                "max_detail_fetches": request.max_detail_fetches or config.DEFAULT_MAX_DETAIL_FETCHES,
-                "report": "",
-                "messages": [],
-            }
+    research_id = uuid.uuid4().hex
+    job = _submit_research(research_id, request, check_cache=False)
+    return _sse_response(job.subscribe())
 
-            # 终端日志
-            logger.log_start(request.topic, request.mode)
 
-            # 发送开始事件
-            yield {
-                "event": "start",
-                "data": json.dumps({
-                    "topic": request.topic,
-                    "mode": request.mode,
-                    "timestamp": datetime.now().strftime("%H:%M:%S"),
-                }),
-            }
+def _submit_research(research_id: str, request: ResearchRequest, check_cache: bool = True):
+    """
+    提交研究任务
 
-            # 获取图实例（不包含 writer，由后续流式调用）
-            graph = get_research_graph()
-
-            # 使用 stream 方法获取中间状态
-            current_node = None
-            last_iteration = 1
-            final_state = initial_state.copy()
-
-            # 执行工作流直到 analyzer 决定 sufficient
-            async for event in graph.astream(initial_state, stream_mode="updates"):
-                for node_name, node_output in event.items():
-                    # 节点开始
-                    if node_name != current_node:
-                        if current_node:
-                            yield {
-                                "event": "node_end",
-                                "data": json.dumps({
-                                    "node": current_node,
-                                    "timestamp": datetime.now().strftime("%H:%M:%S"),
-                                }),
-                            }
-
-                        current_node = node_name
-                        yield {
-                            "event": "node_start",
-                            "data": json.dumps({
-                                "node": node_name,
-                                "timestamp": datetime.now().strftime("%H:%M:%S"),
-                            }),
-                        }
+    Raises:
+        HTTPException: 任务队列已满（503）
+    """
+    try:
+        # 开始执行时才计时，排队时间不计入首个请求延迟
+        return get_job_manager().submit(
+            research_id,
+            lambda: research_events(research_id, request, time.perf_counter(), check_cache=check_cache),
+            topic=request.topic,
+            mode=request.mode,
+        )
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+
+@app.post("/research", status_code=202)
+async def research_submit(request: ResearchRequest):
+    """
+    提交后台研究任务，立即返回 research_id
 
-                    # 更新最终状态
-                    for key, value in node_output.items():
-                        if key in ["sources", "all_findings", "messages"]:
-                            # 累积列表类型
-                            if key not in final_state:
-                                final_state[key] = []
-                            if isinstance(value, list):
-                                final_state[key] = final_state.get(key, []) + value
-                        else:
-                            final_state[key] = value
-
-                    # 处理节点输出中的消息
-                    messages = node_output.get("messages", [])
-                    for msg in messages:
-                        yield {
-                            "event": "node_output",
-                            "data": json.dumps({
-                                "node": msg.get("node", node_name),
-                                "type": msg.get("type", "info"),
-                                "content": msg.get("content", ""),
-                                "timestamp": msg.get("timestamp", datetime.now().strftime("%H:%M:%S")),
-                            }),
-                        }
+    任务在有界队列中等待 worker 执行，与请求连接无关；进度和报告通过 GET /research/{research_id}/events 订阅，
+    事件类型与 /research/stream 相同。队列满时返回 503。
+    """
+    research_id = uuid.uuid4().hex
+    manager = get_job_manager()
+    job = _submit_research(research_id, request)
 
-                    # 检查迭代更新
-                    new_iteration = node_output.get("iteration")
-                    if new_iteration and new_iteration != last_iteration:
-                        last_iteration = new_iteration
-                        yield {
-                            "event": "iteration",
-                            "data": json.dumps({
-                                "current": new_iteration,
-                                "max": initial_state["max_iterations"],
-                            }),
-                        }
+    return {
+        **job.info(),
+        "position": manager.position(job),
+        "events_url": f"/research/{research_id}/events",
+    }
 
-                # 小延迟，避免过快
-                await asyncio.sleep(0.1)
 
-            # 最后一个节点结束
-            if current_node:
-                yield {
-                    "event": "node_end",
-                    "data": json.dumps({
-                        "node": current_node,
-                        "timestamp": datetime.now().strftime("%H:%M:%S"),
-                    }),
-                }
+@app.get("/research/{research_id}")
+async def research_status(research_id: str):
+    """后台研究任务的状态"""
+    manager = get_job_manager()
+    job = manager.get(research_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="research not found")
+    return {**job.info(), "position": manager.position(job)}
 
-            # 工作流完成，现在开始流式生成报告
-            yield {
-                "event": "node_start",
-                "data": json.dumps({
-                    "node": "writer",
-                    "timestamp": datetime.now().strftime("%H:%M:%S"),
-                }),
-            }
-            
-            # 发送报告开始事件
-            yield {
-                "event": "report_start",
-                "data": json.dumps({
-                    "timestamp": datetime.now().strftime("%H:%M:%S"),
-                }),
-            }
-            
-            # 使用流式 writer 生成报告
-            async for chunk in writer_node_streaming(final_state):
-                yield {
-                    "event": "report_chunk",
-                    "data": json.dumps({
-                        "content": chunk,
-                    }),
-                }
-            
-            # 发送完成事件
-            yield {
-                "event": "complete",
-                "data": json.dumps({
-                    "sources_count": len(final_state.get("sources", [])),
-                    "iterations": last_iteration,
-                    "timestamp": datetime.now().strftime("%H:%M:%S"),
-                }),
-            }
-            
-            yield {
-                "event": "node_end",
-                "data": json.dumps({
-                    "node": "writer",
-                    "timestamp": datetime.now().strftime("%H:%M:%S"),
-                }),
-            }
 
-        except Exception as e:
+@app.get("/research/{research_id}/events")
+async def research_events_stream(research_id: str, after: int = 0):
+    """
+    订阅后台研究任务的事件（SSE）
+
+    先回放事件日志中第 after 个之后的事件，再推送新事件直到任务结束；可以有多个订阅者，断开后可以重新连接。
+    第 after 个事件已超出 JOB_EVENTS_MAX_BYTES 被丢弃时，先推送 events_dropped，再从最早保留的事件继续
+    """
+    job = get_job_manager().get(research_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="research not found")
+    return _sse_response(job.subscribe(after))
+
+
+@app.post("/research/{research_id}/resume")
+async def research_resume(research_id: str):
+    """
+    从检查点恢复一次中断的研究（客户端断开或 worker 重启），从最后完成的节点继续并推送剩余事件
+
+    事件类型与 /research/stream 相同，start 事件带 resumed 和 next（将要执行的节点）。
+    恢复的研究同样作为任务提交到任务队列（队列满时返回 503），可以通过 GET /research/{research_id}/events 重新订阅
+    """
+    graph, checkpointed = await _research_graph()
+    if not checkpointed:
+        raise HTTPException(status_code=404, detail="checkpoints are disabled")
+    run_config = thread_config(research_id)
+    snapshot = await graph.aget_state(run_config)
+    if not snapshot.values:
+        raise HTTPException(status_code=404, detail="research not found")
+
+    # 检查和提交之间没有 await，同一研究的并发恢复请求只有一个能提交
+    job = get_job_manager().get(research_id)
+    if research_id in _active_research or (job is not None and not job.done):
+        raise HTTPException(status_code=409, detail="research is still running")
+
+    state: ResearchState = snapshot.values
+
+    async def event_generator():
+        # 在生成器内登记并在 finally 中移除：任务还没开始执行就被取消时，生成器不会运行，也不会留下登记
+        _active_research.add(research_id)
+        try:
+            _research_stats["resumed"] += 1
+            logger.log_start(state.get("topic", ""), state.get("mode", config.DEFAULT_MODE))
+
             yield {
-                "event": "error",
-                "data": json.dumps({
-                    "message": str(e),
+                "event": "start",
+                "data": {
+                    "research_id": research_id,
+                    "topic": state.get("topic", ""),
+                    "mode": state.get("mode", config.DEFAULT_MODE),
+                    "resumed": True,
+                    "next": list(snapshot.next),
                     "timestamp": datetime.now().strftime("%H:%M:%S"),
-                }),
+                },
             }
 
-    async def sse_format():
-        """格式化为 SSE 格式"""
-        async for event in event_generator():
-            event_type = event.get("event", "message")
-            data = event.get("data", "{}")
-            yield f"event: {event_type}\ndata: {data}\n\n"
-
-    return StreamingResponse(
-        sse_format(),
-        media_type="text/event-stream",
-        headers={
-            "Cache-Control": "no-cache",
-            "Connection": "keep-alive",
-            "X-Accel-Buffering": "no",
-        },
-    )
+            # 输入为 None：从检查点继续；图已经走完（只差报告）时直接进入 writer
+            async for event in run_research(research_id, graph, None, state, run_config):
+                yield event
+        finally:
+            _active_research.discard(research_id)
+
+    try:
+        job = get_job_manager().submit(
+            research_id,
+            event_generator,
+            topic=state.get("topic", ""),
+            mode=state.get("mode", config.DEFAULT_MODE),
+            resumed=True,
+        )
+    except QueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return _sse_response(job.subscribe())
 
 
 if __name__ == "__main__":
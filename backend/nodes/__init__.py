@@ -1,14 +1,24 @@
-from .planner import planner_node
-from .searcher import searcher_basic_node, searcher_advanced_node
-from .summarizer import summarizer_node
-from .analyzer import analyzer_node
-from .writer import writer_node_streaming
-
-__all__ = [
-    "planner_node",
-    "searcher_basic_node",
-    "searcher_advanced_node",
-    "summarizer_node",
-    "analyzer_node",
-    "writer_node_streaming",
-]
+from importlib import import_module
+
+# 节点函数 → 所在模块（首次访问时才导入）
+_EXPORTS = {
+    "planner_node": ".planner",
+    "searcher_basic_node": ".searcher",
+    "searcher_advanced_node": ".searcher",
+    "deduplicator_node": ".deduplicator",
+    "summarizer_node": ".summarizer",
+    "search_summarize_node": ".pipeline",
+    "analyzer_node": ".analyzer",
+    "writer_node_streaming": ".writer",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
@@ -1,16 +1,61 @@
-import json
+import hashlib
+import re
 from datetime import datetime
-from typing import List
+from typing import List, Literal, Tuple
 
+from pydantic import BaseModel, Field, field_validator, model_validator
+
+from backend.config import config
 from backend.graph.state import (
     ResearchState,
     ProcessMessage,
     AnalysisResult,
     DetailTarget,
+    DigestEntry,
     ProcessedSource,
 )
 from backend.prompts import get_analyzer_prompt
-from backend.utils import get_llm, logger
+from backend.utils import (
+    StructuredOutputError,
+    ainvoke_structured,
+    estimate_tokens,
+    logger,
+    record_wasted_iteration,
+)
+
+# 摘要要点（gist）的最大长度，压缩时逐级缩短
+GIST_LENGTHS = (60, 30, 0)
+
+
+class DetailTargetOutput(BaseModel):
+    source_id: str
+    reason: str = ""
+
+
+class AnalyzerOutput(BaseModel):
+    decision: Literal["sufficient", "need_detail", "new_query"]
+    reasoning: str = ""
+    current_coverage: float = Field(0.5, ge=0, le=1)
+    key_findings: List[str] = []
+    gaps: List[str] = []
+    detail_targets: List[DetailTargetOutput] = []
+    new_queries: List[str] = []
+    query_type: str = "breadth"
+
+    @field_validator("query_type", mode="before")
+    @classmethod
+    def _default_query_type(cls, value):
+        # 非 new_query 决策时 prompt 允许留空
+        return value if value in ("depth", "breadth") else "breadth"
+
+    @model_validator(mode="after")
+    def _check_decision(self):
+        # 决策缺少对应的目标时下一轮无事可做，交给修复重试补全
+        if self.decision == "need_detail" and not self.detail_targets:
+            raise ValueError("decision 'need_detail' requires non-empty detail_targets")
+        if self.decision == "new_query" and not self.new_queries:
+            raise ValueError("decision 'new_query' requires non-empty new_queries")
+        return self
 
 
 def format_sources_summary(sources: List[ProcessedSource]) -> str:
@@ -31,12 +76,126 @@ def format_sources_summary(sources: List[ProcessedSource]) -> str:
     return '\n'.join(lines)
 
 
-def analyzer_node(state: ResearchState) -> dict:
+def summary_signature(source: ProcessedSource) -> str:
+    """摘要签名：来源被深挖重新摘要后签名会变化，需要重新送审"""
+    return hashlib.sha1(source.get("summary", "").encode("utf-8")).hexdigest()[:8]
+
+
+def make_gist(summary: str, max_length: int) -> str:
+    """取摘要的第一句作为一行要点"""
+    if max_length <= 0 or not summary:
+        return ""
+    first = re.split(r"(?<=[。！？.!?])\s*", summary.strip(), maxsplit=1)[0]
+    return first if len(first) <= max_length else first[:max_length - 1] + "…"
+
+
+def format_digest(digest: List[DigestEntry]) -> str:
+    """格式化已分析来源的滚动摘要（没有 gist 的来源合并为一行）"""
+    lines = []
+    folded = []
+    for entry in digest:
+        if entry["gist"]:
+            lines.append(f"[{entry['id']}] ({entry['relevance']:.2f}) {entry['gist']}")
+        else:
+            folded.append(f"{entry['id']}({entry['relevance']:.2f})")
+    if folded:
+        lines.append(f"其余已分析来源: {', '.join(folded)}")
+    return '\n'.join(lines)
+
+
+def compact_digest(digest: List[DigestEntry], budget: int) -> Tuple[List[DigestEntry], bool]:
+    """
+    滚动摘要超出 token 预算时压缩：按相关度从低到高逐级缩短 gist，直到满足预算
+
+    Returns:
+        (压缩后的摘要, 是否发生了压缩)
+    """
+    if estimate_tokens(format_digest(digest)) <= budget:
+        return digest, False
+
+    compacted = [dict(entry) for entry in digest]
+    by_relevance = sorted(compacted, key=lambda e: e["relevance"])
+    for length in GIST_LENGTHS[1:]:
+        for entry in by_relevance:
+            if len(entry["gist"]) > length:
+                entry["gist"] = make_gist(entry["gist"], length)
+                if estimate_tokens(format_digest(compacted)) <= budget:
+                    return compacted, True
+    return compacted, True
+
+
+def format_findings(findings: List[str], budget: int) -> str:
+    """
+    格式化已有的关键发现，只保留 token 预算内最新的若干条（按原顺序列出）
+
+    all_findings 已由 reducer 去重，但仍随迭代增长；较早的发现折叠为一行计数
+    """
+    if not findings:
+        return "暂无"
+    kept: List[str] = []
+    used = 0
+    for finding in reversed(findings):
+        line = f"- {finding}"
+        cost = estimate_tokens(line)
+        if kept and used + cost > budget:
+            break
+        kept.append(line)
+        used += cost
+    kept.reverse()
+    omitted = len(findings) - len(kept)
+    if omitted:
+        kept.insert(0, f"（另有 {omitted} 条较早的发现已省略）")
+    return '\n'.join(kept)
+
+
+def split_sources_for_analysis(
+    sources: List[ProcessedSource],
+    digest: List[DigestEntry],
+) -> Tuple[List[DigestEntry], List[ProcessedSource]]:
+    """
+    区分已分析的来源和新增（或重新摘要过）的来源
+
+    Returns:
+        (仍然有效的摘要条目, 需要完整送审的来源)
+    """
+    digest_by_id = {entry["id"]: entry for entry in digest}
+    judged: List[DigestEntry] = []
+    fresh: List[ProcessedSource] = []
+    for source in sources:
+        entry = digest_by_id.get(source["id"])
+        if entry is not None and entry["sig"] == summary_signature(source):
+            judged.append(entry)
+        else:
+            fresh.append(source)
+    return judged, fresh
+
+
+def format_incremental_summary(judged: List[DigestEntry], fresh: List[ProcessedSource]) -> str:
+    """增量模式的来源摘要：已分析来源只给一行要点，新增来源给完整信息"""
+    if not judged:
+        return format_sources_summary(fresh)
+
+    parts = [
+        "### 已分析过的来源（摘要）",
+        format_digest(judged),
+        "",
+        "### 本轮新增的来源",
+        format_sources_summary(fresh) if fresh else "本轮没有新增来源",
+    ]
+    return '\n'.join(parts)
+
+
+async def analyzer_node(state: ResearchState) -> dict:
     """
     Analyzer 节点：评估信息充分度，决定下一步行动
 
-    输入：sources, topic, mode, iteration, max_iterations, all_findings
-    输出：analysis, current_queries/pending_detail_targets, all_findings, messages
+    增量模式（ANALYZER_INCREMENTAL）下，已分析过的来源只以滚动摘要（ID、相关度、一行要点）
+    出现在 prompt 中，只有上次分析之后新增的来源给出完整信息，prompt 大小不随迭代线性增长。
+
+    输入：sources, topic, mode, iteration, max_iterations, all_findings, analysis_digest
+    输出：analysis, analysis_digest, current_queries/pending_detail_targets, all_findings, messages
+
+    all_findings 的 reducer 去重合并，prompt 中只列出 ANALYZER_FINDINGS_TOKEN_BUDGET 内最新的发现。
     """
     logger.log_node_start("analyzer")
 
@@ -74,14 +233,18 @@ def analyzer_node(state: ResearchState) -> dict:
                     timestamp=timestamp,
                 )
             ],
-            "all_findings": all_findings,
         }
 
     logger.log_info("analyzer", f"分析 {len(sources)} 个来源 (迭代 {iteration}/{max_iterations})")
 
     # 格式化来源摘要
-    sources_summary = format_sources_summary(sources)
-    findings_str = '\n'.join(f"- {f}" for f in all_findings) if all_findings else "暂无"
+    if config.ANALYZER_INCREMENTAL:
+        judged, fresh = split_sources_for_analysis(sources, state.get("analysis_digest", []))
+        sources_summary = format_incremental_summary(judged, fresh)
+        logger.log_detail("analyzer", "增量", f"{len(fresh)} 个新来源 + {len(judged)} 个已分析来源摘要")
+    else:
+        sources_summary = format_sources_summary(sources)
+    findings_str = format_findings(all_findings, config.ANALYZER_FINDINGS_TOKEN_BUDGET)
 
     # 构建 prompt
     prompt = get_analyzer_prompt(
@@ -93,37 +256,30 @@ def analyzer_node(state: ResearchState) -> dict:
         all_findings=findings_str,
     )
 
-    # 调用 LLM
-    llm = get_llm(temperature=0.3)
-    response = llm.invoke(prompt)
-
-    # 解析响应
+    # 调用 LLM（JSON 模式 + 模型校验，失败时修复一次）
     try:
-        content = response.content
-        start_idx = content.find('{')
-        end_idx = content.rfind('}') + 1
-        if start_idx != -1 and end_idx > start_idx:
-            json_str = content[start_idx:end_idx]
-            parsed = json.loads(json_str)
-        else:
-            raise ValueError("No JSON found")
-
+        parsed = await ainvoke_structured(
+            prompt, AnalyzerOutput, node="analyzer", temperature=0.3, session_id=state.get("session_id")
+        )
         analysis: AnalysisResult = {
-            "decision": parsed.get("decision", "sufficient"),
-            "reasoning": parsed.get("reasoning", ""),
+            "decision": parsed.decision,
+            "reasoning": parsed.reasoning,
             "detail_targets": [
-                DetailTarget(source_id=t["source_id"], reason=t["reason"])
-                for t in parsed.get("detail_targets", [])
+                DetailTarget(source_id=t.source_id, reason=t.reason)
+                for t in parsed.detail_targets
             ],
-            "new_queries": parsed.get("new_queries", []),
-            "query_type": parsed.get("query_type", "breadth"),
-            "current_coverage": parsed.get("current_coverage", 0.5),
-            "key_findings": parsed.get("key_findings", []),
-            "gaps": parsed.get("gaps", []),
+            "new_queries": parsed.new_queries,
+            "query_type": parsed.query_type,
+            "current_coverage": parsed.current_coverage,
+            "key_findings": parsed.key_findings,
+            "gaps": parsed.gaps,
         }
 
-    except Exception as e:
+    except StructuredOutputError as e:
         print(f"Analyzer parse error: {e}")
+        # 兜底的 new_query 轮次不是分析得出的，计入浪费的迭代
+        if iteration < max_iterations:
+            record_wasted_iteration("analyzer")
         # 兜底：如果迭代次数足够，就结束
         analysis: AnalysisResult = {
             "decision": "sufficient" if iteration >= max_iterations else "new_query",
@@ -168,6 +324,22 @@ def analyzer_node(state: ResearchState) -> dict:
         "all_findings": analysis["key_findings"],
     }
 
+    # 本轮送审的来源并入滚动摘要，超出预算时压缩
+    if config.ANALYZER_INCREMENTAL:
+        digest = judged + [
+            DigestEntry(
+                id=source["id"],
+                relevance=source.get("relevance", 0.0),
+                gist=make_gist(source.get("summary", ""), GIST_LENGTHS[0]),
+                sig=summary_signature(source),
+            )
+            for source in fresh
+        ]
+        digest, compacted = compact_digest(digest, config.ANALYZER_DIGEST_TOKEN_BUDGET)
+        if compacted:
+            logger.log_detail("analyzer", "压缩", f"滚动摘要超出 {config.ANALYZER_DIGEST_TOKEN_BUDGET} tokens，已压缩")
+        update["analysis_digest"] = digest
+
     if analysis["decision"] == "new_query":
         update["current_queries"] = analysis["new_queries"]
         messages.append(
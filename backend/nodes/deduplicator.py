@@ -0,0 +1,116 @@
+from datetime import datetime
+from typing import Dict, List
+
+from backend.config import config
+from backend.graph.state import ResearchState, ProcessMessage, RawSearchResult
+from backend.utils import logger
+from backend.utils.content_store import load_content
+from backend.utils.near_duplicate import NearDuplicateIndex
+
+
+class NearDuplicateFilter:
+    """
+    近似重复过滤（deduplicator_node 和流水线节点共用）
+
+    已收录来源先进入 MinHash LSH 索引，本轮结果逐个加入；
+    与已有内容相似度超过阈值的结果被折叠，其搜索词合并到保留的结果或来源上。
+
+    结果的签名写入 result["minhash"] 并随来源保存在状态中，之后的轮次直接用保存的签名建索引，
+    只有新结果（以及深挖后内容已更换、签名被清空的来源）才读取正文计算签名
+    """
+
+    def __init__(self, state: ResearchState):
+        self.session_id = state.get("session_id")
+        self.index = NearDuplicateIndex(threshold=config.NEAR_DUP_THRESHOLD)
+        for source in state.get("sources", []):
+            signature = source.get("minhash")
+            if signature and len(signature) == self.index.num_perm:
+                self.index.insert(source["id"], tuple(signature))
+            else:
+                self.index.add(source["id"], load_content(self.session_id, source))
+        self.kept: Dict[str, RawSearchResult] = {}
+        self.provenance: Dict[str, List[str]] = {}
+        self.collapsed: List[dict] = []
+
+    def add(self, result: RawSearchResult) -> bool:
+        """加入一个结果，返回是否保留（不是近似重复）"""
+        signature = self.index.signature(load_content(self.session_id, result))
+        if signature is None:
+            self.kept[result["id"]] = result
+            return True
+        result["minhash"] = list(signature)
+
+        match = self.index.add_signature(result["id"], signature)
+        if match is None:
+            self.kept[result["id"]] = result
+            return True
+
+        kept_id, similarity = match
+        self.collapsed.append({
+            "kept": kept_id,
+            "collapsed": result["id"],
+            "url": result["url"],
+            "similarity": round(similarity, 3),
+        })
+
+        queries = result.get("queries") or [result["query"]]
+        if kept_id in self.kept:
+            target = self.kept[kept_id].setdefault("queries", [])
+        else:
+            target = self.provenance.setdefault(kept_id, [])
+        for query in queries:
+            if query not in target:
+                target.append(query)
+        return False
+
+    def provenance_updates(self) -> List[dict]:
+        """合并到已有来源的出处条目 {"id", "queries"}"""
+        return [{"id": source_id, "queries": queries} for source_id, queries in self.provenance.items()]
+
+
+def deduplicator_node(state: ResearchState) -> dict:
+    """
+    Deduplicator 节点：在摘要前折叠近似重复的搜索结果
+
+    已收录来源和本轮结果一起建 MinHash LSH 索引，
+    与已有内容相似度超过 NEAR_DUP_THRESHOLD 的结果不再送去摘要，
+    其搜索词合并到保留的来源上，折叠关系记录在 near_duplicates 中。
+
+    纯 CPU 计算，使用同步函数，由 LangGraph 放到线程池执行
+
+    输入：raw_results, sources
+    输出：raw_results, near_duplicates, sources（出处合并）, messages
+    """
+    raw_results: List[RawSearchResult] = state.get("raw_results", [])
+
+    if not config.NEAR_DUP_ENABLED or len(raw_results) == 0:
+        return {}
+
+    logger.log_node_start("deduplicator")
+
+    near = NearDuplicateFilter(state)
+    for result in raw_results:
+        near.add(result)
+    kept, collapsed = near.kept, near.collapsed
+
+    logger.log_info("deduplicator", f"折叠 {len(collapsed)}/{len(raw_results)} 个近似重复结果")
+    for record in collapsed[:3]:
+        logger.log_detail("deduplicator", record["collapsed"], f"→ {record['kept']} ({record['similarity']:.2f})")
+    logger.log_node_end("deduplicator")
+
+    update = {
+        "raw_results": list(kept.values()),
+        "near_duplicates": collapsed,
+        "messages": [
+            ProcessMessage(
+                node="deduplicator",
+                type="dedup",
+                content=f"折叠 {len(collapsed)} 个近似重复结果，剩余 {len(kept)} 个待摘要",
+                timestamp=datetime.now().strftime("%H:%M:%S"),
+            )
+        ],
+    }
+    if near.provenance:
+        update["sources"] = near.provenance_updates()
+
+    return update
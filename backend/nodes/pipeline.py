@@ -0,0 +1,236 @@
+import asyncio
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from langgraph.config import get_stream_writer
+
+from backend.config import config
+from backend.graph.state import ResearchState, ProcessMessage, ProcessedSource, RawSearchResult
+from backend.nodes.deduplicator import NearDuplicateFilter
+from backend.nodes.searcher import get_tavily_client, prefetch_detail_candidates
+from backend.nodes.summarizer import log_processed_source, summarize_results
+from backend.utils import logger
+from backend.utils.artifacts import get_artifact_sink
+from backend.utils.content_store import stash_contents
+from backend.utils.source_index import ResultDeduplicator
+
+NODE = "search_summarize"
+
+
+async def search_summarize_node(state: ResearchState) -> dict:
+    """
+    Search-Summarize 节点：搜索、去重、摘要流水线执行（PIPELINE_ENABLED）
+
+    每个查询返回后，其结果立即经过精确去重和近似重复折叠，放入队列交给摘要 worker
+    （SUMMARIZER_CONCURRENCY 个，每次取出队列中已到达的全部结果批量摘要），不必等最慢的查询返回；
+    每完成一个来源通过自定义流推送一个进度事件。整个阶段结束后只产生一次状态更新。
+
+    一轮的耗时约为 max(单个查询) + 一次摘要，而不是分节点执行时的 全部查询 + 全部摘要。
+
+    执行期间结果使用按查询序号和结果序号生成的临时 ID；全部结果到达后按查询顺序分配正式来源 ID，
+    同样的搜索结果得到同样的来源 ID，与各查询返回的先后无关。
+
+    输入：current_queries, keywords, topic, sources
+    输出：sources, near_duplicates, messages, raw_results, iteration (如果是 new_query 触发则 +1)
+    """
+    logger.log_node_start(NODE)
+
+    queries = state.get("current_queries", [])
+    if not queries:
+        logger.log_info(NODE, "没有搜索词，跳过")
+        logger.log_node_end(NODE)
+        return {
+            "messages": [
+                ProcessMessage(
+                    node="searcher",
+                    type="warning",
+                    content="没有搜索词，跳过搜索",
+                    timestamp=datetime.now().strftime("%H:%M:%S"),
+                )
+            ]
+        }
+
+    logger.log_info(NODE, f"搜索 {len(queries)} 个关键词，结果到达即开始摘要...")
+
+    session_id = state.get("session_id")
+    topic = state["topic"]
+    keywords = state.get("keywords", [])
+    iteration = state.get("iteration", 1)
+    emit = get_stream_writer()
+
+    exact = ResultDeduplicator(state.get("sources", []))
+    near = NearDuplicateFilter(state) if config.NEAR_DUP_ENABLED else None
+
+    queue: "asyncio.Queue[Optional[RawSearchResult]]" = asyncio.Queue()
+    # 进入摘要的结果（按到达顺序）和各自的摘要结果，键为临时 ID
+    queued: List[RawSearchResult] = []
+    outcomes: Dict[str, tuple] = {}
+    # 临时 ID → (查询序号, 结果序号)；通过精确去重的结果（写入搜索记录）
+    positions: Dict[str, Tuple[int, int]] = {}
+    searched: List[RawSearchResult] = []
+    total_results = 0
+    semaphore = asyncio.Semaphore(max(1, config.SUMMARIZER_CONCURRENCY))
+
+    def progress(type_: str, content: str, **fields):
+        emit({
+            "node": NODE,
+            "type": type_,
+            "content": content,
+            "timestamp": datetime.now().strftime("%H:%M:%S"),
+            **fields,
+        })
+
+    async def summarize_worker():
+        while True:
+            result = await queue.get()
+            if result is None:
+                return
+
+            # 队列中已经到达的其他结果一起取出，短内容可以打包进同一个摘要 prompt
+            batch, stop = [result], False
+            while config.SUMMARIZER_BATCH_ENABLED and len(batch) < config.SUMMARIZER_BATCH_MAX_ITEMS and not queue.empty():
+                item = queue.get_nowait()
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+
+            batch_outcomes = await summarize_results(
+                batch, topic, keywords, semaphore, config.SUMMARIZER_TIMEOUT, session_id
+            )
+            for result, outcome in zip(batch, batch_outcomes):
+                if outcome is None:
+                    continue
+                outcomes[result["id"]] = outcome
+                processed, _ = outcome
+                progress(
+                    "summary",
+                    f"[{len(outcomes)}/{len(queued)}] {result['title'][:40]}",
+                    url=result["url"],
+                    relevance=processed["relevance"] if processed else None,
+                    kept=processed is not None,
+                    done=len(outcomes),
+                    queued=len(queued),
+                )
+            if stop:
+                return
+
+    workers = [asyncio.create_task(summarize_worker()) for _ in range(max(1, config.SUMMARIZER_CONCURRENCY))]
+    try:
+        client = get_tavily_client(state)
+        async for index, query, results in client.asearch_basic_iter(queries, max_results=3):
+            total_results += len(results)
+            for rank, result in enumerate(results):
+                positions[result["id"]] = (index, rank)
+            fresh = [result for result in results if exact.add(result)]
+            searched.extend(fresh)
+
+            # 正文移入会话内容存储
+            stash_contents(session_id, fresh)
+            if near is not None:
+                fresh = [result for result in fresh if near.add(result)]
+
+            for result in fresh:
+                queued.append(result)
+                queue.put_nowait(result)
+            progress(
+                "search",
+                f"{query[:40]}：{len(results)} 个结果，{len(fresh)} 个进入摘要",
+                query=query,
+                results=len(results),
+                queued=len(queued),
+            )
+
+        for _ in workers:
+            queue.put_nowait(None)
+        await asyncio.gather(*workers)
+    finally:
+        for worker in workers:
+            worker.cancel()
+
+    # 按查询顺序分配正式来源 ID：一组重复结果取组内最靠前的位置，保留哪一个副本不影响编号
+    links = {**exact.merged, **({entry["collapsed"]: entry["kept"] for entry in near.collapsed} if near else {})}
+    first_position = {result["id"]: positions[result["id"]] for result in queued}
+    for pending_id, position in positions.items():
+        target = pending_id
+        while target in links:
+            target = links[target]
+        if target in first_position and position < first_position[target]:
+            first_position[target] = position
+    ordered = sorted(queued, key=lambda r: first_position[r["id"]])
+    pending_ids = [result["id"] for result in ordered]
+    searched.sort(key=lambda r: positions[r["id"]])
+    renamed = client.assign_source_ids(ordered)
+
+    # 摘要完成后才到达的重复结果会把出处合并到已送审的结果上，这里同步到来源
+    processed_sources: List[ProcessedSource] = []
+    summary_records: List[dict] = []
+    for pending_id, result in zip(pending_ids, ordered):
+        outcome = outcomes.get(pending_id)
+        if outcome is None:
+            continue
+        processed, record = outcome
+        record["id"] = result["id"]
+        summary_records.append(record)
+        if processed is None:
+            continue
+        processed["id"] = result["id"]
+        processed["queries"] = list(result.get("queries") or [result["query"]])
+        processed_sources.append(processed)
+        if record["llm_output"] is not None:
+            log_processed_source(processed, NODE)
+
+    # 被折叠的结果没有正式来源 ID，折叠关系以 url 标识
+    collapsed = [
+        {**entry, "kept": renamed.get(entry["kept"], entry["kept"]), "collapsed": ""}
+        for entry in (near.collapsed if near else [])
+    ]
+
+    # 搜索和摘要记录交给后台写入器落盘
+    get_artifact_sink().submit(session_id, "search", [dict(r) for r in searched], iteration=iteration, mode="basic")
+    get_artifact_sink().submit(session_id, "summary", summary_records, iteration=iteration)
+
+    skipped = exact.skipped + (len(near.collapsed) if near else 0)
+    logger.log_info(NODE, f"获取 {total_results} 个结果，跳过 {skipped} 个重复，{len(processed_sources)} 个有效来源")
+    logger.log_node_end(NODE)
+
+    timestamp = datetime.now().strftime("%H:%M:%S")
+    messages = [
+        ProcessMessage(
+            node="searcher",
+            type="search",
+            content=f"搜索关键词：{', '.join(queries)}",
+            timestamp=timestamp,
+        ),
+        ProcessMessage(
+            node="searcher",
+            type="result",
+            content=f"获取到 {total_results} 个搜索结果"
+                    + (f"，跳过 {skipped} 个重复来源" if skipped else ""),
+            timestamp=timestamp,
+        ),
+        ProcessMessage(
+            node="summarizer",
+            type="complete",
+            content=f"已处理 {len(processed_sources)} 个有效来源",
+            timestamp=timestamp,
+        ),
+    ]
+
+    provenance_updates = exact.provenance_updates() + (near.provenance_updates() if near else [])
+    update = {
+        "sources": provenance_updates + processed_sources,
+        "near_duplicates": collapsed,
+        "raw_results": [],
+        "messages": messages,
+    }
+
+    # Analyzer 触发的 new_query 增加迭代计数
+    analysis = state.get("analysis")
+    if analysis is not None and analysis.get("decision") == "new_query":
+        update["iteration"] = state.get("iteration", 0) + 1
+
+    # 提前预取最可能被深挖的来源，与 Analyzer 同时进行（state 中的迭代次数尚未加上本轮的 +1）
+    prefetch_detail_candidates(state, processed_sources, iteration=update.get("iteration", iteration))
+
+    return update
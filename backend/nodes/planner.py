@@ -1,21 +1,20 @@
-import json
 from datetime import datetime
 from typing import List
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from backend.graph.state import ResearchState, ProcessMessage
 from backend.prompts import PLANNER_PROMPT
-from backend.utils import get_llm, logger
+from backend.utils import StructuredOutputError, ainvoke_structured, logger
 
 
 class PlannerOutput(BaseModel):
-    sub_queries: List[str]
-    keywords: List[str]
-    reasoning: str
+    sub_queries: List[str] = Field(min_length=1)
+    keywords: List[str] = []
+    reasoning: str = ""
 
 
-def planner_node(state: ResearchState) -> dict:
+async def planner_node(state: ResearchState) -> dict:
     """
     Planner 节点：将用户问题拆解为可搜索的子问题
 
@@ -32,28 +31,16 @@ def planner_node(state: ResearchState) -> dict:
     # 构建 prompt
     prompt = PLANNER_PROMPT.format(topic=topic, mode=mode)
 
-    # 调用 LLM
-    llm = get_llm(temperature=0.7)
-    response = llm.invoke(prompt)
-
-    # 解析响应
+    # 调用 LLM（JSON 模式 + 模型校验，失败时修复一次）
     try:
-        # 尝试从响应中提取 JSON
-        content = response.content
-        # 找到 JSON 部分
-        start_idx = content.find('{')
-        end_idx = content.rfind('}') + 1
-        if start_idx != -1 and end_idx > start_idx:
-            json_str = content[start_idx:end_idx]
-            result = json.loads(json_str)
-        else:
-            raise ValueError("No JSON found in response")
-
-        sub_queries = result.get("sub_queries", [])
-        keywords = result.get("keywords", [])
-        reasoning = result.get("reasoning", "")
-
-    except (json.JSONDecodeError, ValueError) as e:
+        result = await ainvoke_structured(
+            prompt, PlannerOutput, node="planner", temperature=0.7, session_id=state.get("session_id")
+        )
+        sub_queries = result.sub_queries
+        keywords = result.keywords
+        reasoning = result.reasoning
+
+    except StructuredOutputError as e:
         # 兜底：使用简单的分割
         print(f"Planner parse error: {e}")
         sub_queries = [
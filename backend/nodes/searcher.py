@@ -1,41 +1,83 @@
-import json
-import os
+import re
 from datetime import datetime
-from typing import List
-
-from backend.graph.state import ResearchState, ProcessMessage, RawSearchResult, DetailTarget
+from typing import Dict, List, Optional
+
+from backend.config import config
+from backend.graph.state import (
+    DetailTarget,
+    ProcessMessage,
+    ProcessedSource,
+    RawSearchResult,
+    ResearchState,
+    merge_sources,
+)
 from backend.utils import TavilyClient, logger
+from backend.utils.artifacts import get_artifact_sink
+from backend.utils.content_store import stash_contents
+from backend.utils.source_index import canonicalize_url, deduplicate_results
+
+
+# 每个研究会话一个 Tavily 客户端（共享底层连接，来源 ID 和请求预算按会话隔离）
+_session_clients: Dict[str, TavilyClient] = {}
+
+
+def get_tavily_client(state: ResearchState) -> TavilyClient:
+    """获取或创建当前会话的 Tavily 客户端"""
+    session_id = state.get("session_id") or "default"
+    client = _session_clients.get(session_id)
+    if client is None:
+        # 会话已有来源时（如恢复运行），从现有最大 ID 继续编号
+        existing = [
+            int(match.group(1))
+            for source in state.get("sources", [])
+            if (match := re.fullmatch(r"src_(\d+)", source["id"]))
+        ]
+        client = TavilyClient(start_index=max(existing, default=0), session_id=session_id)
+        _session_clients[session_id] = client
+    return client
+
+
+def release_tavily_client(session_id: str) -> dict:
+    """会话结束时释放 Tavily 客户端（取消进行中的预取），返回该会话的统计"""
+    client = _session_clients.pop(session_id or "default", None)
+    if client is None:
+        return {}
+    client.discard_prefetched()
+    return client.stats()
+
+
+def prefetch_detail_candidates(
+    state: ResearchState,
+    new_sources: List[ProcessedSource],
+    iteration: Optional[int] = None,
+) -> int:
+    """
+    预取最可能被深挖的来源（相关度最高的 PREFETCH_TOP_K 个），与 Analyzer 的 LLM 调用同时进行
 
-# 搜索结果保存目录
-SEARCH_RESULTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data", "search_results")
-
-
-# 全局 Tavily 客户端实例
-_tavily_client = None
-
-
-def get_tavily_client() -> TavilyClient:
-    """获取或创建 Tavily 客户端"""
-    global _tavily_client
-    if _tavily_client is None:
-        _tavily_client = TavilyClient()
-    return _tavily_client
-
+    Analyzer 选择 need_detail 时 searcher_advanced 直接使用预取的内容；深挖次数已用完，
+    或 Analyzer 因达到最大迭代次数不再决策（不会深挖）时不预取。
 
-def save_search_results(results: List[RawSearchResult], iteration: int, mode: str = "basic"):
-    """保存搜索结果到文件"""
-    os.makedirs(SEARCH_RESULTS_DIR, exist_ok=True)
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"{timestamp}_iter{iteration}_{mode}.json"
-    filepath = os.path.join(SEARCH_RESULTS_DIR, filename)
+    Args:
+        iteration: 本轮结束后 Analyzer 看到的迭代次数，默认取 state 中的值
 
-    with open(filepath, "w", encoding="utf-8") as f:
-        json.dump(results, f, ensure_ascii=False, indent=2)
+    Returns:
+        发起预取的 URL 数
+    """
+    if config.PREFETCH_TOP_K <= 0:
+        return 0
+    if state.get("detail_fetches", 0) >= state.get("max_detail_fetches", 5):
+        return 0
+    if iteration is None:
+        iteration = state.get("iteration", 1)
+    if iteration >= state.get("max_iterations", 3):
+        return 0
 
-    return filepath
+    sources = merge_sources(state.get("sources", []), new_sources)
+    ranked = sorted(sources, key=lambda s: s.get("relevance", 0), reverse=True)
+    return get_tavily_client(state).prefetch([s["url"] for s in ranked], limit=config.PREFETCH_TOP_K)
 
 
-def searcher_basic_node(state: ResearchState) -> dict:
+async def searcher_basic_node(state: ResearchState) -> dict:
     """
     Searcher Basic 节点：执行基础搜索
 
@@ -64,15 +106,25 @@ def searcher_basic_node(state: ResearchState) -> dict:
     for q in queries[:3]:  # 只显示前3个
         logger.log_detail("searcher", "query", q[:50])
 
-    client = get_tavily_client()
-    results: List[RawSearchResult] = client.search_basic(queries, max_results=3)
+    client = get_tavily_client(state)
+    results: List[RawSearchResult] = await client.asearch_basic(queries, max_results=3)
 
     logger.log_info("searcher", f"获取到 {len(results)} 个结果")
 
-    # 保存搜索结果到文件
+    # 跳过已收录的来源（规范化 URL / 内容指纹），只合并出处
+    total_results = len(results)
+    results, provenance_updates, skipped = deduplicate_results(results, state.get("sources", []))
+    if skipped:
+        logger.log_detail("searcher", "去重", f"跳过 {skipped} 个重复来源")
+
+    # 搜索结果交给后台写入器落盘
     iteration = state.get("iteration", 1)
-    filepath = save_search_results(results, iteration, "basic")
-    logger.log_detail("searcher", "saved", os.path.basename(filepath))
+    get_artifact_sink().submit(
+        state.get("session_id"), "search", [dict(r) for r in results], iteration=iteration, mode="basic"
+    )
+
+    # 正文移入会话内容存储，状态中只保留引用
+    stash_contents(state.get("session_id"), results)
 
     # 创建过程消息
     timestamp = datetime.now().strftime("%H:%M:%S")
@@ -86,7 +138,8 @@ def searcher_basic_node(state: ResearchState) -> dict:
         ProcessMessage(
             node="searcher",
             type="result",
-            content=f"获取到 {len(results)} 个搜索结果",
+            content=f"获取到 {total_results} 个搜索结果"
+                    + (f"，跳过 {skipped} 个重复来源" if skipped else ""),
             timestamp=timestamp,
         ),
     ]
@@ -100,6 +153,8 @@ def searcher_basic_node(state: ResearchState) -> dict:
         "raw_results": results,
         "messages": messages,
     }
+    if provenance_updates:
+        update["sources"] = provenance_updates
 
     if should_increment:
         update["iteration"] = state.get("iteration", 0) + 1
@@ -108,7 +163,7 @@ def searcher_basic_node(state: ResearchState) -> dict:
     return update
 
 
-def searcher_advanced_node(state: ResearchState) -> dict:
+async def searcher_advanced_node(state: ResearchState) -> dict:
     """
     Searcher Advanced 节点：深挖特定来源
 
@@ -137,10 +192,12 @@ def searcher_advanced_node(state: ResearchState) -> dict:
     source_map = {s["id"]: s for s in sources}
 
     urls_to_fetch = []
+    target_ids = {}  # 规范化 URL → 被深挖的来源 ID
     for target in targets:
         source = source_map.get(target["source_id"])
         if source:
             urls_to_fetch.append(source["url"])
+            target_ids[canonicalize_url(source["url"])] = source["id"]
 
     if not urls_to_fetch:
         logger.log_info("searcher", "未找到需要深挖的 URL")
@@ -158,15 +215,20 @@ def searcher_advanced_node(state: ResearchState) -> dict:
     logger.log_info("searcher", f"深挖 {len(urls_to_fetch)} 个来源...")
 
     # 执行 Advanced 抓取
-    client = get_tavily_client()
-    results = client.search_advanced(urls_to_fetch, query=state.get("topic", ""))
+    client = get_tavily_client(state)
+    # 深挖结果沿用原来源的 ID，Summarizer 的新摘要会替换原来源而不是新增一条
+    results = await client.asearch_advanced(urls_to_fetch, query=state.get("topic", ""), source_ids=target_ids)
 
     logger.log_info("searcher", f"获取到 {len(results)} 个完整内容")
 
-    # 保存搜索结果到文件
+    # 搜索结果交给后台写入器落盘
     iteration = state.get("iteration", 1)
-    filepath = save_search_results(results, iteration, "advanced")
-    logger.log_detail("searcher", "saved", os.path.basename(filepath))
+    get_artifact_sink().submit(
+        state.get("session_id"), "search", [dict(r) for r in results], iteration=iteration, mode="advanced"
+    )
+
+    # 完整网页移入会话内容存储，状态中只保留引用
+    stash_contents(state.get("session_id"), results)
 
     # 创建过程消息
     timestamp = datetime.now().strftime("%H:%M:%S")
@@ -1,33 +1,360 @@
+import asyncio
 import json
-import os
 from datetime import datetime
-from typing import List
+from typing import Dict, List, Optional, Tuple
 
+from pydantic import BaseModel, Field, ValidationError
+
+from backend.config import config
 from backend.graph.state import ResearchState, ProcessMessage, ProcessedSource, RawSearchResult
-from backend.prompts import SUMMARIZER_PROMPT
-from backend.utils import get_llm, locate_relevant_segments, logger
+from backend.nodes.searcher import prefetch_detail_candidates
+from backend.prompts import SUMMARIZER_BATCH_PROMPT, SUMMARIZER_PROMPT
+from backend.utils import (
+    ainvoke_llm,
+    ainvoke_structured,
+    estimate_tokens,
+    locate_relevant_segments,
+    logger,
+    record_structured,
+)
+from backend.utils.artifacts import get_artifact_sink
+from backend.utils.content_store import get_content_store, load_content
+from backend.utils.scheduler import PRIORITY_BACKGROUND, RateLimitExhaustedError
+
+
+class SummaryOutput(BaseModel):
+    summary: str = Field(min_length=1)
+    key_points: List[str] = []
+    relevance: float = Field(ge=0, le=1)
+
+
+class BatchSummaryEntry(SummaryOutput):
+    source_id: str
+
+
+class _Prepared:
+    """摘要前准备好的单个来源：原文、送给 LLM 的内容和内容引用"""
+
+    __slots__ = ("result", "original_content", "content_to_process", "located_content", "content_ref")
+
+    def __init__(self, result: RawSearchResult, session_id: Optional[str], keywords: List[str]):
+        self.result = result
+        # 确定要处理的内容（从会话内容存储按需读取）
+        self.original_content = load_content(session_id, result)
+        self.content_to_process = self.original_content
+        self.located_content = None
+        self.content_ref = ""
+        if not self.original_content:
+            return
+
+        self.content_ref = result.get("content_ref") or get_content_store(session_id).put(self.original_content)
+
+        # 如果内容较长，使用关键词定位
+        if len(self.content_to_process) > 1000:
+            self.located_content = locate_relevant_segments(
+                self.content_to_process,
+                keywords,
+                context_lines=2,
+                max_segments=5,
+                max_chars=2000,
+            )
+            self.content_to_process = self.located_content
+
+    @property
+    def content(self) -> str:
+        """送给 LLM 的内容（限制长度）"""
+        return self.content_to_process[:2000]
+
+    def record(self, **fields) -> dict:
+        """详细记录（保存到文件）"""
+        result = self.result
+        return {
+            "id": result["id"],
+            "title": result["title"],
+            "url": result["url"],
+            "query": result["query"],
+            "original_content_length": len(self.original_content),
+            "used_keyword_locate": self.located_content is not None,
+            "located_content": self.located_content,
+            **fields,
+        }
+
+    def outcome(self, parsed: SummaryOutput, batch_size: int = 1) -> Tuple[Optional[ProcessedSource], dict]:
+        """由 LLM 输出组装来源；相关度过低时 processed 为 None"""
+        result = self.result
+        processed: ProcessedSource = {
+            "id": result["id"],
+            "title": result["title"],
+            "url": result["url"],
+            "query": result["query"],
+            "summary": parsed.summary,
+            "key_points": parsed.key_points,
+            "relevance": parsed.relevance,
+            "content_ref": self.content_ref,
+            "content_length": len(self.original_content),
+            "queries": result.get("queries", [result["query"]]),
+            "fingerprint": result.get("fingerprint", ""),
+            "minhash": result.get("minhash", []),
+        }
+        record = self.record(
+            llm_output={
+                "summary": processed["summary"],
+                "key_points": processed["key_points"],
+                "relevance": processed["relevance"],
+            },
+            batch_size=batch_size,
+            kept=processed["relevance"] >= 0.3,
+        )
+
+        # 只保留相关度较高的来源
+        if processed["relevance"] >= 0.3:
+            return processed, record
+        return None, record
+
+    def fallback(self, error: str) -> Tuple[ProcessedSource, dict]:
+        """LLM 失败时的兜底：使用原始内容"""
+        result = self.result
+        logger.log_warning("summarizer", f"{result['id']} 摘要失败，使用原文兜底: {error}")
+        processed: ProcessedSource = {
+            "id": result["id"],
+            "title": result["title"],
+            "url": result["url"],
+            "query": result["query"],
+            "summary": self.content_to_process[:200] + "...",
+            "key_points": [],
+            "relevance": 0.5,
+            "content_ref": self.content_ref,
+            "content_length": len(self.original_content),
+            "queries": result.get("queries", [result["query"]]),
+            "fingerprint": result.get("fingerprint", ""),
+            "minhash": result.get("minhash", []),
+        }
+        return processed, self.record(llm_output=None, error=error, kept=True)
+
+
+async def _summarize_one(
+    prepared: _Prepared,
+    topic: str,
+    semaphore: asyncio.Semaphore,
+    timeout: float,
+    session_id: Optional[str],
+) -> Tuple[Optional[ProcessedSource], dict]:
+    result = prepared.result
+    # 构建 prompt（不包含来源 ID 和搜索词，相同主题和内容的 prompt 完全一致，可命中 LLM 缓存）
+    prompt = SUMMARIZER_PROMPT.format(
+        topic=topic,
+        title=result["title"],
+        url=result["url"],
+        content=prepared.content,
+    )
+
+    try:
+        # 信号量限制同时进行的 LLM 请求数，超时只影响当前来源；
+        # 摘要以最低优先级排队，限速时让位于 writer 和 planner/analyzer，排队时间不计入超时
+        async with semaphore:
+            parsed = await ainvoke_structured(
+                prompt,
+                SummaryOutput,
+                node="summarizer",
+                temperature=0.3,
+                session_id=session_id,
+                priority=PRIORITY_BACKGROUND,
+                timeout=timeout,
+            )
+        return prepared.outcome(parsed)
+
+    except RateLimitExhaustedError as e:
+        # 限流重试耗尽已计入调度器统计，兜底记录中标明原因
+        return prepared.fallback(str(e))
+    except Exception as e:
+        return prepared.fallback(str(e) or type(e).__name__)
+
+
+async def summarize_result(
+    result: RawSearchResult,
+    topic: str,
+    keywords: List[str],
+    semaphore: asyncio.Semaphore,
+    timeout: float,
+    session_id: Optional[str] = None,
+) -> Optional[Tuple[Optional[ProcessedSource], dict]]:
+    """
+    对单个搜索结果生成摘要
+
+    Returns:
+        (processed, record)：processed 为 None 表示相关度过低被过滤；
+        内容为空时返回 None
+    """
+    prepared = _Prepared(result, session_id, keywords)
+    if not prepared.original_content:
+        return None
+    return await _summarize_one(prepared, topic, semaphore, timeout, session_id)
+
 
-# 摘要结果保存目录
-SUMMARY_RESULTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data", "summary_results")
+def _batch_items(content: str) -> list:
+    """取出批量输出中的条目列表（JSON 模式下为 {"sources": [...]}，也接受直接输出的数组）"""
+    for open_char, close_char in (('{', '}'), ('[', ']')):
+        start_idx = content.find(open_char)
+        end_idx = content.rfind(close_char) + 1
+        if start_idx == -1 or end_idx <= start_idx:
+            continue
+        try:
+            data = json.loads(content[start_idx:end_idx])
+        except json.JSONDecodeError:
+            continue
+        if isinstance(data, dict):
+            data = data.get("sources")
+        if isinstance(data, list):
+            return data
+    return []
+
+
+def _parse_batch(content: str) -> Dict[str, BatchSummaryEntry]:
+    """解析批量输出，返回 source_id → 通过校验的条目（每项单独校验，一项出错不影响其他项）"""
+    parsed = {}
+    for item in _batch_items(content):
+        try:
+            entry = BatchSummaryEntry.model_validate(item)
+        except ValidationError:
+            continue
+        parsed[entry.source_id] = entry
+    return parsed
 
 
-def save_summary_results(results: List[dict], iteration: int):
-    """保存摘要处理结果到文件"""
-    os.makedirs(SUMMARY_RESULTS_DIR, exist_ok=True)
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"{timestamp}_iter{iteration}_summary.json"
-    filepath = os.path.join(SUMMARY_RESULTS_DIR, filename)
+async def _summarize_batch(
+    batch: List[_Prepared],
+    topic: str,
+    semaphore: asyncio.Semaphore,
+    timeout: float,
+    session_id: Optional[str],
+) -> List[Tuple[Optional[ProcessedSource], dict]]:
+    """一次 LLM 调用摘要多个短来源；缺失或未通过校验的来源单独重新摘要"""
+    if len(batch) == 1:
+        return [await _summarize_one(batch[0], topic, semaphore, timeout, session_id)]
 
-    with open(filepath, "w", encoding="utf-8") as f:
-        json.dump(results, f, ensure_ascii=False, indent=2)
+    ids = [prepared.result["id"] for prepared in batch]
+    sources = "\n\n".join(
+        f"### source_id: {prepared.result['id']}\n标题: {prepared.result['title']}\n"
+        f"URL: {prepared.result['url']}\n内容片段:\n{prepared.content}"
+        for prepared in batch
+    )
+    prompt = SUMMARIZER_BATCH_PROMPT.format(topic=topic, count=len(batch), sources=sources)
+
+    parsed: Dict[str, BatchSummaryEntry] = {}
+    try:
+        async with semaphore:
+            content = await ainvoke_llm(
+                prompt,
+                temperature=0.3,
+                # 只缓存每个来源都通过校验的输出
+                validate=lambda text: all(source_id in _parse_batch(text) for source_id in ids),
+                session_id=session_id,
+                priority=PRIORITY_BACKGROUND,
+                timeout=timeout,
+                json_mode=True,
+            )
+        parsed = _parse_batch(content)
+        # 批量输出按条目统计：未通过校验的条目改为单独摘要（单独摘要另有修复重试）
+        valid = sum(1 for source_id in ids if source_id in parsed)
+        record_structured("summarizer_batch", "valid", valid)
+        record_structured("summarizer_batch", "failed", len(ids) - valid)
+    except Exception as e:
+        logger.log_warning("summarizer", f"批量摘要失败（{len(batch)} 个来源改为单独摘要）: {str(e) or type(e).__name__}")
 
-    return filepath
+    outcomes = {}
+    retry = []
+    for prepared in batch:
+        entry = parsed.get(prepared.result["id"])
+        if entry is None:
+            retry.append(prepared)
+        else:
+            outcomes[prepared.result["id"]] = prepared.outcome(entry, batch_size=len(batch))
 
+    if retry:
+        logger.log_detail("summarizer", "批量", f"{len(retry)}/{len(batch)} 个来源未通过校验，单独重新摘要")
+        redone = await asyncio.gather(*[
+            _summarize_one(prepared, topic, semaphore, timeout, session_id) for prepared in retry
+        ])
+        for prepared, outcome in zip(retry, redone):
+            outcomes[prepared.result["id"]] = outcome
 
-def summarizer_node(state: ResearchState) -> dict:
+    return [outcomes[source_id] for source_id in ids]
+
+
+def _pack_batches(prepared: List[_Prepared]) -> List[List[_Prepared]]:
+    """
+    把短内容打包成批（每批内容不超过 SUMMARIZER_BATCH_TOKEN_BUDGET、不超过 SUMMARIZER_BATCH_MAX_ITEMS 个），
+    长内容和未启用批量时每个来源单独一批
+    """
+    if not config.SUMMARIZER_BATCH_ENABLED or config.SUMMARIZER_BATCH_MAX_ITEMS < 2:
+        return [[item] for item in prepared]
+
+    batches: List[List[_Prepared]] = []
+    current: List[_Prepared] = []
+    current_tokens = 0
+    for item in prepared:
+        # 长内容（如深挖得到的完整网页）单独摘要
+        if len(item.original_content) > config.SUMMARIZER_BATCH_MAX_CHARS:
+            batches.append([item])
+            continue
+        tokens = estimate_tokens(item.content)
+        if current and (
+            current_tokens + tokens > config.SUMMARIZER_BATCH_TOKEN_BUDGET
+            or len(current) >= config.SUMMARIZER_BATCH_MAX_ITEMS
+        ):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(item)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+async def summarize_results(
+    results: List[RawSearchResult],
+    topic: str,
+    keywords: List[str],
+    semaphore: asyncio.Semaphore,
+    timeout: float,
+    session_id: Optional[str] = None,
+) -> List[Optional[Tuple[Optional[ProcessedSource], dict]]]:
+    """
+    对一组搜索结果生成摘要，短内容打包进同一个 prompt（SUMMARIZER_BATCH_ENABLED）
+
+    Returns:
+        与 results 顺序一致的 summarize_result 结果
+    """
+    prepared = [_Prepared(result, session_id, keywords) for result in results]
+    batches = _pack_batches([item for item in prepared if item.original_content])
+
+    done = await asyncio.gather(*[
+        _summarize_batch(batch, topic, semaphore, timeout, session_id) for batch in batches
+    ])
+    outcomes = {
+        item.result["id"]: outcome
+        for batch, batch_outcomes in zip(batches, done)
+        for item, outcome in zip(batch, batch_outcomes)
+    }
+    return [outcomes.get(item.result["id"]) for item in prepared]
+
+
+def log_processed_source(processed: ProcessedSource, node: str = "summarizer"):
+    """终端输出来源的关键要点和相关度"""
+    logger.log_info(node, f"[{processed['id']}] {processed['title'][:40]}...")
+    logger.log_detail(node, "相关度", f"{processed['relevance']:.2f}")
+    for i, point in enumerate(processed["key_points"][:3], 1):
+        point_text = point[:50] + "..." if len(point) > 50 else point
+        logger.log_detail(node, f"要点{i}", point_text)
+
+
+async def summarizer_node(state: ResearchState) -> dict:
     """
     Summarizer 节点：将原始搜索结果处理成结构化摘要
 
+    所有来源并发调用 LLM（受 SUMMARIZER_CONCURRENCY 限制），短内容按 token 预算打包进同一个 prompt，
+    结果按 raw_results 的原始顺序组装。
+
     输入：raw_results, keywords, topic
     输出：sources, messages
     """
@@ -52,7 +379,6 @@ def summarizer_node(state: ResearchState) -> dict:
             ]
         }
 
-    llm = get_llm(temperature=0.3)
     processed_sources: List[ProcessedSource] = []
     messages: List[ProcessMessage] = []
     # 用于保存到文件的详细记录
@@ -68,125 +394,28 @@ def summarizer_node(state: ResearchState) -> dict:
         )
     )
 
-    for result in raw_results:
-        # 确定要处理的内容
-        original_content = result.get("content") or result.get("snippet", "")
-        content_to_process = original_content
+    semaphore = asyncio.Semaphore(max(1, config.SUMMARIZER_CONCURRENCY))
+    outcomes = await summarize_results(
+        raw_results, topic, keywords, semaphore, config.SUMMARIZER_TIMEOUT, state.get("session_id")
+    )
 
-        if not content_to_process:
+    # 结果顺序与输入一致
+    for outcome in outcomes:
+        if outcome is None:
             continue
 
-        # 记录是否使用了关键词定位
-        used_keyword_locate = False
-        located_content = None
+        processed, record = outcome
+        summary_records.append(record)
+        if processed is None:
+            continue
 
-        # 如果内容较长，使用关键词定位
-        if len(content_to_process) > 1000:
-            used_keyword_locate = True
-            located_content = locate_relevant_segments(
-                content_to_process,
-                keywords,
-                context_lines=2,
-                max_segments=5
-            )
-            content_to_process = located_content
-
-        # 构建 prompt
-        prompt = SUMMARIZER_PROMPT.format(
-            topic=topic,
-            query=result["query"],
-            source_id=result["id"],
-            title=result["title"],
-            url=result["url"],
-            content=content_to_process[:2000],  # 限制长度
-        )
+        processed_sources.append(processed)
+        if record["llm_output"] is not None:
+            log_processed_source(processed)
 
-        try:
-            response = llm.invoke(prompt)
-            content = response.content
-
-            # 解析 JSON
-            start_idx = content.find('{')
-            end_idx = content.rfind('}') + 1
-            if start_idx != -1 and end_idx > start_idx:
-                json_str = content[start_idx:end_idx]
-                parsed = json.loads(json_str)
-            else:
-                raise ValueError("No JSON found")
-
-            processed: ProcessedSource = {
-                "id": result["id"],
-                "title": result["title"],
-                "url": result["url"],
-                "query": result["query"],
-                "summary": parsed.get("summary", ""),
-                "key_points": parsed.get("key_points", []),
-                "relevance": parsed.get("relevance", 0.5),
-                "raw_content": original_content,
-            }
-
-            # 构建详细记录
-            record = {
-                "id": result["id"],
-                "title": result["title"],
-                "url": result["url"],
-                "query": result["query"],
-                "original_content_length": len(original_content),
-                "used_keyword_locate": used_keyword_locate,
-                "located_content": located_content if used_keyword_locate else None,
-                "llm_output": {
-                    "summary": parsed.get("summary", ""),
-                    "key_points": parsed.get("key_points", []),
-                    "relevance": parsed.get("relevance", 0.5),
-                },
-                "kept": processed["relevance"] >= 0.3,
-            }
-            summary_records.append(record)
-
-            # 只保留相关度较高的来源
-            if processed["relevance"] >= 0.3:
-                processed_sources.append(processed)
-                # 终端输出关键要点和相关度
-                logger.log_info("summarizer", f"[{result['id']}] {result['title'][:40]}...")
-                logger.log_detail("summarizer", "相关度", f"{processed['relevance']:.2f}")
-                for i, point in enumerate(processed["key_points"][:3], 1):
-                    point_text = point[:50] + "..." if len(point) > 50 else point
-                    logger.log_detail("summarizer", f"要点{i}", point_text)
-
-        except Exception as e:
-            print(f"Summarizer error for {result['id']}: {e}")
-            # 兜底：使用原始内容
-            processed: ProcessedSource = {
-                "id": result["id"],
-                "title": result["title"],
-                "url": result["url"],
-                "query": result["query"],
-                "summary": content_to_process[:200] + "...",
-                "key_points": [],
-                "relevance": 0.5,
-                "raw_content": original_content,
-            }
-            processed_sources.append(processed)
-
-            # 记录错误情况
-            record = {
-                "id": result["id"],
-                "title": result["title"],
-                "url": result["url"],
-                "query": result["query"],
-                "original_content_length": len(original_content),
-                "used_keyword_locate": used_keyword_locate,
-                "located_content": located_content if used_keyword_locate else None,
-                "llm_output": None,
-                "error": str(e),
-                "kept": True,
-            }
-            summary_records.append(record)
-
-    # 保存详细记录到文件
-    filepath = save_summary_results(summary_records, iteration)
+    # 详细记录交给后台写入器落盘
+    get_artifact_sink().submit(state.get("session_id"), "summary", summary_records, iteration=iteration)
     logger.log_info("summarizer", f"处理完成: {len(processed_sources)}/{len(raw_results)} 有效")
-    logger.log_detail("summarizer", "saved", os.path.basename(filepath))
     logger.log_node_end("summarizer")
 
     messages.append(
@@ -198,6 +427,11 @@ def summarizer_node(state: ResearchState) -> dict:
         )
     )
 
+    # Analyzer 决策的同时在后台预取最可能被深挖的来源（searcher_basic 已更新迭代次数）
+    prefetched = prefetch_detail_candidates(state, processed_sources)
+    if prefetched:
+        logger.log_detail("summarizer", "预取", f"后台抓取 {prefetched} 个来源的完整内容")
+
     return {
         "sources": processed_sources,
         "messages": messages,
@@ -1,9 +1,16 @@
 from datetime import datetime
-from typing import List, Dict, AsyncIterator
+from typing import List, Dict, AsyncIterator, Tuple
 
+from backend.config import config
 from backend.graph.state import ResearchState, ProcessedSource
 from backend.prompts import WRITER_PROMPT
-from backend.utils import get_llm, logger
+from backend.utils import astream_llm, estimate_tokens, logger
+from backend.utils.near_duplicate import text_shingles
+
+# 要点之间的字符 bigram Jaccard 相似度超过该值视为重复
+POINT_SIMILARITY_THRESHOLD = 0.6
+# 超出预算时每个来源保留的要点数，逐级降低
+POINT_CAPS = (None, 3, 1, 0)
 
 
 def format_sources_for_writer(sources: List[ProcessedSource], source_map: Dict[str, int]) -> str:
@@ -27,6 +34,69 @@ def format_sources_for_writer(sources: List[ProcessedSource], source_map: Dict[s
     return '\n'.join(lines)
 
 
+def rank_sources(sources: List[ProcessedSource]) -> List[Tuple[ProcessedSource, List[str]]]:
+    """
+    按相关度和新颖度排序，并去掉与更靠前来源重复的要点
+
+    新颖度 = 该来源未与前面来源重复的要点比例；排序分数 = 相关度 × (0.5 + 0.5 × 新颖度)
+
+    Returns:
+        [(来源, 去重后的要点)]
+    """
+    seen: List[set] = []
+    scored = []
+
+    for order, source in enumerate(sorted(sources, key=lambda s: s.get("relevance", 0), reverse=True)):
+        points = source.get("key_points", [])
+        novel = []
+        for point in points:
+            shingles = text_shingles(point, 2)
+            if not shingles:
+                continue
+            if any(len(shingles & other) / len(shingles | other) >= POINT_SIMILARITY_THRESHOLD for other in seen):
+                continue
+            seen.append(shingles)
+            novel.append(point)
+
+        novelty = len(novel) / len(points) if points else 1.0
+        score = source.get("relevance", 0) * (0.5 + 0.5 * novelty)
+        scored.append((score, order, source, novel))
+
+    scored.sort(key=lambda item: (-item[0], item[1]))
+    return [(source, novel) for _, _, source, novel in scored]
+
+
+def pack_sources_for_writer(sources: List[ProcessedSource], budget: int) -> List[ProcessedSource]:
+    """
+    按 token 预算打包 Writer 的来源上下文
+
+    先按相关度和新颖度排序并去掉跨来源的重复要点；超出预算时先逐级减少每个来源的要点，
+    仍超出时从排名最低的来源开始整条丢弃（至少保留一个来源）。
+
+    Returns:
+        排序并裁剪后的来源列表（key_points 为保留的要点）
+    """
+    ranked = rank_sources(sources)
+
+    packed: List[ProcessedSource] = []
+    costs: List[int] = []
+    for cap in POINT_CAPS:
+        packed = [
+            {**source, "key_points": points if cap is None else points[:cap]}
+            for source, points in ranked
+        ]
+        # 编号位数对 token 数影响可以忽略，用占位编号单独估算每个来源
+        costs = [estimate_tokens(format_sources_for_writer([s], {s["id"]: 1})) for s in packed]
+        if sum(costs) <= budget:
+            return packed
+
+    total = sum(costs)
+    while len(packed) > 1 and total > budget:
+        packed.pop()
+        total -= costs.pop()
+    return packed
+
+
 def format_findings(findings: List[str]) -> str:
     """格式化关键发现"""
     if not findings:
@@ -53,9 +123,13 @@ async def writer_node_streaming(state: ResearchState) -> AsyncIterator[str]:
     if len(relevant_sources) < 3:
         relevant_sources = sorted(sources, key=lambda x: x.get("relevance", 0), reverse=True)[:5]
 
-    logger.log_info("writer", f"整合 {len(relevant_sources)} 个来源")
+    # 按 token 预算打包上下文（排序、要点去重、逐级裁剪）
+    candidate_count = len(relevant_sources)
+    relevant_sources = pack_sources_for_writer(relevant_sources, config.WRITER_CONTEXT_TOKEN_BUDGET)
+
+    logger.log_info("writer", f"整合 {len(relevant_sources)}/{candidate_count} 个来源")
 
-    # 建立 src_id → 数字的映射
+    # 建立 src_id → 数字的映射（打包后的来源按排序编号，参考来源使用同一映射）
     source_map: Dict[str, int] = {}
     for i, source in enumerate(relevant_sources):
         source_map[source["id"]] = i + 1
@@ -71,14 +145,12 @@ async def writer_node_streaming(state: ResearchState) -> AsyncIterator[str]:
         key_findings=key_findings,
     )
 
-    # 调用 LLM 流式输出
-    llm = get_llm(temperature=0.7)
+    # 调用 LLM 流式输出（以最高优先级排队）
     full_report = ""
 
-    async for chunk in llm.astream(prompt):
-        if hasattr(chunk, 'content') and chunk.content:
-            full_report += chunk.content
-            yield chunk.content
+    async for chunk in astream_llm(prompt, temperature=0.7, session_id=state.get("session_id")):
+        full_report += chunk
+        yield chunk
 
     # 生成参考来源部分
     references = generate_references(full_report, relevant_sources, source_map)
@@ -1,11 +1,14 @@
 from .planner import PLANNER_PROMPT
-from .summarizer import SUMMARIZER_PROMPT
+from .summarizer import SUMMARIZER_BATCH_PROMPT, SUMMARIZER_PROMPT
 from .analyzer import get_analyzer_prompt
 from .writer import WRITER_PROMPT
+from .repair import REPAIR_PROMPT
 
 __all__ = [
     "PLANNER_PROMPT",
     "SUMMARIZER_PROMPT",
+    "SUMMARIZER_BATCH_PROMPT",
     "get_analyzer_prompt",
     "WRITER_PROMPT",
+    "REPAIR_PROMPT",
 ]
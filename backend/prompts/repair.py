@@ -0,0 +1,13 @@
+REPAIR_PROMPT = """你上一次的输出没有通过 JSON 格式校验，请修正。
+
+## 校验错误
+{error}
+
+## 你上一次的输出
+{output}
+
+## 要求的 JSON Schema
+{schema}
+
+请只输出修正后的 JSON 对象：保留原输出中的信息，补全缺失的必填字段，修正类型和取值范围错误，不要添加任何其他文字。
+"""
@@ -3,11 +3,7 @@ SUMMARIZER_PROMPT = """你是一个信息提取专家。你的任务是从搜索
 ## 研究主题
 {topic}
 
-## 搜索词
-{query}
-
 ## 待处理内容
-来源 ID: {source_id}
 标题: {title}
 URL: {url}
 
@@ -34,3 +30,41 @@ URL: {url}
 }}
 ```
 """
+
+
+SUMMARIZER_BATCH_PROMPT = """你是一个信息提取专家。你的任务是从多个搜索结果中分别提取关键信息，为每个来源生成结构化摘要。
+
+## 研究主题
+{topic}
+
+## 待处理内容（共 {count} 个来源）
+{sources}
+
+## 任务要求
+对每个来源分别：
+1. 生成一个 200 字以内的摘要，概括该来源的核心内容
+2. 提取 3-5 个关键要点
+3. 评估该来源与研究主题的相关度（0-1）
+4. 如果内容与主题无关，相关度给 0
+
+每个来源只根据它自己的内容片段摘要，不要混入其他来源的信息。
+
+## 输出格式
+请输出一个 JSON 对象，sources 数组中每个来源一项，source_id 与上面给出的完全一致：
+```json
+{{
+    "sources": [
+        {{
+            "source_id": "src_1",
+            "summary": "该来源的核心内容摘要...",
+            "key_points": [
+                "要点1",
+                "要点2",
+                "要点3"
+            ],
+            "relevance": 0.85
+        }}
+    ]
+}}
+```
+"""
@@ -0,0 +1,117 @@
+"""
+启动预热
+
+重量级依赖（langchain_openai、langgraph、tavily、jieba）都在首次使用时才导入，导入应用本身很快。
+FastAPI lifespan 中调用 start_warmup()，在后台线程里编译研究图并导入 LLM/搜索客户端，
+完成后 /ready 返回 200，首个请求不再承担这些开销。
+
+研究流程不使用 jieba（只有 extract_keywords 等辅助函数用到），预热不再加载其词典；
+需要时可以预先构建词典缓存（例如在构建镜像时执行）：
+    python -m backend.startup
+"""
+import threading
+import time
+from typing import Optional
+
+from backend.config import config
+from backend.utils import logger
+
+# 从导入应用（本模块由 backend.main 最先导入）开始计时
+_boot_started = time.perf_counter()
+_ready = threading.Event()
+_stats_lock = threading.Lock()
+_stats = {
+    "time_to_ready": None,
+    "steps": {},
+    "first_request_latency": None,
+}
+
+
+def _compile_graph():
+    from backend.graph.workflow import get_research_graph
+    get_research_graph()
+
+
+def _import_clients():
+    import langchain_openai  # noqa: F401
+    import tavily  # noqa: F401
+
+
+def _import_checkpoint_saver():
+    # 检查点存储绑定事件循环，在首个请求中创建；这里只提前导入 SQLite 检查点依赖
+    if config.CHECKPOINT_ENABLED:
+        import backend.graph.checkpoint_saver  # noqa: F401
+
+
+# 预热步骤：(名称, 函数)，按顺序执行
+WARMUP_STEPS = (
+    ("graph", _compile_graph),
+    ("clients", _import_clients),
+    ("checkpoints", _import_checkpoint_saver),
+)
+
+
+def _mark_ready():
+    with _stats_lock:
+        _stats["time_to_ready"] = round(time.perf_counter() - _boot_started, 3)
+    _ready.set()
+
+
+def warm_up():
+    """依次执行预热步骤并记录耗时，单个步骤失败不影响就绪（首次使用时会再次尝试）"""
+    for name, step in WARMUP_STEPS:
+        started = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            logger.log_info("startup", f"预热 {name} 失败: {e}")
+        with _stats_lock:
+            _stats["steps"][name] = round(time.perf_counter() - started, 3)
+
+    _mark_ready()
+    steps = ", ".join(f"{name} {cost:.2f}s" for name, cost in _stats["steps"].items())
+    logger.log_info("startup", f"就绪，启动用时 {_stats['time_to_ready']:.2f}s（{steps}）")
+
+
+def start_warmup() -> Optional[threading.Thread]:
+    """启动后台预热线程；WARMUP_ON_STARTUP 关闭时直接标记就绪"""
+    if not config.WARMUP_ON_STARTUP:
+        _mark_ready()
+        return None
+
+    thread = threading.Thread(target=warm_up, name="warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def is_ready() -> bool:
+    """预热是否完成"""
+    return _ready.is_set()
+
+
+def record_first_request(latency: float):
+    """记录首个请求开始执行工作流前的延迟（冷启动开销落在这里），只记录一次"""
+    with _stats_lock:
+        if _stats["first_request_latency"] is not None:
+            return
+        _stats["first_request_latency"] = round(latency, 3)
+    logger.log_info("startup", f"首个请求延迟 {latency:.2f}s（{'预热后' if is_ready() else '预热未完成'}）")
+
+
+def startup_stats() -> dict:
+    """启动统计：是否就绪、启动用时、各预热步骤耗时、首个请求延迟"""
+    with _stats_lock:
+        return {
+            "ready": is_ready(),
+            "time_to_ready": _stats["time_to_ready"],
+            "steps": dict(_stats["steps"]),
+            "first_request_latency": _stats["first_request_latency"],
+        }
+
+
+if __name__ == "__main__":
+    from backend.utils.text_processing import init_jieba
+
+    started = time.perf_counter()
+    init_jieba()
+    print(f"jieba 词典缓存已就绪: {config.JIEBA_CACHE_PATH} ({time.perf_counter() - started:.2f}s)")
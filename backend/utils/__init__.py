@@ -1,13 +1,39 @@
-from .llm_client import get_llm, get_structured_llm
-from .tavily_client import TavilyClient
-from .text_processing import extract_keywords, locate_relevant_segments
+"""
+工具模块
+
+导出的名称在首次访问时才导入对应子模块（PEP 562），
+避免仅导入 backend.utils 就加载 langchain_openai、tavily、jieba 等重量级依赖。
+"""
+from importlib import import_module
+
 from . import logger
 
-__all__ = [
-    "get_llm",
-    "get_structured_llm",
-    "TavilyClient",
-    "extract_keywords",
-    "locate_relevant_segments",
-    "logger",
-]
+# 导出名称 → 所在子模块
+_EXPORTS = {
+    "get_llm": ".llm_client",
+    "get_llm_cache": ".llm_client",
+    "ainvoke_llm": ".llm_client",
+    "astream_llm": ".llm_client",
+    "ainvoke_structured": ".llm_client",
+    "StructuredOutputError": ".llm_client",
+    "record_structured": ".llm_client",
+    "record_wasted_iteration": ".llm_client",
+    "structured_output_stats": ".llm_client",
+    "close_llm_clients": ".llm_client",
+    "TavilyClient": ".tavily_client",
+    "get_search_cache": ".search_cache",
+    "extract_keywords": ".text_processing",
+    "locate_relevant_segments": ".text_processing",
+    "estimate_tokens": ".text_processing",
+}
+
+__all__ = [*_EXPORTS, "logger"]
+
+
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,192 @@
+"""
+过程产物落盘（搜索结果、摘要记录）
+
+节点只把记录放进有界队列，由后台线程追加到每个会话各自的 gzip 压缩 JSONL 文件：
+    {ARTIFACTS_DIR}/{kind}/{session_id}.jsonl.gz
+节点耗时不再包含磁盘 I/O；队列满时丢弃并计数，不阻塞节点。
+每次写入是一个独立的 gzip member，追加后的文件可以直接用 gzip/zcat 读取。
+"""
+import gzip
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from backend.config import config
+from backend.utils.cache import resolve_db_path
+
+# 队列中的停止标记
+_STOP = object()
+
+
+def session_sampled(session_id: str, sample_rate: float) -> bool:
+    """按会话 ID 的哈希采样：同一会话的产物要么全部保留，要么全部跳过"""
+    if sample_rate >= 1:
+        return True
+    if sample_rate <= 0:
+        return False
+    digest = hashlib.sha1(session_id.encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") / 2 ** 64 < sample_rate
+
+
+class ArtifactSink:
+    """后台产物写入器：有界队列 + 单个写线程"""
+
+    def __init__(self, directory: Optional[str], max_queue: int = 1000, sample_rate: float = 1.0):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max(1, max_queue))
+        self._lock = threading.Lock()
+        self._stats = {
+            "submitted": 0,
+            "written": 0,
+            "dropped": 0,
+            "sampled_out": 0,
+            "errors": 0,
+            "bytes": 0,
+        }
+        self._thread: Optional[threading.Thread] = None
+        if directory:
+            self._thread = threading.Thread(target=self._run, name="artifact-sink", daemon=True)
+            self._thread.start()
+
+    @property
+    def enabled(self) -> bool:
+        return self._thread is not None
+
+    def _count(self, key: str, amount: int = 1):
+        with self._lock:
+            self._stats[key] += amount
+
+    def path_for(self, session_id: str, kind: str) -> str:
+        """会话产物文件路径"""
+        return os.path.join(self.directory, kind, f"{session_id}.jsonl.gz")
+
+    def submit(self, session_id: Optional[str], kind: str, records: List[dict], **meta) -> bool:
+        """
+        提交一批记录（不阻塞）
+
+        Args:
+            session_id: 研究会话 ID
+            kind: 产物类型（search / summary），对应子目录
+            records: 记录列表，每条写成一行
+            **meta: 附加到每行的字段（如 iteration、mode）
+
+        Returns:
+            是否进入写入队列
+        """
+        if not self.enabled or not records:
+            return False
+
+        session_id = session_id or "default"
+        if not session_sampled(session_id, self.sample_rate):
+            self._count("sampled_out", len(records))
+            return False
+
+        try:
+            self._queue.put_nowait((session_id, kind, records, meta, time.time()))
+        except queue.Full:
+            self._count("dropped", len(records))
+            return False
+
+        self._count("submitted", len(records))
+        return True
+
+    def _run(self):
+        """写线程：取出当前队列中的全部批次，按文件分组后各追加一次"""
+        while True:
+            batches = [self._queue.get()]
+            while True:
+                try:
+                    batches.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = any(batch is _STOP for batch in batches)
+            self._write([batch for batch in batches if batch is not _STOP])
+            for _ in batches:
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _write(self, batches: List[Tuple]):
+        grouped: Dict[str, List[str]] = defaultdict(list)
+        for session_id, kind, records, meta, created in batches:
+            for record in records:
+                line = {"kind": kind, "session_id": session_id, "ts": created, **meta, "record": record}
+                grouped[self.path_for(session_id, kind)].append(json.dumps(line, ensure_ascii=False))
+
+        for path, lines in grouped.items():
+            data = ("\n".join(lines) + "\n").encode("utf-8")
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with gzip.open(path, "ab", compresslevel=6) as f:
+                    f.write(data)
+            except OSError as e:
+                print(f"Artifact write error ({path}): {e}")
+                self._count("errors", len(lines))
+                continue
+            self._count("written", len(lines))
+            self._count("bytes", len(data))
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """等待队列中已提交的记录写完，返回是否在超时前完成"""
+        if not self.enabled:
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def close(self, timeout: Optional[float] = 10.0):
+        """写完剩余记录并停止写线程"""
+        if not self.enabled:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+        stats["enabled"] = self.enabled
+        stats["sample_rate"] = self.sample_rate
+        stats["queued"] = self._queue.qsize()
+        return stats
+
+
+# 全局产物写入器
+_sink: Optional[ArtifactSink] = None
+_sink_lock = threading.Lock()
+
+
+def get_artifact_sink() -> ArtifactSink:
+    """获取或创建产物写入器（ARTIFACTS_ENABLED 关闭时为不写入的空实例）"""
+    global _sink
+    if _sink is None:
+        with _sink_lock:
+            if _sink is None:
+                directory = resolve_db_path(config.ARTIFACTS_DIR) if config.ARTIFACTS_ENABLED else None
+                _sink = ArtifactSink(
+                    directory=directory,
+                    max_queue=config.ARTIFACTS_QUEUE_SIZE,
+                    sample_rate=config.ARTIFACTS_SAMPLE_RATE,
+                )
+    return _sink
+
+
+def close_artifact_sink(timeout: float = 10.0):
+    """应用关闭时写完剩余产物"""
+    global _sink
+    with _sink_lock:
+        sink, _sink = _sink, None
+    if sink is not None:
+        sink.close(timeout)
@@ -0,0 +1,342 @@
+"""
+两级缓存：进程内 LRU + SQLite 磁盘
+
+值必须可以 JSON 序列化。每个缓存实例使用独立的 namespace，
+多个实例可以共用同一个数据库文件。
+"""
+import asyncio
+import atexit
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+# 项目根目录（相对路径的缓存文件以此为基准）
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def resolve_db_path(path: str) -> Optional[str]:
+    """将配置中的数据库路径解析为绝对路径，空字符串表示不使用磁盘层"""
+    if not path:
+        return None
+    if os.path.isabs(path):
+        return path
+    return os.path.join(PROJECT_ROOT, path)
+
+
+class TieredCache:
+    """
+    内存 LRU + SQLite 磁盘两级缓存，按 TTL 过期、按条目数（内存层还可以按大小）淘汰
+
+    磁盘写入（写入新值、更新访问时间、删除过期条目、容量淘汰）由每个实例专属的写线程批量执行，
+    调用方只更新内存层后入队，不等待 SQLite；磁盘层的读取在异步代码中使用 aget / aget_many，
+    经 asyncio.to_thread 在线程中执行。磁盘层条目数在初始化时统计一次，之后由写线程在内存中维护。
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        ttl: float,
+        max_memory_entries: int = 1000,
+        max_disk_entries: int = 10000,
+        db_path: Optional[str] = None,
+        max_memory_bytes: int = 0,
+    ):
+        """
+        Args:
+            namespace: 缓存命名空间（同一数据库内互相隔离）
+            ttl: 默认过期时间（秒）
+            max_memory_entries: 内存层最大条目数
+            max_disk_entries: 磁盘层最大条目数
+            db_path: SQLite 文件路径，为空时只使用内存层
+            max_memory_bytes: 内存层的大小上限（按值 JSON 序列化后的 UTF-8 字节数估算，不低于实际占用的字符串内存），
+                0 表示只按条目数限制；
+                单个值超过上限时只写磁盘层
+        """
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.max_memory_bytes = max_memory_bytes
+
+        # key → (过期时间, 值, 估算大小)
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "sets": 0,
+            "expired": 0,
+            "evictions": 0,
+            "write_errors": 0,
+        }
+
+        # 读连接（由 _db_lock 串行化）；写操作经 _writes 队列交给写线程，写线程使用自己的连接
+        self._db_path = db_path
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self._writes: "queue.Queue[tuple]" = queue.Queue()
+        self._disk_entries = 0
+        if db_path:
+            os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+            self._db = self._connect()
+            self._db.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cache_entries (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )
+                """
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS idx_cache_accessed ON cache_entries (namespace, accessed_at)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS idx_cache_expires ON cache_entries (namespace, expires_at)"
+            )
+            (self._disk_entries,) = self._db.execute(
+                "SELECT COUNT(*) FROM cache_entries WHERE namespace = ?",
+                (self.namespace,),
+            ).fetchone()
+            self._db.commit()
+            threading.Thread(target=self._write_loop, name=f"cache-{namespace}", daemon=True).start()
+            # 进程退出前写完队列中剩余的写操作
+            atexit.register(self.flush)
+
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self._db_path, timeout=5, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        return db
+
+    def get(self, key: str) -> Optional[Any]:
+        """读取缓存，未命中或已过期时返回 None（磁盘层在当前线程读取，异步代码使用 aget）"""
+        now = time.time()
+        found, value = self._get_memory(key, now)
+        if found:
+            return value
+        return self._get_disk([key], now).get(key)
+
+    async def aget(self, key: str) -> Optional[Any]:
+        """get 的异步版本：内存层未命中时在线程中读取磁盘层，不阻塞事件循环"""
+        return (await self.aget_many([key])).get(key)
+
+    async def aget_many(self, keys: List[str]) -> Dict[str, Any]:
+        """
+        批量读取缓存，内存层未命中的键在一次线程调用中读取磁盘层
+
+        Returns:
+            命中的 key → 值（未命中或已过期的键不出现）
+        """
+        now = time.time()
+        hits, missing = {}, []
+        for key in dict.fromkeys(keys):
+            found, value = self._get_memory(key, now)
+            if found:
+                hits[key] = value
+            else:
+                missing.append(key)
+        if missing:
+            if self._db is not None:
+                hits.update(await asyncio.to_thread(self._get_disk, missing, now))
+            else:
+                hits.update(self._get_disk(missing, now))
+        return hits
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """写入缓存：立即写内存层，磁盘层写入交给写线程（不等待完成）"""
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+
+        raw_value = json.dumps(value, ensure_ascii=False) if self._db is not None or self.max_memory_bytes else ""
+
+        with self._lock:
+            self._put_memory(key, expires_at, value, self._size(raw_value))
+            self._stats["sets"] += 1
+
+        if self._db is not None:
+            self._writes.put(("set", key, raw_value, expires_at, now))
+
+    def clear(self):
+        """清空当前命名空间"""
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+        if self._db is not None:
+            self._writes.put(("clear",))
+            self.flush()
+
+    def flush(self):
+        """等待已入队的磁盘写入全部完成"""
+        if self._db is not None:
+            self._writes.join()
+
+    def stats(self) -> dict:
+        """命中/未命中计数"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+            stats["memory_bytes"] = self._memory_bytes
+        stats["disk_entries"] = self._disk_entries
+        stats["pending_writes"] = self._writes.qsize()
+        hits = stats["memory_hits"] + stats["disk_hits"]
+        total = hits + stats["misses"]
+        stats["hit_rate"] = hits / total if total else 0.0
+        return stats
+
+    def _get_memory(self, key: str, now: float) -> Tuple[bool, Any]:
+        """读取内存层，返回 (是否命中, 值)"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                return False, None
+            expires_at, value, _ = entry
+            if expires_at > now:
+                self._memory.move_to_end(key)
+                self._stats["memory_hits"] += 1
+                return True, value
+            self._drop_memory(key)
+            self._stats["expired"] += 1
+            return False, None
+
+    def _get_disk(self, keys: List[str], now: float) -> Dict[str, Any]:
+        """读取磁盘层（内存层已未命中），命中的条目回填内存层；访问时间更新和过期删除交给写线程"""
+        hits = {}
+        for key in keys:
+            row = None
+            if self._db is not None:
+                with self._db_lock:
+                    row = self._db.execute(
+                        "SELECT value, expires_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                        (self.namespace, key),
+                    ).fetchone()
+
+            with self._lock:
+                if row is not None:
+                    raw_value, expires_at = row
+                    if expires_at > now:
+                        value = json.loads(raw_value)
+                        self._put_memory(key, expires_at, value, self._size(raw_value))
+                        self._stats["disk_hits"] += 1
+                        self._writes.put(("touch", key, now))
+                        hits[key] = value
+                        continue
+                    self._stats["expired"] += 1
+                    self._writes.put(("expire", key, now))
+                self._stats["misses"] += 1
+        return hits
+
+    def _write_loop(self):
+        """写线程：取出队列中积压的全部写操作，在一个事务中执行"""
+        db = self._connect()
+        while True:
+            ops = [self._writes.get()]
+            while True:
+                try:
+                    ops.append(self._writes.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                for op in ops:
+                    self._apply(db, op)
+                self._evict_disk(db, time.time())
+                db.commit()
+            except Exception:
+                # 缓存写入失败不影响调用方：丢弃这一批，回滚后重新统计条目数
+                with self._lock:
+                    self._stats["write_errors"] += 1
+                try:
+                    db.rollback()
+                    (self._disk_entries,) = db.execute(
+                        "SELECT COUNT(*) FROM cache_entries WHERE namespace = ?",
+                        (self.namespace,),
+                    ).fetchone()
+                except sqlite3.Error:
+                    pass
+            finally:
+                for _ in ops:
+                    self._writes.task_done()
+
+    def _apply(self, db: sqlite3.Connection, op: tuple):
+        """执行一个写操作并维护磁盘层条目数（写线程中调用）"""
+        kind, *args = op
+        if kind == "set":
+            key, raw_value, expires_at, now = args
+            updated = db.execute(
+                "UPDATE cache_entries SET value = ?, expires_at = ?, accessed_at = ? WHERE namespace = ? AND key = ?",
+                (raw_value, expires_at, now, self.namespace, key),
+            ).rowcount
+            if not updated:
+                db.execute(
+                    "INSERT INTO cache_entries (namespace, key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                    (self.namespace, key, raw_value, expires_at, now),
+                )
+                self._disk_entries += 1
+        elif kind == "touch":
+            key, now = args
+            db.execute(
+                "UPDATE cache_entries SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                (now, self.namespace, key),
+            )
+        elif kind == "expire":
+            # 只删除仍然过期的条目（读取之后可能已被重新写入）
+            key, now = args
+            self._disk_entries -= db.execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND key = ? AND expires_at <= ?",
+                (self.namespace, key, now),
+            ).rowcount
+        elif kind == "clear":
+            db.execute("DELETE FROM cache_entries WHERE namespace = ?", (self.namespace,))
+            self._disk_entries = 0
+
+    def _size(self, raw_value: str) -> int:
+        """内存层按大小限制时估算条目大小"""
+        return len(raw_value.encode("utf-8")) if self.max_memory_bytes else 0
+
+    def _put_memory(self, key: str, expires_at: float, value: Any, size: int = 0):
+        """写入内存层，超出条目数或大小上限时淘汰最久未使用的条目（调用方持有锁）"""
+        self._drop_memory(key)
+        if self.max_memory_bytes and size > self.max_memory_bytes:
+            return
+        self._memory[key] = (expires_at, value, size)
+        self._memory_bytes += size
+        while len(self._memory) > self.max_memory_entries or (
+            self.max_memory_bytes and self._memory_bytes > self.max_memory_bytes
+        ):
+            _, (_, _, evicted_size) = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted_size
+            self._stats["evictions"] += 1
+
+    def _drop_memory(self, key: str):
+        """从内存层移除一个条目（调用方持有锁）"""
+        entry = self._memory.pop(key, None)
+        if entry is not None:
+            self._memory_bytes -= entry[2]
+
+    def _evict_disk(self, db: sqlite3.Connection, now: float):
+        """磁盘层超出容量时先清理过期条目，仍超出时按最近访问时间淘汰（写线程中调用）"""
+        if self._disk_entries <= self.max_disk_entries:
+            return
+        self._disk_entries -= db.execute(
+            "DELETE FROM cache_entries WHERE namespace = ? AND expires_at <= ?",
+            (self.namespace, now),
+        ).rowcount
+        overflow = self._disk_entries - self.max_disk_entries
+        if overflow > 0:
+            evicted = db.execute(
+                "DELETE FROM cache_entries WHERE rowid IN ("
+                "SELECT rowid FROM cache_entries WHERE namespace = ? ORDER BY accessed_at LIMIT ?)",
+                (self.namespace, overflow),
+            ).rowcount
+            self._disk_entries -= evicted
+            with self._lock:
+                self._stats["evictions"] += evicted
@@ -0,0 +1,239 @@
+"""
+会话内容存储
+
+网页原文不放进 LangGraph 状态：状态里只保存内容引用（content_ref）和长度（content_length），
+原文按会话存放在这里，需要时再读取。
+- 内容按哈希寻址，同一会话内相同内容只存一份
+- 安装了 zstandard 时压缩存储（CONTENT_STORE_COMPRESS）
+- 内存中的内容超过 CONTENT_STORE_MEMORY_BYTES 后，最早写入的条目溢出到会话自己的磁盘文件，
+  单个会话的内存占用不再随网页大小增长
+- 研究未完成就结束（客户端断开）时保留溢出文件和索引，从检查点恢复时重新打开（见 backend.graph.checkpoint）
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from backend.config import config
+from backend.utils.cache import resolve_db_path
+
+
+def _load_zstd():
+    """zstandard 是可选依赖，未安装时不压缩"""
+    if not config.CONTENT_STORE_COMPRESS:
+        return None
+    try:
+        import zstandard
+    except ImportError:
+        print("CONTENT_STORE_COMPRESS is enabled but 'zstandard' is not installed, storing content uncompressed")
+        return None
+    return zstandard
+
+
+class ContentStore:
+    """单个会话的内容存储：内存（可压缩）+ 磁盘溢出文件"""
+
+    def __init__(self, session_id: str, memory_limit: int, spill_dir: Optional[str], zstd=None):
+        self.session_id = session_id
+        self.memory_limit = memory_limit
+        self.spill_path = os.path.join(spill_dir, f"{session_id}.bin") if spill_dir else None
+        self.index_path = os.path.join(spill_dir, f"{session_id}.idx") if spill_dir else None
+        self._zstd = zstd
+        self._compressor = zstd.ZstdCompressor(level=3) if zstd else None
+        self._decompressor = zstd.ZstdDecompressor() if zstd else None
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk: Dict[str, Tuple[int, int]] = {}
+        self._spill_file = None
+        self._stats = {"puts": 0, "gets": 0, "spilled": 0, "raw_bytes": 0, "stored_bytes": 0}
+        self._load_index()
+
+    def _load_index(self):
+        """重新打开之前会话保留的溢出文件（压缩设置不一致时放弃）"""
+        if self.index_path is None or not os.path.exists(self.index_path):
+            return
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+            if index.get("compressed") != (self._compressor is not None):
+                return
+            self._spill_file = open(self.spill_path, "a+b")
+        except (OSError, ValueError) as e:
+            print(f"Content store index error ({self.index_path}): {e}")
+            return
+        self._disk = {ref: (offset, length) for ref, (offset, length) in index["entries"].items()}
+
+    def _encode(self, text: str) -> bytes:
+        data = text.encode("utf-8")
+        if self._compressor is None:
+            return data
+        # compress 返回的 bytes 仍占着按压缩上界分配的缓冲区，复制一份释放多余内存
+        return bytes(memoryview(self._compressor.compress(data)))
+
+    def _decode(self, blob: bytes) -> str:
+        data = self._decompressor.decompress(blob) if self._decompressor else blob
+        return data.decode("utf-8")
+
+    def _spill(self, force: bool = False):
+        """
+        把最早写入的条目写到磁盘，直到内存占用回到上限以内（调用方持有锁）
+
+        force 为 True 时写出全部条目
+        """
+        if self.spill_path is None:
+            return
+        while self._memory and (force or (self._memory_bytes > self.memory_limit and len(self._memory) > 1)):
+            ref, blob = self._memory.popitem(last=False)
+            if self._spill_file is None:
+                os.makedirs(os.path.dirname(self.spill_path), exist_ok=True)
+                self._spill_file = open(self.spill_path, "a+b")
+            self._spill_file.seek(0, os.SEEK_END)
+            offset = self._spill_file.tell()
+            self._spill_file.write(blob)
+            self._disk[ref] = (offset, len(blob))
+            self._memory_bytes -= len(blob)
+            self._stats["spilled"] += 1
+        if self._spill_file is not None:
+            self._spill_file.flush()
+
+    def put(self, text: str) -> str:
+        """保存内容并返回引用；空内容返回空引用"""
+        if not text:
+            return ""
+        ref = hashlib.sha1(text.encode("utf-8")).hexdigest()[:16]
+
+        with self._lock:
+            self._stats["puts"] += 1
+            if ref in self._memory or ref in self._disk:
+                return ref
+            blob = self._encode(text)
+            self._memory[ref] = blob
+            self._memory_bytes += len(blob)
+            self._stats["raw_bytes"] += len(text.encode("utf-8"))
+            self._stats["stored_bytes"] += len(blob)
+            self._spill()
+        return ref
+
+    def get(self, ref: str) -> str:
+        """按引用读取内容，引用不存在时返回空字符串"""
+        if not ref:
+            return ""
+        with self._lock:
+            self._stats["gets"] += 1
+            blob = self._memory.get(ref)
+            if blob is None:
+                location = self._disk.get(ref)
+                if location is None:
+                    return ""
+                offset, length = location
+                blob = os.pread(self._spill_file.fileno(), length, offset)
+        return self._decode(blob)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                **self._stats,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "disk_entries": len(self._disk),
+            }
+
+    def close(self, keep: bool = False):
+        """
+        释放内存并关闭溢出文件
+
+        Args:
+            keep: 为 True 时把内存中的条目也写到磁盘并保存索引，供之后恢复的会话读取；
+                  否则删除溢出文件和索引
+        """
+        with self._lock:
+            if keep and self.spill_path is not None:
+                self._spill(force=True)
+                if self._disk:
+                    index = {"compressed": self._compressor is not None, "entries": self._disk}
+                    with open(self.index_path, "w", encoding="utf-8") as f:
+                        json.dump(index, f)
+            self._memory.clear()
+            self._memory_bytes = 0
+            self._disk.clear()
+            if self._spill_file is not None:
+                self._spill_file.close()
+                self._spill_file = None
+            if not keep and self.spill_path is not None:
+                for path in (self.spill_path, self.index_path):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+
+
+# 每个研究会话一个内容存储
+_stores: Dict[str, ContentStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_content_store(session_id: Optional[str]) -> ContentStore:
+    """获取或创建会话的内容存储"""
+    session_id = session_id or "default"
+    with _stores_lock:
+        store = _stores.get(session_id)
+        if store is None:
+            store = ContentStore(
+                session_id=session_id,
+                memory_limit=config.CONTENT_STORE_MEMORY_BYTES,
+                spill_dir=resolve_db_path(config.CONTENT_STORE_DIR),
+                zstd=_load_zstd(),
+            )
+            _stores[session_id] = store
+        return store
+
+
+def release_content_store(session_id: Optional[str], keep: bool = False) -> dict:
+    """
+    会话结束时释放内容存储，返回该会话的统计
+
+    keep 为 True 时（研究未完成，之后可能恢复）内容保留在磁盘上
+    """
+    with _stores_lock:
+        store = _stores.pop(session_id or "default", None)
+    if store is None:
+        # 恢复后的会话可能没有再读取正文，仍要删除之前保留的文件
+        spill_dir = resolve_db_path(config.CONTENT_STORE_DIR)
+        if not keep and spill_dir:
+            for suffix in (".bin", ".idx"):
+                try:
+                    os.remove(os.path.join(spill_dir, f"{session_id or 'default'}{suffix}"))
+                except OSError:
+                    pass
+        return {}
+    stats = store.stats()
+    store.close(keep=keep)
+    return stats
+
+
+def stash_contents(session_id: Optional[str], results: List[dict]):
+    """
+    把搜索结果的正文移入内容存储
+
+    每个结果的 content（没有时用 snippet）写入存储，结果中只留下 content_ref 和 content_length
+    """
+    store = get_content_store(session_id)
+    for result in results:
+        text = result.pop("content", None) or result.get("snippet", "")
+        result["content_ref"] = store.put(text)
+        result["content_length"] = len(text)
+
+
+def load_content(session_id: Optional[str], item: dict) -> str:
+    """
+    读取搜索结果或来源的正文（兼容仍内联保存正文的旧状态）
+
+    引用对应的内容已经不在（例如 worker 重启后从检查点恢复）时退回到 snippet
+    """
+    ref = item.get("content_ref")
+    if ref:
+        return get_content_store(session_id).get(ref) or item.get("snippet", "")
+    return item.get("content") or item.get("raw_content") or item.get("snippet", "")
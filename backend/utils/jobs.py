@@ -0,0 +1,317 @@
+"""
+后台研究任务
+
+研究不再绑定在单个 HTTP 请求上：
+- 提交的任务进入有界队列（JOB_QUEUE_SIZE），队列满时拒绝提交
+- 固定数量的 worker 协程（JOB_WORKERS）依次取出任务执行，同时进行的研究数（以及对 LLM/搜索的并发压力）
+  不超过 worker 数
+- 任务产生的事件追加到任务自己的事件日志，任意数量的订阅者可以随时连接，从指定位置回放并继续接收新事件；
+  订阅者断开不影响任务执行
+- 结束的任务在 JOB_RETENTION 秒内保留事件日志，供之后连接的订阅者回放
+- 事件日志有上限：连续的 report_chunk 合并为一条（不超过 CHUNK_MERGE_BYTES），日志总大小超过
+  JOB_EVENTS_MAX_BYTES 时丢弃最早的事件；回放位置已被丢弃的订阅者先收到一个 events_dropped 事件
+"""
+import asyncio
+import json
+import time
+from collections import OrderedDict, deque
+from typing import AsyncIterator, Callable, Deque, Dict, List, Optional
+
+from backend.config import config
+
+# 任务状态
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+# 事件日志中单条合并后的 report_chunk 的字节上限
+CHUNK_MERGE_BYTES = 4096
+
+
+class QueueFullError(Exception):
+    """任务队列已满"""
+
+
+def _event_size(event: dict) -> int:
+    """事件在日志中占用的字节数（按 JSON 编码估算）"""
+    if event.get("event") == "report_chunk":
+        return len(event["data"]["content"].encode("utf-8"))
+    return len(json.dumps(event, ensure_ascii=False, default=str).encode("utf-8"))
+
+
+class Job:
+    """
+    一个后台任务及其事件日志
+
+    日志条目按追加顺序编号（从 0 开始，合并进上一条的报告分块不占新编号，丢弃不改变已有编号）；
+    events 只保存第 dropped 个之后仍保留的条目
+    """
+
+    def __init__(
+        self,
+        job_id: str,
+        events: Callable[[], AsyncIterator[dict]],
+        meta: Optional[dict] = None,
+        max_bytes: int = 0,
+    ):
+        """
+        Args:
+            job_id: 任务 ID
+            events: 返回事件异步迭代器的函数，由 worker 执行时调用
+            meta: 附加信息（随状态一起返回）
+            max_bytes: 事件日志的字节上限，0 表示不限
+        """
+        self.id = job_id
+        self.meta = meta or {}
+        self.status = QUEUED
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.events: Deque[dict] = deque()
+        self.dropped = 0
+        self.bytes = 0
+        self.max_bytes = max_bytes
+        self._sizes: Deque[int] = deque()
+        self._factory = events
+        # 每追加一个事件就唤醒当前等待的订阅者，并换上新的 Event
+        self._changed = asyncio.Event()
+
+    @property
+    def done(self) -> bool:
+        return self.status in (COMPLETED, FAILED, CANCELLED)
+
+    def _notify(self):
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    @property
+    def total(self) -> int:
+        """已追加的事件数（含已丢弃的）"""
+        return self.dropped + len(self.events)
+
+    def append(self, event: dict):
+        size = _event_size(event)
+        last = self.events[-1] if self.events else None
+        if (
+            event.get("event") == "report_chunk"
+            and last is not None
+            and last.get("event") == "report_chunk"
+            and self._sizes[-1] + size <= CHUNK_MERGE_BYTES
+        ):
+            # 换成新的事件对象而不是原地修改：旧对象可能已经交给订阅者发送
+            content = last["data"]["content"] + event["data"]["content"]
+            self.events[-1] = {"event": "report_chunk", "data": {"content": content}}
+            self._sizes[-1] += size
+        else:
+            self.events.append(event)
+            self._sizes.append(size)
+        self.bytes += size
+
+        # 超出上限时丢弃最早的事件（至少保留最后一个，worker 据此判断任务是否失败）
+        while self.max_bytes and self.bytes > self.max_bytes and len(self.events) > 1:
+            self.events.popleft()
+            self.bytes -= self._sizes.popleft()
+            self.dropped += 1
+        self._notify()
+
+    def finish(self, status: str, error: Optional[str] = None):
+        self.status = status
+        self.error = error
+        self.finished_at = time.time()
+        self._notify()
+
+    async def subscribe(self, after: int = 0) -> AsyncIterator[dict]:
+        """
+        从第 after 个事件开始回放事件日志，之后继续产出新事件，直到任务结束
+
+        日志末尾的 report_chunk 在任务运行时还会合并新的分块，只产出新增的部分；
+        第 after 个事件已被丢弃时先产出 events_dropped（带丢弃的事件数），再从最早保留的事件继续
+        """
+        index = max(0, after)
+        # 已产出的 events[index] 的报告内容长度（只有日志末尾的 report_chunk 会继续增长）
+        sent = 0
+        while True:
+            if index < self.dropped:
+                yield {"event": "events_dropped", "data": {"dropped": self.dropped - index, "next": self.dropped}}
+                index, sent = self.dropped, 0
+                continue
+
+            if index < self.total:
+                event = self.events[index - self.dropped]
+                if event.get("event") != "report_chunk":
+                    index += 1
+                    yield event
+                    continue
+                content = event["data"]["content"]
+                growing = index == self.total - 1 and not self.done
+                if len(content) > sent:
+                    chunk = {"event": "report_chunk", "data": {"content": content[sent:]}} if sent else event
+                    index, sent = (index, len(content)) if growing else (index + 1, 0)
+                    yield chunk
+                    continue
+                if not growing:
+                    index, sent = index + 1, 0
+                    continue
+            elif self.done:
+                return
+            await self._changed.wait()
+
+    def info(self) -> dict:
+        """任务状态"""
+        return {
+            "research_id": self.id,
+            "status": self.status,
+            "error": self.error,
+            "events": self.total,
+            "dropped_events": self.dropped,
+            "event_bytes": self.bytes,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            **self.meta,
+        }
+
+
+class JobManager:
+    """有界任务队列 + 固定数量的 worker 协程"""
+
+    def __init__(self, workers: int = 4, max_queue: int = 100, retention: float = 3600, max_event_bytes: int = 0):
+        self.worker_count = max(1, workers)
+        self.retention = retention
+        self.max_event_bytes = max_event_bytes
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, max_queue))
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._workers: List[asyncio.Task] = []
+        self._running = 0
+        self._stats = {"submitted": 0, "rejected": 0, "completed": 0, "failed": 0, "cancelled": 0}
+
+    def start(self):
+        """启动 worker（需要在事件循环中调用）"""
+        if self._workers:
+            return
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"research-worker-{i}")
+            for i in range(self.worker_count)
+        ]
+
+    async def stop(self):
+        """停止 worker；正在执行的任务被取消，排队中的任务标记为取消"""
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        for job in self._jobs.values():
+            if not job.done:
+                job.finish(CANCELLED)
+
+    def submit(self, job_id: str, events: Callable[[], AsyncIterator[dict]], **meta) -> Job:
+        """
+        提交任务
+
+        Raises:
+            QueueFullError: 排队任务数已达 JOB_QUEUE_SIZE
+        """
+        self._evict()
+        job = Job(job_id, events, meta, max_bytes=self.max_event_bytes)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self._stats["rejected"] += 1
+            raise QueueFullError(f"job queue is full ({self._queue.maxsize})")
+        self._jobs[job_id] = job
+        self._stats["submitted"] += 1
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def position(self, job: Job) -> int:
+        """排队中的任务前面还有几个任务（不在排队时为 0）"""
+        if job.status != QUEUED:
+            return 0
+        ahead = 0
+        for other in self._jobs.values():
+            if other is job:
+                break
+            if other.status == QUEUED:
+                ahead += 1
+        return ahead
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            if job.done:
+                continue
+            job.status = RUNNING
+            job.started_at = time.time()
+            self._running += 1
+            try:
+                async for event in job._factory():
+                    job.append(event)
+            except asyncio.CancelledError:
+                job.finish(CANCELLED)
+                self._stats["cancelled"] += 1
+                raise
+            except Exception as e:
+                job.finish(FAILED, str(e))
+                self._stats["failed"] += 1
+            else:
+                # 事件流自己报告的错误（error 事件）也算失败
+                failed = job.events and job.events[-1].get("event") == "error"
+                if failed:
+                    job.finish(FAILED, job.events[-1].get("data", {}).get("message"))
+                    self._stats["failed"] += 1
+                else:
+                    job.finish(COMPLETED)
+                    self._stats["completed"] += 1
+            finally:
+                self._running -= 1
+
+    def _evict(self):
+        """丢弃超过保留时间的已结束任务"""
+        cutoff = time.time() - self.retention
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.done and job.finished_at is not None and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            **self._stats,
+            "workers": self.worker_count,
+            "running": self._running,
+            "queued": self._queue.qsize(),
+            "max_queue": self._queue.maxsize,
+            "retained": len(self._jobs),
+            "retained_event_bytes": sum(job.bytes for job in self._jobs.values()),
+        }
+
+
+# 全局任务管理器
+_job_manager: Optional[JobManager] = None
+
+
+def get_job_manager() -> JobManager:
+    """获取或创建任务管理器"""
+    global _job_manager
+    if _job_manager is None:
+        _job_manager = JobManager(
+            workers=config.JOB_WORKERS,
+            max_queue=config.JOB_QUEUE_SIZE,
+            retention=config.JOB_RETENTION,
+            max_event_bytes=config.JOB_EVENTS_MAX_BYTES,
+        )
+    return _job_manager
+
+
+async def close_job_manager():
+    """应用关闭时停止 worker"""
+    global _job_manager
+    manager, _job_manager = _job_manager, None
+    if manager is not None:
+        await manager.stop()
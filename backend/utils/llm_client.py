@@ -1,28 +1,382 @@
-from langchain_openai import ChatOpenAI
+import asyncio
+import hashlib
+import json
+import threading
+from typing import TYPE_CHECKING, AsyncIterator, Callable, Dict, Optional, Tuple, Type, TypeVar
+
+import httpx
 from pydantic import BaseModel
-from typing import Type, TypeVar
 
 from backend.config import config
+from backend.utils.cache import TieredCache, resolve_db_path
+from backend.utils.scheduler import (
+    PRIORITY_INTERACTIVE,
+    PRIORITY_NORMAL,
+    RateLimitExhaustedError,
+    get_scheduler,
+    is_rate_limited,
+    retry_after_seconds,
+)
+from backend.utils.text_processing import estimate_tokens
+
+if TYPE_CHECKING:
+    from langchain_openai import ChatOpenAI
 
 T = TypeVar("T", bound=BaseModel)
 
 
-def get_llm(temperature: float = 0.7) -> ChatOpenAI:
-    """获取 DeepSeek LLM 实例"""
-    return ChatOpenAI(
-        model="deepseek-chat",
-        api_key=config.DEEPSEEK_API_KEY,
-        base_url=config.DEEPSEEK_BASE_URL,
-        temperature=temperature,
+# 进程级 LLM 客户端注册表
+# 同一 base_url 的所有实例共用一组长连接池（同步 + 异步），
+# ChatOpenAI 实例按 (base_url, model, temperature) 复用
+_registry_lock = threading.Lock()
+_http_clients: Dict[str, Tuple[httpx.Client, httpx.AsyncClient]] = {}
+_llm_instances: Dict[Tuple[str, str, float], "ChatOpenAI"] = {}
+
+
+def _http2_enabled() -> bool:
+    """HTTP/2 需要安装 h2，未安装时退回 HTTP/1.1"""
+    if not config.LLM_HTTP2:
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        print("LLM_HTTP2 is enabled but 'h2' is not installed, falling back to HTTP/1.1")
+        return False
+    return True
+
+
+def _get_http_clients(base_url: str) -> Tuple[httpx.Client, httpx.AsyncClient]:
+    """获取 base_url 对应的连接池（调用方持有锁）"""
+    clients = _http_clients.get(base_url)
+    if clients is None:
+        limits = httpx.Limits(
+            max_connections=config.LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=config.LLM_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=config.LLM_KEEPALIVE_EXPIRY,
+        )
+        http2 = _http2_enabled()
+        clients = (
+            httpx.Client(limits=limits, http2=http2),
+            httpx.AsyncClient(limits=limits, http2=http2),
+        )
+        _http_clients[base_url] = clients
+    return clients
+
+
+def get_llm(temperature: float = 0.7) -> "ChatOpenAI":
+    """获取 DeepSeek LLM 实例（进程内共享，复用长连接）"""
+    # langchain_openai 导入较慢，首次创建实例时才导入
+    from langchain_openai import ChatOpenAI
+
+    key = (config.DEEPSEEK_BASE_URL, config.DEEPSEEK_MODEL, temperature)
+
+    with _registry_lock:
+        llm = _llm_instances.get(key)
+        if llm is None:
+            http_client, http_async_client = _get_http_clients(config.DEEPSEEK_BASE_URL)
+            llm = ChatOpenAI(
+                model=config.DEEPSEEK_MODEL,
+                api_key=config.DEEPSEEK_API_KEY,
+                base_url=config.DEEPSEEK_BASE_URL,
+                temperature=temperature,
+                http_client=http_client,
+                http_async_client=http_async_client,
+            )
+            _llm_instances[key] = llm
+        return llm
+
+
+async def close_llm_clients():
+    """关闭所有 LLM 连接池（应用关闭时调用）"""
+    with _registry_lock:
+        clients = list(_http_clients.values())
+        _http_clients.clear()
+        _llm_instances.clear()
+
+    for http_client, http_async_client in clients:
+        http_client.close()
+        await http_async_client.aclose()
+
+
+# 全局 LLM 响应缓存实例
+_llm_cache = None
+
+
+def get_llm_cache() -> TieredCache:
+    """获取或创建 LLM 响应缓存"""
+    global _llm_cache
+    if _llm_cache is None:
+        _llm_cache = TieredCache(
+            namespace="llm_response",
+            ttl=config.LLM_CACHE_TTL,
+            max_memory_entries=config.LLM_CACHE_MAX_MEMORY,
+            max_disk_entries=config.LLM_CACHE_MAX_DISK,
+            db_path=resolve_db_path(config.CACHE_DB_PATH),
+        )
+    return _llm_cache
+
+
+def llm_cache_key(prompt: str, temperature: float, model: Optional[str] = None) -> str:
+    """缓存键：模型、温度和完整 prompt 的哈希"""
+    payload = json.dumps(
+        {"model": model or config.DEEPSEEK_MODEL, "temperature": temperature, "prompt": prompt},
+        ensure_ascii=False,
+        sort_keys=True,
     )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _estimated_tokens(prompt: str) -> int:
+    """限速预扣的 token 数：prompt 估算 + 预估输出"""
+    return estimate_tokens(prompt) + config.LLM_RATE_LIMIT_OUTPUT_TOKENS
+
+
+def _usage_tokens(response, default: int) -> int:
+    """响应中的实际 token 用量，没有用量信息时沿用预估值"""
+    usage = getattr(response, "usage_metadata", None) or {}
+    return usage.get("total_tokens") or default
+
+
+def _rate_limit_attempts() -> int:
+    return max(0, config.RATE_LIMIT_RETRIES) + 1
+
 
+async def _ainvoke_scheduled(
+    prompt: str,
+    temperature: float,
+    session_id: Optional[str],
+    priority: int,
+    timeout: Optional[float],
+    json_mode: bool = False,
+):
+    """
+    经调度器排队后调用 LLM；429 时暂停限速桶并重新排队，超时只计算 LLM 调用本身
 
-def get_structured_llm(schema: Type[T], temperature: float = 0.3) -> ChatOpenAI:
-    """获取带结构化输出的 LLM 实例"""
-    llm = ChatOpenAI(
-        model="deepseek-chat",
-        api_key=config.DEEPSEEK_API_KEY,
-        base_url=config.DEEPSEEK_BASE_URL,
-        temperature=temperature,
+    Raises:
+        RateLimitExhaustedError: RATE_LIMIT_RETRIES 次重试后仍被限流
+    """
+    scheduler = get_scheduler()
+    estimated = _estimated_tokens(prompt)
+    attempts = _rate_limit_attempts()
+
+    for attempt in range(attempts):
+        async with scheduler.acquire("llm", session_id, priority, llm_tokens=estimated) as grant:
+            try:
+                llm = get_llm(temperature=temperature)
+                if json_mode:
+                    llm = llm.bind(response_format={"type": "json_object"})
+                call = llm.ainvoke(prompt)
+                response = await (asyncio.wait_for(call, timeout) if timeout else call)
+            except Exception as e:
+                if not is_rate_limited(e):
+                    raise
+                if attempt == attempts - 1:
+                    scheduler.exhausted("llm")
+                    raise RateLimitExhaustedError("llm", attempts, e) from e
+                scheduler.throttle("llm", retry_after_seconds(e, config.RATE_LIMIT_BACKOFF))
+                continue
+            grant.settle({"llm_tokens": _usage_tokens(response, estimated)})
+            return response
+
+
+async def ainvoke_llm(
+    prompt: str,
+    temperature: float = 0.7,
+    use_cache: bool = True,
+    validate: Optional[Callable[[str], bool]] = None,
+    session_id: Optional[str] = None,
+    priority: int = PRIORITY_NORMAL,
+    timeout: Optional[float] = None,
+    json_mode: bool = False,
+) -> str:
+    """
+    调用 LLM 并返回文本内容，相同 (模型, 温度, prompt) 的响应直接从缓存读取
+
+    Args:
+        prompt: 完整渲染后的 prompt
+        temperature: 采样温度
+        use_cache: 为 False 时跳过缓存（既不读也不写）
+        validate: 可选校验函数，只有校验通过的响应才会写入缓存（未通过校验的缓存条目视为未命中）
+        session_id: 研究会话 ID（限速排队时按会话公平分配）
+        priority: 排队优先级（backend.utils.scheduler.PRIORITY_*）
+        timeout: LLM 调用超时（秒），不含排队时间
+        json_mode: 要求模型只输出 JSON 对象（response_format=json_object，LLM_JSON_MODE 关闭时忽略）
+
+    Returns:
+        LLM 响应文本
+    """
+    cache_enabled = use_cache and config.LLM_CACHE_ENABLED
+    key = llm_cache_key(prompt, temperature)
+
+    if cache_enabled:
+        cached = await get_llm_cache().aget(key)
+        if cached is not None and (validate is None or validate(cached)):
+            return cached
+
+    response = await _ainvoke_scheduled(
+        prompt, temperature, session_id, priority, timeout, json_mode=json_mode and config.LLM_JSON_MODE
     )
-    return llm.with_structured_output(schema)
+    content = response.content
+
+    if cache_enabled and content and (validate is None or validate(content)):
+        get_llm_cache().set(key, content)
+
+    return content
+
+
+class StructuredOutputError(ValueError):
+    """LLM 输出在修复重试后仍未通过校验"""
+
+
+# 结构化输出的进程累计统计（按节点）：
+# calls 调用次数，valid 首次即通过校验，repaired 修复后通过，failed 修复后仍失败（节点使用兜底结果），
+# wasted_iterations 兜底结果导致的额外研究轮次
+_structured_stats: Dict[str, Dict[str, int]] = {}
+
+
+def _structured_counter(node: str) -> Dict[str, int]:
+    counter = _structured_stats.get(node)
+    if counter is None:
+        counter = _structured_stats[node] = {
+            "calls": 0, "valid": 0, "repaired": 0, "failed": 0, "wasted_iterations": 0,
+        }
+    return counter
+
+
+def record_structured(node: str, outcome: str, n: int = 1):
+    """记录结构化输出结果（outcome 为 valid / repaired / failed），也供批量摘要等自行校验的调用方使用"""
+    counter = _structured_counter(node)
+    counter["calls"] += n
+    counter[outcome] += n
+
+
+def record_wasted_iteration(node: str):
+    """记录一次因输出无法解析而多走的研究轮次"""
+    _structured_counter(node)["wasted_iterations"] += 1
+
+
+def structured_output_stats() -> Dict[str, dict]:
+    """各节点的结构化输出统计和解析失败率"""
+    stats = {}
+    for node, counter in _structured_stats.items():
+        calls = counter["calls"]
+        stats[node] = {
+            **counter,
+            "parse_failure_rate": (calls - counter["valid"]) / calls if calls else 0.0,
+            "failure_rate": counter["failed"] / calls if calls else 0.0,
+        }
+    return stats
+
+
+def parse_structured(content: str, schema: Type[T]) -> T:
+    """
+    从响应中取出 JSON 对象并按模型校验（兼容包在代码块中或前后带说明文字的输出）
+
+    Raises:
+        ValueError: 没有 JSON 对象或校验失败（pydantic.ValidationError 是 ValueError 的子类）
+    """
+    start_idx = content.find('{')
+    end_idx = content.rfind('}') + 1
+    if start_idx == -1 or end_idx <= start_idx:
+        raise ValueError("No JSON object found")
+    return schema.model_validate_json(content[start_idx:end_idx])
+
+
+def _is_valid(content: str, schema: Type[BaseModel]) -> bool:
+    try:
+        parse_structured(content, schema)
+    except ValueError:
+        return False
+    return True
+
+
+async def ainvoke_structured(
+    prompt: str,
+    schema: Type[T],
+    node: str,
+    temperature: float = 0.7,
+    session_id: Optional[str] = None,
+    priority: int = PRIORITY_NORMAL,
+    timeout: Optional[float] = None,
+) -> T:
+    """
+    以 JSON 模式调用 LLM 并按 Pydantic 模型校验
+
+    校验失败时把校验错误、原输出和 JSON Schema 交给 LLM 修复一次（不重发原 prompt，开销很小）；
+    只有通过校验的响应才会写入缓存。
+
+    Args:
+        node: 节点名（统计按节点汇总）
+
+    Raises:
+        StructuredOutputError: 修复后仍未通过校验
+    """
+    def validate(text: str) -> bool:
+        return _is_valid(text, schema)
+
+    content = await ainvoke_llm(
+        prompt, temperature=temperature, validate=validate,
+        session_id=session_id, priority=priority, timeout=timeout, json_mode=True,
+    )
+    try:
+        parsed = parse_structured(content, schema)
+    except ValueError as e:
+        error = str(e)
+    else:
+        record_structured(node, "valid")
+        return parsed
+
+    # 延迟导入，避免 backend.utils 导入时加载 prompts
+    from backend.prompts import REPAIR_PROMPT
+
+    repair_prompt = REPAIR_PROMPT.format(
+        error=error[:1000],
+        output=content[:config.LLM_REPAIR_MAX_CHARS],
+        schema=json.dumps(schema.model_json_schema(), ensure_ascii=False),
+    )
+    repaired = await ainvoke_llm(
+        repair_prompt, temperature=0.0, validate=validate,
+        session_id=session_id, priority=priority, timeout=timeout, json_mode=True,
+    )
+    try:
+        parsed = parse_structured(repaired, schema)
+    except ValueError as e:
+        record_structured(node, "failed")
+        raise StructuredOutputError(f"{node} output failed validation after repair: {e}") from e
+    record_structured(node, "repaired")
+    return parsed
+
+
+async def astream_llm(
+    prompt: str,
+    temperature: float = 0.7,
+    session_id: Optional[str] = None,
+    priority: int = PRIORITY_INTERACTIVE,
+) -> AsyncIterator[str]:
+    """
+    经调度器排队后流式调用 LLM，逐块产出文本（默认以最高优先级排队，用户正在等待输出）
+
+    在产出第一块之前收到 429 时暂停限速桶并重新排队；已经开始输出后的错误直接抛出
+    """
+    scheduler = get_scheduler()
+    estimated = _estimated_tokens(prompt)
+    attempts = _rate_limit_attempts()
+
+    for attempt in range(attempts):
+        async with scheduler.acquire("llm", session_id, priority, llm_tokens=estimated) as grant:
+            output_tokens = 0
+            try:
+                async for chunk in get_llm(temperature=temperature).astream(prompt):
+                    if chunk.content:
+                        output_tokens += estimate_tokens(chunk.content)
+                        yield chunk.content
+            except Exception as e:
+                if output_tokens or not is_rate_limited(e):
+                    raise
+                if attempt == attempts - 1:
+                    scheduler.exhausted("llm")
+                    raise RateLimitExhaustedError("llm", attempts, e) from e
+                scheduler.throttle("llm", retry_after_seconds(e, config.RATE_LIMIT_BACKOFF))
+                continue
+            grant.settle({"llm_tokens": estimate_tokens(prompt) + output_tokens})
+            return
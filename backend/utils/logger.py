@@ -20,6 +20,8 @@ NODE_COLORS = {
     'searcher': Colors.CYAN,
     'searcher_basic': Colors.CYAN,
     'searcher_advanced': Colors.CYAN,
+    'deduplicator': Colors.CYAN,
+    'search_summarize': Colors.CYAN,
     'summarizer': Colors.PINK,
     'analyzer': Colors.YELLOW,
     'writer': Colors.GREEN,
@@ -50,6 +52,12 @@ def log_info(node: str, message: str):
     print(f"{Colors.GRAY}{timestamp}{Colors.RESET} {color}│{Colors.RESET} {message}")
 
 
+def log_warning(node: str, message: str):
+    """警告（调用失败、降级处理等，不截断）"""
+    timestamp = datetime.now().strftime("%H:%M:%S")
+    print(f"{Colors.GRAY}{timestamp}{Colors.RESET} {Colors.YELLOW}! {node}: {message}{Colors.RESET}")
+
+
 def log_detail(node: str, key: str, value):
     """详细信息（键值对）"""
     color = NODE_COLORS.get(node, Colors.GRAY)
@@ -0,0 +1,142 @@
+"""
+近似重复内容检测（MinHash + LSH）
+
+转载新闻、镜像文档等 URL 不同但内容几乎相同的来源，
+用字符 shingle 的 MinHash 签名估计 Jaccard 相似度，
+再用 LSH 分桶只比较候选对，整体复杂度接近 O(n)。
+
+签名使用跨进程稳定的哈希，可以随来源保存在状态中，之后的轮次直接复用。
+"""
+import re
+import unicodedata
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+# 参与签名的最大字符数（转载内容通常开头就高度相似）
+MAX_SIGNATURE_CHARS = 2000
+
+_MASK64 = (1 << 64) - 1
+_EMPTY = _MASK64
+
+
+def text_shingles(text: str, size: int = 4) -> set:
+    """规范化后取字符 n-gram（对中英文都适用，无需分词）"""
+    normalized = unicodedata.normalize("NFKC", text[:MAX_SIGNATURE_CHARS]).lower()
+    normalized = re.sub(r"[\W_]+", "", normalized)
+    if len(normalized) <= size:
+        return {normalized} if normalized else set()
+    return {normalized[i:i + size] for i in range(len(normalized) - size + 1)}
+
+
+def minhash_signature(text: str, num_perm: int = 64, shingle_size: int = 4) -> Optional[Tuple[int, ...]]:
+    """
+    计算 MinHash 签名（单次哈希 + 分桶，即 one-permutation hashing）
+
+    每个 shingle 只哈希一次，按哈希值落入 num_perm 个桶，桶内取最小值；
+    空桶从右侧最近的非空桶借值（densification），保证签名可比较。
+
+    哈希使用 zlib.crc32：内置 hash() 对字符串按进程随机化，签名无法跨进程（检查点恢复后）比较；
+    crc32 在 C 中计算，比 hashlib 快数倍，相似度估计误差与 64 位哈希相当。
+
+    Returns:
+        长度为 num_perm 的签名；文本为空时返回 None
+    """
+    shingles = text_shingles(text, shingle_size)
+    if not shingles:
+        return None
+
+    bins = [_EMPTY] * num_perm
+    for shingle in shingles:
+        h = zlib.crc32(shingle.encode("utf-8"))
+        idx = h % num_perm
+        value = h // num_perm
+        if value < bins[idx]:
+            bins[idx] = value
+
+    # densification：空桶借用右侧（循环）第一个非空桶的值，并按距离偏移避免碰撞
+    if _EMPTY in bins:
+        filled = [i for i, v in enumerate(bins) if v != _EMPTY]
+        for i in range(num_perm):
+            if bins[i] == _EMPTY:
+                distance, source = min(((j - i) % num_perm, j) for j in filled)
+                bins[i] = (bins[source] + distance * 0x9E3779B97F4A7C15) & _MASK64
+
+    return tuple(bins)
+
+
+def estimate_similarity(sig1: Tuple[int, ...], sig2: Tuple[int, ...]) -> float:
+    """由签名估计 Jaccard 相似度"""
+    equal = sum(1 for a, b in zip(sig1, sig2) if a == b)
+    return equal / len(sig1)
+
+
+def choose_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """选择 LSH 的 (bands, rows)，使 S 曲线拐点 (1/b)^(1/r) 最接近阈值"""
+    best = (num_perm, 1)
+    best_error = float("inf")
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        error = abs((1 / bands) ** (1 / rows) - threshold)
+        if error < best_error:
+            best, best_error = (bands, rows), error
+    return best
+
+
+class NearDuplicateIndex:
+    """MinHash LSH 索引：插入文档的同时返回与之近似重复的已有文档"""
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 64, shingle_size: int = 4):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.bands, self.rows = choose_bands(num_perm, threshold)
+        self._buckets: List[Dict[Tuple[int, ...], List[str]]] = [{} for _ in range(self.bands)]
+        self._signatures: Dict[str, Tuple[int, ...]] = {}
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def query(self, signature: Tuple[int, ...]) -> Optional[Tuple[str, float]]:
+        """查找与签名最相似且超过阈值的已有文档"""
+        candidates = set()
+        for band, buckets in enumerate(self._buckets):
+            key = signature[band * self.rows:(band + 1) * self.rows]
+            candidates.update(buckets.get(key, ()))
+
+        best: Optional[Tuple[str, float]] = None
+        for candidate in candidates:
+            similarity = estimate_similarity(signature, self._signatures[candidate])
+            if similarity >= self.threshold and (best is None or similarity > best[1]):
+                best = (candidate, similarity)
+        return best
+
+    def insert(self, key: str, signature: Tuple[int, ...]):
+        """将签名加入索引"""
+        self._signatures[key] = signature
+        for band, buckets in enumerate(self._buckets):
+            buckets.setdefault(signature[band * self.rows:(band + 1) * self.rows], []).append(key)
+
+    def signature(self, text: str) -> Optional[Tuple[int, ...]]:
+        """按索引的参数计算签名"""
+        return minhash_signature(text, self.num_perm, self.shingle_size)
+
+    def add(self, key: str, text: str) -> Optional[Tuple[str, float]]:
+        """
+        检测并登记文档
+
+        Returns:
+            (重复的已有文档 key, 估计相似度)；不重复时登记该文档并返回 None
+        """
+        signature = self.signature(text)
+        if signature is None:
+            return None
+        return self.add_signature(key, signature)
+
+    def add_signature(self, key: str, signature: Tuple[int, ...]) -> Optional[Tuple[str, float]]:
+        """add 的已有签名版本"""
+        match = self.query(signature)
+        if match is None:
+            self.insert(key, signature)
+        return match
@@ -0,0 +1,127 @@
+"""
+研究报告缓存
+
+热门主题会被反复提交，每次都要重新走完 planner → search → summarize → analyze → write。
+完成的报告按「规范化主题 + mode + max_iterations + max_detail_fetches」缓存：
+- REPORT_CACHE_TTL 内的报告是新鲜的，直接回放
+- 超过 TTL 但仍在 REPORT_CACHE_STALE_TTL 窗口内的报告是过期的：立即回放，同时在后台重新研究并更新缓存
+  （stale-while-revalidate；窗口为 0 时过期即未命中）
+- 内存 LRU + SQLite 两级存储（TieredCache），条目数受 REPORT_CACHE_MAX_MEMORY / REPORT_CACHE_MAX_DISK 限制
+"""
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from backend.config import config
+from backend.utils.cache import TieredCache, resolve_db_path
+from backend.utils.search_cache import normalize_query
+
+
+class ReportCache:
+    """完成的研究报告缓存"""
+
+    def __init__(
+        self,
+        enabled: bool = True,
+        ttl: float = 3600,
+        stale_ttl: float = 0,
+        db_path: Optional[str] = None,
+    ):
+        """
+        Args:
+            enabled: 是否启用
+            ttl: 报告保持新鲜的时间（秒）
+            stale_ttl: 过期后仍可回放（同时后台刷新）的时间（秒）
+            db_path: SQLite 文件路径，为空时只使用内存层
+        """
+        self.enabled = enabled
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        # 条目在新鲜期和过期窗口都结束后才从底层缓存中过期
+        self.reports = TieredCache(
+            namespace="report",
+            ttl=ttl + stale_ttl,
+            max_memory_entries=config.REPORT_CACHE_MAX_MEMORY,
+            max_disk_entries=config.REPORT_CACHE_MAX_DISK,
+            db_path=db_path,
+        )
+        # 正在后台刷新的键，同一键只刷新一次
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._stats = {"fresh_hits": 0, "stale_hits": 0, "refreshes": 0}
+
+    @staticmethod
+    def key(topic: str, mode: str, max_iterations: int, max_detail_fetches: int) -> str:
+        return f"{mode}|{max_iterations}|{max_detail_fetches}|{normalize_query(topic)}"
+
+    async def get(self, key: str) -> Optional[Tuple[dict, bool]]:
+        """
+        读取缓存的报告
+
+        Returns:
+            (报告条目, 是否过期)；未命中返回 None
+        """
+        if not self.enabled:
+            return None
+        entry = await self.reports.aget(key)
+        if entry is None:
+            return None
+
+        stale = time.time() - entry["created_at"] > self.ttl
+        with self._lock:
+            self._stats["stale_hits" if stale else "fresh_hits"] += 1
+        return entry, stale
+
+    def set(self, key: str, report: str, sources_count: int, iterations: int):
+        """缓存一份完成的报告"""
+        if not self.enabled or not report:
+            return
+        self.reports.set(
+            key,
+            {
+                "report": report,
+                "sources_count": sources_count,
+                "iterations": iterations,
+                "created_at": time.time(),
+            },
+        )
+
+    def begin_refresh(self, key: str) -> bool:
+        """登记后台刷新，已有刷新在进行时返回 False"""
+        with self._lock:
+            if key in self._refreshing:
+                return False
+            self._refreshing.add(key)
+            self._stats["refreshes"] += 1
+            return True
+
+    def end_refresh(self, key: str):
+        with self._lock:
+            self._refreshing.discard(key)
+
+    def stats(self) -> Dict[str, object]:
+        """命中/未命中计数"""
+        with self._lock:
+            stats = {**self._stats, "refreshing": len(self._refreshing)}
+        return {
+            "enabled": self.enabled,
+            **stats,
+            "reports": self.reports.stats(),
+        }
+
+
+# 全局报告缓存实例
+_report_cache = None
+
+
+def get_report_cache() -> ReportCache:
+    """获取或创建报告缓存"""
+    global _report_cache
+    if _report_cache is None:
+        _report_cache = ReportCache(
+            enabled=config.REPORT_CACHE_ENABLED,
+            ttl=config.REPORT_CACHE_TTL,
+            stale_ttl=config.REPORT_CACHE_STALE_TTL,
+            db_path=resolve_db_path(config.CACHE_DB_PATH),
+        )
+    return _report_cache
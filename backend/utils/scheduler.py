@@ -0,0 +1,299 @@
+"""
+出站调用调度（DeepSeek / Tavily）
+
+所有会话的 LLM 和搜索请求都经过同一个进程级调度器：
+- 令牌桶限速：LLM 请求数（LLM_RATE_LIMIT_RPM）、LLM token 数（LLM_RATE_LIMIT_TPM）、
+  搜索请求数（SEARCH_RATE_LIMIT_RPM），桶容量为 RATE_LIMIT_BURST_SECONDS 秒的额度；速率为 0 表示不限
+- 优先级：writer 流式输出（用户正在等待）先于 planner / analyzer / 搜索，再先于后台摘要
+- 同一优先级内按会话加权公平排队（WFQ）：每个请求按所属会话的虚拟完成时间排序，
+  一个会话一次提交大量请求不会让其他会话排在它全部请求之后
+- 收到 429 时暂停对应资源的令牌桶，请求重新排队而不是直接失败；过载时表现为排队变长，吞吐平滑下降。
+  重试 RATE_LIMIT_RETRIES 次仍被限流时计入 exhausted 统计，LLM 调用抛出 RateLimitExhaustedError
+
+LLM token 数在请求前按 prompt 估算，响应返回后按实际用量结算差额。
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional
+
+from backend.config import config
+
+# 优先级（数值越小越先执行）
+PRIORITY_INTERACTIVE = 0
+PRIORITY_NORMAL = 1
+PRIORITY_BACKGROUND = 2
+
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_NORMAL: "normal",
+    PRIORITY_BACKGROUND: "background",
+}
+
+
+class RateLimitExhaustedError(Exception):
+    """429 重试次数（RATE_LIMIT_RETRIES）用尽后仍被限流"""
+
+    def __init__(self, resource: str, attempts: int, error: Exception):
+        super().__init__(f"{resource} rate limited after {attempts} attempts: {error}")
+        self.resource = resource
+        self.attempts = attempts
+
+
+class TokenBucket:
+    """令牌桶：按固定速率补充，容量限制突发量；余额可以为负（结算超支）"""
+
+    def __init__(self, rate_per_minute: float, burst_seconds: float):
+        self.rate = rate_per_minute / 60
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+        # 429 后暂停到该时刻，期间不放行也不补充（不限速的桶同样暂停）
+        self._paused_until = 0.0
+
+    @property
+    def unlimited(self) -> bool:
+        return self.rate <= 0
+
+    def _refill(self, now: float):
+        start = max(self._updated, self._paused_until)
+        if now > start:
+            self.tokens = min(self.capacity, self.tokens + (now - start) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """还需要等待多久才能取出 amount（超过容量的请求在桶满时放行）"""
+        if now < self._paused_until:
+            return self._paused_until - now
+        if self.unlimited:
+            return 0.0
+        self._refill(now)
+        needed = min(amount, self.capacity)
+        if self.tokens >= needed:
+            return 0.0
+        return (needed - self.tokens) / self.rate
+
+    def take(self, amount: float):
+        if not self.unlimited:
+            self.tokens -= amount
+
+    def pause(self, seconds: float, now: float):
+        """暂停 seconds 秒，之后从空桶开始补充"""
+        if not self.unlimited:
+            self._refill(now)
+            self.tokens = min(self.tokens, 0.0)
+        self._paused_until = max(self._paused_until, now + seconds)
+
+
+class Grant:
+    """一次获准的调用；LLM 调用结束后用 settle 按实际 token 数结算"""
+
+    def __init__(self, scheduler: "RateScheduler", resource: str, costs: Dict[str, float]):
+        self._scheduler = scheduler
+        self.resource = resource
+        self.costs = costs
+
+    def settle(self, actual: Dict[str, float]):
+        """按实际用量补扣或退还（只处理预扣过的桶）"""
+        for bucket, amount in actual.items():
+            estimated = self.costs.get(bucket)
+            if estimated is not None:
+                self._scheduler.buckets[bucket].take(amount - estimated)
+                self.costs[bucket] = amount
+
+
+class _Waiter:
+    __slots__ = ("priority", "tag", "seq", "costs", "future", "enqueued_at")
+
+    def __init__(self, priority: int, tag: float, seq: int, costs: Dict[str, float], future: asyncio.Future):
+        self.priority = priority
+        self.tag = tag
+        self.seq = seq
+        self.costs = costs
+        self.future = future
+        self.enqueued_at = time.monotonic()
+
+    def __lt__(self, other: "_Waiter") -> bool:
+        return (self.priority, self.tag, self.seq) < (other.priority, other.tag, other.seq)
+
+
+class _ResourceQueue:
+    """一个资源（llm / search）的等待队列和公平排队状态"""
+
+    def __init__(self, buckets: List[str]):
+        self.buckets = buckets
+        self.heap: List[_Waiter] = []
+        # 加权公平排队：全局虚拟时间 + 每个会话最近一个请求的虚拟完成时间
+        self.virtual_time = 0.0
+        self.session_finish: Dict[str, float] = {}
+        self.timer: Optional[asyncio.TimerHandle] = None
+        self.stats = {
+            "granted": 0,
+            "rate_limited": 0,
+            "exhausted": 0,
+            "max_queue_depth": 0,
+            "wait_seconds": {name: 0.0 for name in PRIORITY_NAMES.values()},
+            "granted_by_priority": {name: 0 for name in PRIORITY_NAMES.values()},
+        }
+
+
+class RateScheduler:
+    """进程级出站调用调度器"""
+
+    def __init__(self, buckets: Dict[str, TokenBucket], resources: Dict[str, List[str]]):
+        """
+        Args:
+            buckets: 桶名 → 令牌桶
+            resources: 资源名 → 该资源每次调用需要扣除的桶（第一个桶的扣除量作为公平排队的代价）
+        """
+        self.buckets = buckets
+        self._queues = {name: _ResourceQueue(names) for name, names in resources.items()}
+        self._seq = itertools.count()
+
+    def _enqueue(self, resource: str, costs: Dict[str, float], session: str, priority: int) -> asyncio.Future:
+        queue = self._queues[resource]
+        # 会话的下一个请求从 max(虚拟时间, 该会话上一个请求的完成时间) 开始排
+        cost = costs[queue.buckets[0]]
+        start = max(queue.virtual_time, queue.session_finish.get(session, 0.0))
+        tag = start + cost
+        queue.session_finish[session] = tag
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(queue.heap, _Waiter(priority, tag, next(self._seq), costs, future))
+        queue.stats["max_queue_depth"] = max(queue.stats["max_queue_depth"], len(queue.heap))
+        self._dispatch(resource)
+        return future
+
+    def _dispatch(self, resource: str):
+        """按顺序放行队首请求，额度不足时在额度恢复的时刻再试"""
+        queue = self._queues[resource]
+        if queue.timer is not None:
+            queue.timer.cancel()
+            queue.timer = None
+        now = time.monotonic()
+
+        while queue.heap:
+            waiter = queue.heap[0]
+            if waiter.future.done():
+                # 等待期间被取消（超时或客户端断开）
+                heapq.heappop(queue.heap)
+                continue
+
+            wait = max(self.buckets[name].wait_time(amount, now) for name, amount in waiter.costs.items())
+            if wait > 0:
+                queue.timer = asyncio.get_running_loop().call_later(wait, self._dispatch, resource)
+                return
+
+            heapq.heappop(queue.heap)
+            for name, amount in waiter.costs.items():
+                self.buckets[name].take(amount)
+            queue.virtual_time = max(queue.virtual_time, waiter.tag)
+
+            priority = PRIORITY_NAMES.get(waiter.priority, "normal")
+            queue.stats["granted"] += 1
+            queue.stats["granted_by_priority"][priority] += 1
+            queue.stats["wait_seconds"][priority] += now - waiter.enqueued_at
+            waiter.future.set_result(None)
+
+        # 队列清空后，完成时间不晚于虚拟时间的会话不再需要单独记录
+        if len(queue.session_finish) > 1000:
+            queue.session_finish = {
+                session: tag for session, tag in queue.session_finish.items() if tag > queue.virtual_time
+            }
+
+    @asynccontextmanager
+    async def acquire(
+        self,
+        resource: str,
+        session: Optional[str] = None,
+        priority: int = PRIORITY_NORMAL,
+        **costs: float,
+    ) -> AsyncIterator[Grant]:
+        """
+        等待调用额度
+
+        Args:
+            resource: 资源名（llm / search）
+            session: 研究会话 ID（公平排队的单位）
+            priority: PRIORITY_INTERACTIVE / PRIORITY_NORMAL / PRIORITY_BACKGROUND
+            **costs: 各个桶的扣除量，未给出的桶扣 1（如 llm_tokens=估算 token 数）
+        """
+        queue = self._queues[resource]
+        amounts = {name: float(costs.get(name, 1)) for name in queue.buckets}
+        future = self._enqueue(resource, amounts, session or "default", priority)
+        try:
+            await future
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        yield Grant(self, resource, amounts)
+
+    def throttle(self, resource: str, seconds: float):
+        """收到 429 后暂停资源的全部令牌桶 seconds 秒，排队中的请求随之等待"""
+        queue = self._queues[resource]
+        now = time.monotonic()
+        for name in queue.buckets:
+            self.buckets[name].pause(seconds, now)
+        queue.stats["rate_limited"] += 1
+
+    def exhausted(self, resource: str):
+        """记录一次 429 重试次数用尽（调用最终失败）"""
+        self._queues[resource].stats["exhausted"] += 1
+
+    def stats(self) -> dict:
+        stats = {}
+        for resource, queue in self._queues.items():
+            stats[resource] = {
+                **queue.stats,
+                "wait_seconds": {k: round(v, 3) for k, v in queue.stats["wait_seconds"].items()},
+                "queued": sum(1 for waiter in queue.heap if not waiter.future.done()),
+                "buckets": {
+                    name: {
+                        "rate_per_minute": self.buckets[name].rate * 60,
+                        "available": round(self.buckets[name].tokens, 1),
+                    }
+                    for name in queue.buckets
+                },
+            }
+        return stats
+
+
+def retry_after_seconds(error: Exception, default: float) -> float:
+    """从 429 响应的 Retry-After 头读取等待时间，没有时使用默认值"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return max(0.0, float(headers.get("retry-after", default)))
+    except (TypeError, ValueError):
+        return default
+
+
+def is_rate_limited(error: Exception) -> bool:
+    """是否是 429 限流错误（OpenAI 兼容 SDK 的 RateLimitError 带 status_code）"""
+    return getattr(error, "status_code", None) == 429
+
+
+# 全局调度器
+_scheduler: Optional[RateScheduler] = None
+
+
+def get_scheduler() -> RateScheduler:
+    """获取或创建调度器"""
+    global _scheduler
+    if _scheduler is None:
+        burst = config.RATE_LIMIT_BURST_SECONDS
+        _scheduler = RateScheduler(
+            buckets={
+                "llm_requests": TokenBucket(config.LLM_RATE_LIMIT_RPM, burst),
+                "llm_tokens": TokenBucket(config.LLM_RATE_LIMIT_TPM, burst),
+                "search_requests": TokenBucket(config.SEARCH_RATE_LIMIT_RPM, burst),
+            },
+            # llm 按 token 数公平排队，search 按请求数
+            resources={
+                "llm": ["llm_tokens", "llm_requests"],
+                "search": ["search_requests"],
+            },
+        )
+    return _scheduler
@@ -0,0 +1,112 @@
+"""
+搜索结果缓存
+
+- 查询结果按「规范化查询词 + search_depth + max_results」缓存
+- extract 抓取的完整网页内容按 URL 缓存，使用更长的 TTL；全文较大，内存层按总大小
+  （SEARCH_CACHE_URL_MEMORY_BYTES）而不只是条目数限制，其余只保存在磁盘层
+"""
+import re
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+
+from backend.config import config
+from backend.utils.cache import TieredCache, resolve_db_path
+
+
+def normalize_query(query: str) -> str:
+    """规范化查询词：全角转半角、小写、合并空白"""
+    query = unicodedata.normalize("NFKC", query)
+    return re.sub(r"\s+", " ", query).strip().lower()
+
+
+class SearchCache:
+    """Tavily 搜索结果缓存（search 与 extract 分开存放）"""
+
+    def __init__(self, enabled: bool = True, db_path: Optional[str] = None):
+        self.enabled = enabled
+        self.queries = TieredCache(
+            namespace="search_query",
+            ttl=config.SEARCH_CACHE_TTL,
+            max_memory_entries=config.SEARCH_CACHE_MAX_MEMORY,
+            max_disk_entries=config.SEARCH_CACHE_MAX_DISK,
+            db_path=db_path,
+        )
+        self.urls = TieredCache(
+            namespace="search_url",
+            ttl=config.SEARCH_CACHE_URL_TTL,
+            max_memory_entries=config.SEARCH_CACHE_MAX_MEMORY,
+            max_disk_entries=config.SEARCH_CACHE_MAX_DISK,
+            db_path=db_path,
+            max_memory_bytes=config.SEARCH_CACHE_URL_MEMORY_BYTES,
+        )
+
+    @staticmethod
+    def _query_key(query: str, search_depth: str, max_results: int) -> str:
+        return f"{search_depth}|{max_results}|{normalize_query(query)}"
+
+    async def get_search(self, query: str, search_depth: str, max_results: int) -> Optional[dict]:
+        """读取缓存的搜索响应"""
+        if not self.enabled:
+            return None
+        return await self.queries.aget(self._query_key(query, search_depth, max_results))
+
+    def set_search(self, query: str, search_depth: str, max_results: int, response: dict):
+        """缓存搜索响应（只保留 results 部分）"""
+        if not self.enabled:
+            return
+        self.queries.set(
+            self._query_key(query, search_depth, max_results),
+            {"results": response.get("results", [])},
+        )
+
+    async def get_extracts(self, urls: List[str]) -> Tuple[List[dict], List[str]]:
+        """
+        按 URL 读取缓存的 extract 结果
+
+        Returns:
+            (命中的结果列表, 未命中的 URL 列表)
+        """
+        if not self.enabled:
+            return [], list(urls)
+
+        cached = await self.urls.aget_many(urls)
+        hits, missing = [], []
+        for url in urls:
+            item = cached.get(url)
+            if item is None:
+                missing.append(url)
+            else:
+                hits.append(item)
+        return hits, missing
+
+    def set_extracts(self, response: Optional[dict]):
+        """缓存一次 extract 响应中的每个 URL"""
+        if not self.enabled or response is None:
+            return
+        for item in response.get("results", []):
+            url = item.get("url")
+            if url and item.get("raw_content"):
+                self.urls.set(url, item)
+
+    def stats(self) -> Dict[str, dict]:
+        """命中/未命中计数"""
+        return {
+            "enabled": self.enabled,
+            "queries": self.queries.stats(),
+            "urls": self.urls.stats(),
+        }
+
+
+# 全局搜索缓存实例
+_search_cache = None
+
+
+def get_search_cache() -> SearchCache:
+    """获取或创建搜索缓存"""
+    global _search_cache
+    if _search_cache is None:
+        _search_cache = SearchCache(
+            enabled=config.SEARCH_CACHE_ENABLED,
+            db_path=resolve_db_path(config.CACHE_DB_PATH),
+        )
+    return _search_cache
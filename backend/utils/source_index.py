@@ -0,0 +1,163 @@
+"""
+来源身份索引
+
+按规范化 URL 和内容指纹识别重复来源，避免同一网页被重复摘要。
+"""
+import hashlib
+import re
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# 不影响页面内容的跟踪参数
+TRACKING_PARAMS = {
+    "gclid", "fbclid", "msclkid", "yclid", "dclid", "igshid", "mc_cid", "mc_eid",
+    "ref", "ref_src", "referrer", "spm", "from", "share", "share_source", "_ga",
+}
+TRACKING_PREFIXES = ("utm_",)
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def canonicalize_url(url: str) -> str:
+    """
+    规范化 URL
+
+    - scheme 统一为 https，host 小写并去掉 www. 前缀和默认端口
+    - 去掉跟踪参数，其余参数按名称排序
+    - 去掉 fragment 和路径末尾的 /
+    """
+    if not url:
+        return ""
+
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    if scheme not in ("http", "https"):
+        return url.strip()
+
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    try:
+        port = parts.port
+    except ValueError:
+        port = None
+    if port and port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{port}"
+
+    path = re.sub(r"/{2,}", "/", parts.path or "/")
+    if len(path) > 1:
+        path = path.rstrip("/")
+
+    params = [
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    ]
+    query = urlencode(sorted(params))
+
+    return urlunsplit(("https", host, path, query, ""))
+
+
+def content_fingerprint(text: Optional[str]) -> str:
+    """内容指纹：规范化空白、大小写和标点后取哈希，空内容返回空字符串"""
+    if not text:
+        return ""
+    normalized = unicodedata.normalize("NFKC", text).lower()
+    normalized = re.sub(r"[\W_]+", "", normalized)
+    if not normalized:
+        return ""
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:16]
+
+
+class SourceIndex:
+    """按规范化 URL 和内容指纹索引来源 ID"""
+
+    def __init__(self):
+        self._by_url: Dict[str, str] = {}
+        self._by_fingerprint: Dict[str, str] = {}
+
+    @classmethod
+    def from_sources(cls, sources: Iterable[dict]) -> "SourceIndex":
+        """从已有来源（ProcessedSource 或 RawSearchResult）构建索引"""
+        index = cls()
+        for source in sources:
+            index.add(source["id"], source.get("url", ""), source.get("fingerprint", ""))
+        return index
+
+    def add(self, source_id: str, url: str, fingerprint: str = ""):
+        """登记来源，已登记的 URL/指纹保持指向最早的来源"""
+        canonical = canonicalize_url(url)
+        if canonical:
+            self._by_url.setdefault(canonical, source_id)
+        if fingerprint:
+            self._by_fingerprint.setdefault(fingerprint, source_id)
+
+    def lookup(self, url: str, fingerprint: str = "") -> Optional[str]:
+        """查找重复来源的 ID，URL 优先，其次内容指纹"""
+        source_id = self._by_url.get(canonicalize_url(url))
+        if source_id is None and fingerprint:
+            source_id = self._by_fingerprint.get(fingerprint)
+        return source_id
+
+
+def deduplicate_results(
+    results: List[dict],
+    sources: Iterable[dict],
+) -> Tuple[List[dict], List[dict], int]:
+    """
+    去掉已收录或本批次内重复的搜索结果
+
+    Args:
+        results: 本轮的 RawSearchResult 列表
+        sources: 已收录的 ProcessedSource 列表
+
+    Returns:
+        (需要摘要的新结果, 合并到已有来源的出处条目 {"id", "queries"}, 跳过的结果数)
+    """
+    dedup = ResultDeduplicator(sources)
+    for result in results:
+        dedup.add(result)
+    return list(dedup.kept.values()), dedup.provenance_updates(), dedup.skipped
+
+
+class ResultDeduplicator:
+    """deduplicate_results 的增量版本：搜索结果逐个到达时判断是否重复（流水线模式使用）"""
+
+    def __init__(self, sources: Iterable[dict]):
+        self._index = SourceIndex.from_sources(sources)
+        self.kept: Dict[str, dict] = {}
+        # 被跳过的结果 ID → 它合并到的结果或来源 ID
+        self.merged: Dict[str, str] = {}
+        self._provenance: Dict[str, List[str]] = {}
+        self.skipped = 0
+
+    def add(self, result: dict) -> bool:
+        """
+        加入一个结果
+
+        Returns:
+            是否为新结果；重复时出处合并到先出现的结果或已有来源上
+        """
+        duplicate_id = self._index.lookup(result["url"], result.get("fingerprint", ""))
+        if duplicate_id is None:
+            self._index.add(result["id"], result["url"], result.get("fingerprint", ""))
+            self.kept[result["id"]] = result
+            return True
+
+        self.skipped += 1
+        self.merged[result["id"]] = duplicate_id
+        queries = result.get("queries") or [result["query"]]
+        if duplicate_id in self.kept:
+            # 本批次内的重复：出处合并到先出现的结果上
+            target = self.kept[duplicate_id].setdefault("queries", [])
+        else:
+            target = self._provenance.setdefault(duplicate_id, [])
+        for query in queries:
+            if query not in target:
+                target.append(query)
+        return False
+
+    def provenance_updates(self) -> List[dict]:
+        """合并到已有来源的出处条目 {"id", "queries"}"""
+        return [{"id": source_id, "queries": queries} for source_id, queries in self._provenance.items()]
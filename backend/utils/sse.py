@@ -0,0 +1,133 @@
+"""
+SSE 事件发送
+
+事件生成和网络发送之间用有界队列解耦：
+- 客户端读得慢时队列写满，生产端（工作流 / LLM 流）在 put 处等待，形成背压
+- 连续的 report_chunk 合并成一帧：攒够 SSE_COALESCE_BYTES 字节或等待超过 SSE_COALESCE_MS 就发送；
+  客户端慢时队列里积压的 token 会一次合并，帧数随之自动减少
+- 使用 orjson 编码，输出 UTF-8 字节
+"""
+import asyncio
+from typing import AsyncIterator, Optional
+
+import orjson
+
+# 队列结束标记
+_END = object()
+
+# 需要合并的事件类型
+COALESCE_EVENT = "report_chunk"
+
+
+def encode_event(event: str, data: dict) -> bytes:
+    """编码为一帧 SSE"""
+    return b"event: " + event.encode("utf-8") + b"\ndata: " + orjson.dumps(data) + b"\n\n"
+
+
+class _ProducerError:
+    """生产端异常，交给发送端重新抛出"""
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+class SSEEmitter:
+    """
+    将事件流编码为 SSE 字节流
+
+    Args:
+        events: 事件字典 {"event": 类型, "data": dict} 的异步迭代器
+        max_queue: 已生成未发送事件的上限
+        coalesce_delay: report_chunk 合并的最长等待（秒）
+        coalesce_bytes: report_chunk 合并的字节上限
+    """
+
+    def __init__(
+        self,
+        events: AsyncIterator[dict],
+        max_queue: int = 64,
+        coalesce_delay: float = 0.03,
+        coalesce_bytes: int = 256,
+    ):
+        self._events = events
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, max_queue))
+        self.coalesce_delay = coalesce_delay
+        self.coalesce_bytes = coalesce_bytes
+        self.frames = 0
+        self.chunks = 0
+
+    async def _produce(self):
+        # 被取消（客户端断开）时不再入队，发送端已经不会再读取
+        try:
+            async for event in self._events:
+                await self._queue.put(event)
+        except Exception as e:
+            await self._queue.put(_ProducerError(e))
+            return
+        await self._queue.put(_END)
+
+    async def _coalesce(self, first: dict):
+        """
+        合并连续的 report_chunk
+
+        Returns:
+            (合并后的文本, 打断合并的下一个事件或 None)
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.coalesce_delay
+        parts = [first["data"]["content"]]
+        size = len(parts[0].encode("utf-8"))
+        self.chunks += 1
+
+        yielded = False
+        while size < self.coalesce_bytes:
+            try:
+                item = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                # 先让出一次：生产端可能正因队列满等在 put 上；
+                # 仍然没有新事件时睡到窗口结束（每帧一个定时器，而不是每个 token 一个）
+                await asyncio.sleep(0 if not yielded else remaining)
+                yielded = not yielded
+                continue
+            yielded = False
+            if not isinstance(item, dict) or item.get("event") != COALESCE_EVENT:
+                return "".join(parts), item
+            content = item["data"]["content"]
+            parts.append(content)
+            size += len(content.encode("utf-8"))
+            self.chunks += 1
+
+        return "".join(parts), None
+
+    async def stream(self) -> AsyncIterator[bytes]:
+        """发送端：逐帧产出 SSE 字节；客户端断开时取消生产端"""
+        producer = asyncio.create_task(self._produce())
+        pending: Optional[object] = None
+        try:
+            while True:
+                item = pending if pending is not None else await self._queue.get()
+                pending = None
+
+                if item is _END:
+                    break
+                if isinstance(item, _ProducerError):
+                    raise item.error
+
+                if item.get("event") == COALESCE_EVENT:
+                    content, pending = await self._coalesce(item)
+                    frame = encode_event(COALESCE_EVENT, {"content": content})
+                else:
+                    frame = encode_event(item.get("event", "message"), item.get("data", {}))
+
+                self.frames += 1
+                yield frame
+        finally:
+            if not producer.done():
+                producer.cancel()
+                try:
+                    await producer
+                except asyncio.CancelledError:
+                    pass
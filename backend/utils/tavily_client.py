@@ -1,27 +1,415 @@
-from typing import List, Optional
-from tavily import TavilyClient as BaseTavilyClient
+import asyncio
+import random
+import threading
+import time
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from tavily import AsyncTavilyClient as BaseAsyncTavilyClient
+from tavily import BadRequestError, InvalidAPIKeyError, MissingAPIKeyError, UsageLimitExceededError
 
 from backend.config import config
 from backend.graph.state import RawSearchResult
+from backend.utils import logger
+from backend.utils.scheduler import PRIORITY_BACKGROUND, PRIORITY_NORMAL, get_scheduler
+from backend.utils.search_cache import SearchCache, get_search_cache
+from backend.utils.source_index import canonicalize_url, content_fingerprint
 
+# 这些错误重试也不会成功
+NON_RETRYABLE_ERRORS = (BadRequestError, InvalidAPIKeyError, MissingAPIKeyError)
+
+# 深挖预取的进程累计统计（各会话的 TavilyClient 同时计入）：
+# urls 发起预取的 URL 数，fetched 抓到内容的 URL 数，hits/misses 深挖目标是否已预取，
+# wasted 抓到但过期或会话结束前未被使用的 URL 数
+_prefetch_totals = {"urls": 0, "fetched": 0, "hits": 0, "misses": 0, "wasted": 0}
+
+
+def prefetch_stats() -> dict:
+    """深挖预取的进程累计统计"""
+    lookups = _prefetch_totals["hits"] + _prefetch_totals["misses"]
+    return {
+        "top_k": config.PREFETCH_TOP_K,
+        **_prefetch_totals,
+        "hit_rate": _prefetch_totals["hits"] / lookups if lookups else 0.0,
+        "waste_rate": _prefetch_totals["wasted"] / _prefetch_totals["fetched"] if _prefetch_totals["fetched"] else 0.0,
+    }
 
-class TavilyClient:
-    """Tavily 搜索 API 封装"""
+
+class SearchTransport:
+    """进程共享的 Tavily 连接：基于 httpx 的异步 SDK 客户端"""
 
     def __init__(self):
-        self.client = BaseTavilyClient(api_key=config.TAVILY_API_KEY)
-        self._source_counter = 0
+        self.async_client = BaseAsyncTavilyClient(api_key=config.TAVILY_API_KEY)
+
+    async def close(self):
+        """释放连接池"""
+        await self.async_client.close()
+
+
+# 全局共享连接
+_transport = None
+
+
+def get_search_transport() -> SearchTransport:
+    """获取或创建共享的 Tavily 连接"""
+    global _transport
+    if _transport is None:
+        _transport = SearchTransport()
+    return _transport
+
+
+async def close_search_transport():
+    """关闭共享的 Tavily 连接（应用关闭时调用）"""
+    global _transport
+    if _transport is not None:
+        await _transport.close()
+        _transport = None
+
+
+class SessionCacheView:
+    """共享搜索缓存的会话视图：读写共享缓存，单独统计本会话的命中情况"""
+
+    def __init__(self, cache: SearchCache):
+        self._cache = cache
+        self.hits = 0
+        self.misses = 0
+
+    def _count(self, hit: bool):
+        if hit:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    async def get_search(self, query: str, search_depth: str, max_results: int) -> Optional[dict]:
+        response = await self._cache.get_search(query, search_depth, max_results)
+        self._count(response is not None)
+        return response
+
+    def set_search(self, query: str, search_depth: str, max_results: int, response: dict):
+        self._cache.set_search(query, search_depth, max_results, response)
+
+    async def missing_extracts(self, urls: List[str]) -> List[str]:
+        """共享缓存中没有的 URL（不计入命中统计）"""
+        return (await self._cache.get_extracts(urls))[1]
+
+    async def get_extracts(self, urls: List[str]):
+        hits, missing = await self._cache.get_extracts(urls)
+        self.hits += len(hits)
+        self.misses += len(missing)
+        return hits, missing
+
+    def set_extracts(self, response: Optional[dict]):
+        self._cache.set_extracts(response)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+class TavilyClient:
+    """
+    Tavily 搜索 API 封装（每个研究会话一个实例）
+
+    连接池在所有会话间共享；来源 ID 计数器、请求预算和缓存统计按会话隔离，
+    保证并发会话的来源 ID 互不交错且每次运行从 src_1 开始。
+    """
+
+    def __init__(
+        self,
+        transport: Optional[SearchTransport] = None,
+        request_budget: Optional[int] = None,
+        start_index: int = 0,
+        session_id: Optional[str] = None,
+    ):
+        """
+        Args:
+            transport: 共享连接，默认使用全局实例
+            request_budget: 本会话最多发出的 Tavily 请求数（不含缓存命中），默认 SEARCH_SESSION_MAX_REQUESTS
+            start_index: 来源 ID 计数起点（恢复已有会话时使用）
+            session_id: 研究会话 ID（限速排队时按会话公平分配）
+        """
+        transport = transport or get_search_transport()
+        self.async_client = transport.async_client
+        self.cache = SessionCacheView(get_search_cache())
+        self.session_id = session_id
+        self._source_counter = start_index
+        self._budget = config.SEARCH_SESSION_MAX_REQUESTS if request_budget is None else request_budget
+        self._budget_lock = threading.Lock()
+        self.requests_made = 0
+        self.requests_skipped = 0
+        # 深挖预取：URL → (过期时间, extract 条目)；进行中的预取任务；本会话已深挖过的 URL
+        self._prefetched: Dict[str, Tuple[float, dict]] = {}
+        self._prefetching: Dict[str, asyncio.Task] = {}
+        self._extracted: Set[str] = set()
+        self._prefetch = {key: 0 for key in _prefetch_totals}
 
     def reset_counter(self):
         """重置来源计数器"""
         self._source_counter = 0
 
+    def _take_budget(self, description: str) -> bool:
+        """占用一次请求预算，预算耗尽时返回 False"""
+        with self._budget_lock:
+            if self._budget > 0 and self.requests_made >= self._budget:
+                self.requests_skipped += 1
+                logger.log_warning("searcher", f"{description} skipped: session request budget ({self._budget}) exhausted")
+                return False
+            self.requests_made += 1
+            return True
+
+    def stats(self) -> dict:
+        """本会话的请求和缓存统计"""
+        return {
+            "sources_allocated": self._source_counter,
+            "requests_made": self.requests_made,
+            "requests_skipped": self.requests_skipped,
+            "request_budget": self._budget,
+            "cache": self.cache.stats(),
+            "prefetch": dict(self._prefetch),
+        }
+
+    def _count_prefetch(self, key: str, n: int = 1):
+        self._prefetch[key] += n
+        _prefetch_totals[key] += n
+
+    def prefetch(self, urls: List[str], limit: Optional[int] = None) -> int:
+        """
+        在后台抓取 urls 的完整内容（以最低优先级排队），供之后的 asearch_advanced 直接使用
+
+        跳过本会话已深挖过的 URL 后取前 limit 个；其中已预取或正在预取的不再抓取，
+        共享缓存中已有的由后台任务查出后跳过（读缓存不阻塞调用方）。需要在事件循环中调用。
+
+        Returns:
+            排入预取的 URL 数
+        """
+        urls = [url for url in dict.fromkeys(urls) if url and url not in self._extracted]
+        if limit is not None:
+            urls = urls[:limit]
+        urls = [url for url in urls if url not in self._prefetched and url not in self._prefetching]
+        if not urls:
+            return 0
+
+        task = asyncio.create_task(self._run_prefetch(urls))
+        for url in urls:
+            self._prefetching[url] = task
+        return len(urls)
+
+    async def _run_prefetch(self, urls: List[str]):
+        scheduled = urls
+        try:
+            urls = await self.cache.missing_extracts(urls)
+            self._count_prefetch("urls", len(urls))
+            requested = set(urls)
+            for batch in self._split_batches(urls):
+                if not self._take_budget(f"Prefetch for {len(batch)} URLs"):
+                    return
+                response = await self._acall_with_retry(
+                    lambda: self.async_client.extract(urls=batch, timeout=config.SEARCH_TIMEOUT),
+                    f"Prefetch for {len(batch)} URLs",
+                    priority=PRIORITY_BACKGROUND,
+                )
+                if response is None:
+                    continue
+                self.cache.set_extracts(response)
+                expires = time.monotonic() + config.PREFETCH_TTL
+                for item in response.get("results", []):
+                    url = item.get("url", "")
+                    if url in requested and item.get("raw_content"):
+                        self._prefetched[url] = (expires, item)
+                        self._count_prefetch("fetched")
+        finally:
+            for url in scheduled:
+                self._prefetching.pop(url, None)
+
+    async def _take_prefetched(self, urls: List[str]) -> Tuple[List[dict], List[str]]:
+        """
+        取出已预取的条目（预取仍在进行时等待其完成）
+
+        Returns:
+            (预取到的条目列表, 未预取的 URL 列表)
+        """
+        pending = {self._prefetching[url] for url in urls if url in self._prefetching}
+        if pending:
+            # asyncio.wait 不会在当前节点被取消时连带取消预取任务
+            await asyncio.wait(pending)
+
+        now = time.monotonic()
+        items, missing = [], []
+        for url in urls:
+            entry = self._prefetched.pop(url, None)
+            if entry is not None and entry[0] > now:
+                items.append(entry[1])
+            else:
+                if entry is not None:
+                    self._count_prefetch("wasted")
+                missing.append(url)
+        self._count_prefetch("hits", len(items))
+        self._count_prefetch("misses", len(missing))
+        return items, missing
+
+    def discard_prefetched(self):
+        """会话结束：取消进行中的预取，未使用的预取内容计为浪费"""
+        for task in set(self._prefetching.values()):
+            task.cancel()
+        self._prefetching.clear()
+        self._count_prefetch("wasted", len(self._prefetched))
+        self._prefetched.clear()
+
     def _generate_source_id(self) -> str:
         """生成唯一的来源 ID"""
         self._source_counter += 1
         return f"src_{self._source_counter}"
 
-    def search_basic(
+    async def _acall_with_retry(
+        self,
+        func: Callable[[], Awaitable[dict]],
+        description: str,
+        priority: int = PRIORITY_NORMAL,
+    ) -> Optional[dict]:
+        """
+        执行单次 Tavily 请求，失败时按带抖动的指数退避重试（退避期间让出事件循环）
+
+        每次尝试都先经调度器排队（Tavily 全局限速）；429 时暂停限速桶后重新排队，不再额外退避。
+        失败时记录警告；429 重试次数用尽同时计入调度器的 exhausted 统计（/stats）
+
+        Returns:
+            响应字典；失败或重试耗尽后返回 None（调用方按无结果处理）
+        """
+        scheduler = get_scheduler()
+        attempts = max(0, config.SEARCH_MAX_RETRIES) + 1
+        attempt = 0
+        rate_limited = 0
+
+        while True:
+            try:
+                async with scheduler.acquire("search", self.session_id, priority):
+                    return await func()
+            except NON_RETRYABLE_ERRORS as e:
+                logger.log_warning("searcher", f"{description} error: {e}")
+                return None
+            except UsageLimitExceededError as e:
+                # 429 不计入普通重试次数，由 RATE_LIMIT_RETRIES 单独限制
+                rate_limited += 1
+                if rate_limited > config.RATE_LIMIT_RETRIES:
+                    scheduler.exhausted("search")
+                    logger.log_warning("searcher", f"{description} rate limited (after {rate_limited} attempts): {e}")
+                    return None
+                scheduler.throttle("search", config.RATE_LIMIT_BACKOFF)
+            except Exception as e:
+                attempt += 1
+                if attempt == attempts:
+                    logger.log_warning("searcher", f"{description} error (after {attempts} attempts): {e}")
+                    return None
+                delay = config.SEARCH_RETRY_BACKOFF * (2 ** (attempt - 1)) * random.uniform(0.5, 1.5)
+                await asyncio.sleep(delay)
+
+    def assign_source_ids(self, results: List[RawSearchResult]) -> Dict[str, str]:
+        """
+        按给定顺序为带临时 ID 的结果分配正式来源 ID（原地修改）
+
+        Returns:
+            临时 ID → 正式 ID
+        """
+        renamed = {}
+        for result in results:
+            source_id = self._generate_source_id()
+            renamed[result["id"]] = source_id
+            result["id"] = source_id
+        return renamed
+
+    def _build_basic_results(
+        self,
+        queries: List[str],
+        responses: List[Optional[dict]],
+        pending_index: Optional[int] = None,
+    ) -> List[RawSearchResult]:
+        """
+        按 queries 的顺序组装 Basic 搜索结果并分配来源 ID
+
+        给出 pending_index（查询序号）时分配临时 ID pending_<查询序号>_<结果序号>，不占用来源 ID 计数
+        """
+        results = []
+
+        for query, response in zip(queries, responses):
+            if response is None:
+                continue
+
+            for rank, item in enumerate(response.get("results", [])):
+                result: RawSearchResult = {
+                    "id": (
+                        self._generate_source_id() if pending_index is None
+                        else f"pending_{pending_index}_{rank}"
+                    ),
+                    "query": query,
+                    "title": item.get("title", ""),
+                    "url": item.get("url", ""),
+                    "snippet": item.get("content", ""),  # basic 模式下 content 是摘要
+                    "content": None,
+                    "score": item.get("score", 0.0),
+                    "queries": [query],
+                    "fingerprint": content_fingerprint(item.get("content", "")),
+                }
+                results.append(result)
+
+        return results
+
+    def _build_advanced_results(
+        self,
+        urls: List[str],
+        responses: List[Optional[dict]],
+        query: str,
+        source_ids: Optional[Dict[str, str]] = None,
+    ) -> List[RawSearchResult]:
+        """
+        按 urls 的顺序组装 extract 结果并分配来源 ID
+
+        规范化 URL 在 source_ids 中的结果沿用已有来源 ID，其余结果才分配新 ID
+        """
+        source_ids = source_ids or {}
+        # 按请求的 URL 归位，未能对应上的结果按返回顺序追加在后面
+        requested = set(urls)
+        items_by_url = {}
+        unmatched = []
+        for response in responses:
+            if response is None:
+                continue
+            for item in response.get("results", []):
+                url = item.get("url", "")
+                if url in requested and url not in items_by_url:
+                    items_by_url[url] = item
+                else:
+                    unmatched.append(item)
+
+        ordered_items = [items_by_url[url] for url in urls if url in items_by_url] + unmatched
+
+        results = []
+        for item in ordered_items:
+            known_id = source_ids.get(canonicalize_url(item.get("url", "")))
+            result: RawSearchResult = {
+                "id": known_id or self._generate_source_id(),
+                "query": query,
+                "title": item.get("title", ""),
+                "url": item.get("url", ""),
+                "snippet": "",
+                "content": item.get("raw_content", ""),
+                "score": 1.0,  # 深挖的默认为高相关
+                "queries": [query] if query else [],
+                "fingerprint": content_fingerprint(item.get("raw_content", "")),
+            }
+            results.append(result)
+
+        return results
+
+    @staticmethod
+    def _split_batches(urls: List[str]) -> List[List[str]]:
+        """按 SEARCH_EXTRACT_BATCH_SIZE 将 URL 分批"""
+        batch_size = max(1, config.SEARCH_EXTRACT_BATCH_SIZE)
+        return [urls[i:i + batch_size] for i in range(0, len(urls), batch_size)]
+
+    async def asearch_basic(
         self,
         queries: List[str],
         max_results: int = 5
@@ -29,6 +417,9 @@ class TavilyClient:
         """
         Basic 模式搜索 - 返回 snippet
 
+        所有查询并发执行（SEARCH_CONCURRENCY 限制同时进行的请求数），结果按 queries 的顺序组装，
+        保证来源 ID 稳定。已缓存的查询直接复用缓存结果，不再请求 Tavily。
+
         Args:
             queries: 搜索词列表
             max_results: 每个查询的最大结果数
@@ -36,76 +427,101 @@ class TavilyClient:
         Returns:
             RawSearchResult 列表
         """
-        results = []
+        semaphore = asyncio.Semaphore(max(1, config.SEARCH_CONCURRENCY))
+        responses = await asyncio.gather(*[
+            self._asearch_one(query, max_results, semaphore) for query in queries
+        ])
+        return self._build_basic_results(queries, responses)
 
-        for query in queries:
-            try:
-                response = self.client.search(
+    async def asearch_basic_iter(
+        self,
+        queries: List[str],
+        max_results: int = 5
+    ) -> AsyncIterator[Tuple[int, str, List[RawSearchResult]]]:
+        """
+        asearch_basic 的逐个产出版本：每个查询返回后立即产出 (查询序号, 查询, 结果)，按完成先后排列
+
+        结果带临时 ID（pending_<查询序号>_<结果序号>，与完成先后无关），调用方在全部结果到达后
+        用 assign_source_ids 按查询顺序换成正式来源 ID。迭代提前结束时取消尚未返回的查询。
+        """
+        semaphore = asyncio.Semaphore(max(1, config.SEARCH_CONCURRENCY))
+
+        async def search_one(index: int, query: str) -> Tuple[int, str, Optional[dict]]:
+            return index, query, await self._asearch_one(query, max_results, semaphore)
+
+        tasks = [asyncio.create_task(search_one(index, query)) for index, query in enumerate(queries)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                index, query, response = await next_done
+                yield index, query, self._build_basic_results([query], [response], pending_index=index)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _asearch_one(self, query: str, max_results: int, semaphore: asyncio.Semaphore) -> Optional[dict]:
+        """执行单个异步查询，优先读取缓存"""
+        cached = await self.cache.get_search(query, "basic", max_results)
+        if cached is not None:
+            return cached
+        if not self._take_budget(f"Search for query '{query}'"):
+            return None
+
+        async with semaphore:
+            response = await self._acall_with_retry(
+                lambda: self.async_client.search(
                     query=query,
                     search_depth="basic",
                     max_results=max_results,
                     include_answer=False,
-                )
-
-                for item in response.get("results", []):
-                    result: RawSearchResult = {
-                        "id": self._generate_source_id(),
-                        "query": query,
-                        "title": item.get("title", ""),
-                        "url": item.get("url", ""),
-                        "snippet": item.get("content", ""),  # basic 模式下 content 是摘要
-                        "content": None,
-                        "score": item.get("score", 0.0),
-                    }
-                    results.append(result)
-
-            except Exception as e:
-                print(f"Search error for query '{query}': {e}")
-                continue
-
-        return results
+                    timeout=config.SEARCH_TIMEOUT,
+                ),
+                f"Search for query '{query}'",
+            )
+        if response is not None:
+            self.cache.set_search(query, "basic", max_results, response)
+        return response
 
-    def search_advanced(
+    async def asearch_advanced(
         self,
         urls: List[str],
-        query: str = ""
+        query: str = "",
+        source_ids: Optional[Dict[str, str]] = None,
     ) -> List[RawSearchResult]:
         """
         Advanced 模式 - 获取完整内容
 
+        URL 按 SEARCH_EXTRACT_BATCH_SIZE 分批，每批一次 extract 请求，各批并发执行；
+        结果按 urls 的顺序组装。已预取或已缓存全文的 URL 不再重复抓取。
+
         Args:
             urls: 需要深挖的 URL 列表
             query: 相关的搜索词（用于标记）
+            source_ids: 规范化 URL → 已有来源 ID（深挖已收录的来源时沿用其 ID，不再分配新 ID）
 
         Returns:
             RawSearchResult 列表（包含完整 content）
         """
-        results = []
-
-        for url in urls:
-            try:
-                # 使用 extract 方法获取完整内容
-                response = self.client.extract(urls=[url])
+        semaphore = asyncio.Semaphore(max(1, config.SEARCH_CONCURRENCY))
 
-                for item in response.get("results", []):
-                    result: RawSearchResult = {
-                        "id": self._generate_source_id(),
-                        "query": query,
-                        "title": item.get("title", ""),
-                        "url": item.get("url", url),
-                        "snippet": "",
-                        "content": item.get("raw_content", ""),
-                        "score": 1.0,  # 深挖的默认为高相关
-                    }
-                    results.append(result)
-
-            except Exception as e:
-                print(f"Extract error for URL '{url}': {e}")
-                continue
+        async def extract_batch(batch: List[str]) -> Optional[dict]:
+            if not self._take_budget(f"Extract for {len(batch)} URLs"):
+                return None
+            async with semaphore:
+                response = await self._acall_with_retry(
+                    lambda: self.async_client.extract(urls=batch, timeout=config.SEARCH_TIMEOUT),
+                    f"Extract for {len(batch)} URLs",
+                )
+            self.cache.set_extracts(response)
+            return response
 
-        return results
+        self._extracted.update(urls)
+        prefetched_items, remaining = await self._take_prefetched(urls)
+        cached_items, missing = await self.cache.get_extracts(remaining)
+        fetched = await asyncio.gather(*[extract_batch(batch) for batch in self._split_batches(missing)])
+        responses = [{"results": prefetched_items + cached_items}] + list(fetched)
+        return self._build_advanced_results(urls, responses, query, source_ids)
 
-    def search_with_context(
+    async def asearch_with_context(
         self,
         query: str,
         max_results: int = 5
@@ -116,14 +532,17 @@ class TavilyClient:
         Returns:
             包含 answer 和 results 的字典
         """
-        try:
-            response = self.client.search(
+        description = f"Context search for query '{query}'"
+        if not self._take_budget(description):
+            return {"answer": "", "results": []}
+        response = await self._acall_with_retry(
+            lambda: self.async_client.search(
                 query=query,
                 search_depth="advanced",
                 max_results=max_results,
                 include_answer=True,
-            )
-            return response
-        except Exception as e:
-            print(f"Context search error: {e}")
-            return {"answer": "", "results": []}
+                timeout=config.SEARCH_TIMEOUT,
+            ),
+            description,
+        )
+        return response or {"answer": "", "results": []}
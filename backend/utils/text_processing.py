@@ -1,7 +1,41 @@
+import heapq
+import math
+import os
 import re
-from typing import List, Tuple
+import threading
+from collections import Counter
+from functools import lru_cache
+from itertools import accumulate, chain
+from operator import add
+from typing import List, Pattern, Tuple
 
-import jieba
+from backend.config import config
+from backend.utils.cache import resolve_db_path
+
+# jieba 导入和词典加载都较慢，首次使用时才导入
+_jieba = None
+_jieba_lock = threading.Lock()
+
+
+def get_jieba():
+    """获取 jieba 模块，词典缓存写到 JIEBA_CACHE_PATH（可预先构建，启动时直接读取）"""
+    global _jieba
+    if _jieba is None:
+        with _jieba_lock:
+            if _jieba is None:
+                import jieba
+
+                cache_path = resolve_db_path(config.JIEBA_CACHE_PATH)
+                if cache_path:
+                    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+                    jieba.dt.cache_file = cache_path
+                _jieba = jieba
+    return _jieba
+
+
+def init_jieba():
+    """加载 jieba 前缀词典（缓存存在时直接读取，否则构建并写入缓存）"""
+    get_jieba().initialize()
 
 
 def extract_keywords(text: str, top_k: int = 10) -> List[str]:
@@ -16,7 +50,7 @@ def extract_keywords(text: str, top_k: int = 10) -> List[str]:
         关键词列表
     """
     # 使用 jieba 分词
-    words = jieba.cut(text)
+    words = get_jieba().cut(text)
 
     # 停用词（简化版）
     stopwords = {
@@ -54,67 +88,187 @@ def extract_keywords(text: str, top_k: int = 10) -> List[str]:
     return [word for word, _ in sorted_words[:top_k]]
 
 
+# 超长行按该长度切分成多个单元，避免单行页面变成一个巨大的段落
+MAX_UNIT_CHARS = 400
+
+# BM25 参数
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def _normalize_keywords(keywords: List[str]) -> List[str]:
+    """关键词小写去重，长词优先（与较短关键词重叠时计入较长的）"""
+    return sorted({kw.strip().lower() for kw in keywords if kw and kw.strip()}, key=len, reverse=True)
+
+
+@lru_cache(maxsize=128)
+def _compile_keywords(keywords: Tuple[str, ...], flags: int = 0) -> Pattern:
+    """把关键词编译成一个正则交替式（keywords 已按长度降序，重叠时匹配较长的关键词）"""
+    return re.compile('|'.join(re.escape(kw) for kw in keywords), flags)
+
+
+def _find_chunk_hits(content: str, keywords: List[str], chunk_ends: List[int]) -> List[List[str]]:
+    """
+    找出每块中的关键词命中（keywords 为 _normalize_keywords 的结果，chunk_ends 为每块的结束偏移）
+
+    全部关键词编译成一个长词优先的交替式，在小写后的全文上按块区间调用 findall，命中之间不重叠。
+    命中直接按块返回，不逐个记录位置再映射到块（命中密集的页面上逐命中的 Python 处理是主要开销）。
+    小写会改变长度的文本（极少数 Unicode 字符）改为在原文上忽略大小写匹配，保证区间对应原文。
+    跨越块边界的命中（只可能出现在被切分的超长行中）不计入。
+
+    Returns:
+        每块的命中关键词列表（小写）
+    """
+    lowered = content.lower()
+    if len(lowered) == len(content):
+        text, pattern = lowered, _compile_keywords(tuple(keywords))
+    else:
+        text, pattern = content, _compile_keywords(tuple(keywords), re.IGNORECASE)
+
+    starts = [0] + chunk_ends[:-1]
+    chunk_hits = [pattern.findall(text, start, end) for start, end in zip(starts, chunk_ends)]
+    if text is content:
+        chunk_hits = [[hit.lower() for hit in hits] for hits in chunk_hits]
+    return chunk_hits
+
+
+def _split_units(content: str) -> Tuple[List[str], List[int]]:
+    """
+    按行切分文本，超长行再按 MAX_UNIT_CHARS 切分
+
+    Returns:
+        (单元列表, 每个单元的结束偏移)，结束偏移用于划分块和计算块长度
+    """
+    lines = content.split('\n')
+    if max(map(len, lines)) <= MAX_UNIT_CHARS:
+        # 常见情况：单元即行，结束偏移 = 累计长度 + 换行符个数
+        return lines, list(map(add, accumulate(map(len, lines)), range(len(lines))))
+
+    units: List[str] = []
+    ends: List[int] = []
+    offset = 0
+    for line in lines:
+        for i in range(0, max(len(line), 1), MAX_UNIT_CHARS):
+            chunk = line[i:i + MAX_UNIT_CHARS]
+            units.append(chunk)
+            ends.append(offset + i + len(chunk))
+        offset += len(line) + 1
+    return units, ends
+
+
 def locate_relevant_segments(
     content: str,
     keywords: List[str],
     context_lines: int = 2,
-    max_segments: int = 5
+    max_segments: int = 5,
+    max_chars: int = 2000,
 ) -> str:
     """
     根据关键词定位相关段落
 
+    全文小写一次后按块（每 context_lines + 1 行）用一个关键词交替式正则找出命中，按 BM25 给块打分；
+    相邻两块组成一个滑动窗口（窗口长 2 * (context_lines + 1) 行，步长 context_lines + 1），得分为两块之和，
+    再按分数从高到低选取不重叠的窗口，直到达到段落数或字符预算。
+
     Args:
         content: 完整内容
         keywords: 关键词列表
         context_lines: 上下文行数
         max_segments: 最大段落数
+        max_chars: 返回文本的字符预算
 
     Returns:
-        提取的相关段落文本
+        提取的相关段落文本（按原文顺序，段落之间用 ... 分隔）
     """
     if not content or not keywords:
         return content[:1000] if content else ""
 
-    # 按行分割
-    lines = content.split('\n')
-    line_scores = []
-
-    # 计算每行的关键词命中分数
-    for i, line in enumerate(lines):
-        line_lower = line.lower()
-        score = sum(1 for kw in keywords if kw.lower() in line_lower)
-        if score > 0:
-            line_scores.append((i, score))
-
-    # 按分数排序
-    line_scores.sort(key=lambda x: x[1], reverse=True)
-
-    # 提取 top 段落及其上下文
-    selected_lines = set()
-    for line_idx, _ in line_scores[:max_segments]:
-        start = max(0, line_idx - context_lines)
-        end = min(len(lines), line_idx + context_lines + 1)
-        for i in range(start, end):
-            selected_lines.add(i)
+    units, unit_ends = _split_units(content)
+
+    # 每 context_lines + 1 个单元一块，逐块找出命中
+    stride = context_lines + 1
+    chunk_ends = unit_ends[stride - 1::stride]
+    if len(unit_ends) % stride:
+        chunk_ends.append(unit_ends[-1])
+    chunk_hits = _find_chunk_hits(content, _normalize_keywords(keywords), chunk_ends)
 
     # 如果没有命中，返回开头和结尾
-    if not selected_lines:
-        head = '\n'.join(lines[:10])
-        tail = '\n'.join(lines[-5:]) if len(lines) > 15 else ""
+    if not any(chunk_hits):
+        head = '\n'.join(units[:10])
+        tail = '\n'.join(units[-5:]) if len(units) > 15 else ""
         return f"{head}\n...\n{tail}" if tail else head
 
-    # 按顺序组合
-    sorted_indices = sorted(selected_lines)
-    segments = []
-    prev_idx = -2
+    # BM25：文档 = 块，长度 = 块字符数。score = Σ idf * tf * (k1 + 1) / (tf + norm)，
+    # norm = k1 * (1 - b + b * 长度 / 平均长度)；(k1 + 1) 并入 idf，norm 拆成常数项和长度系数
+    total_chunks = len(chunk_ends)
+    avg_length = max(1.0, len(content) / total_chunks)
+    doc_freq = Counter(chain.from_iterable(map(set, chunk_hits)))
+    idf = {
+        kw: (BM25_K1 + 1) * math.log(1 + (total_chunks - df + 0.5) / (df + 0.5))
+        for kw, df in doc_freq.items()
+    }
+    norm_base = BM25_K1 * (1 - BM25_B)
+    norm_scale = BM25_K1 * BM25_B / avg_length
+    chunk_scores = [0.0] * (total_chunks + 1)
+    for chunk, hits in enumerate(chunk_hits):
+        if hits:
+            norm = norm_base + norm_scale * (chunk_ends[chunk] - (chunk_ends[chunk - 1] if chunk else 0))
+            chunk_scores[chunk] = sum([idf[kw] * tf / (tf + norm) for kw, tf in Counter(hits).items()])
+
+    # 窗口 w 由块 w 和块 w + 1 组成（相邻窗口重叠一块），得分为两块得分之和
+    size = 2 * stride
+    scored = [
+        (-score, window)
+        for window, score in enumerate(map(add, chunk_scores, chunk_scores[1:]))
+        if score
+    ]
 
-    for idx in sorted_indices:
-        if idx > prev_idx + 1:
+    # 按分数选取不重叠的窗口，直到达到段落数或字符预算（只需排出前若干名）
+    selected: List[Tuple[int, int]] = []
+    used = 0
+    for _, window in heapq.nsmallest(max_segments * 4, scored):
+        if len(selected) >= max_segments:
+            break
+        start = window * stride
+        end = min(len(units), start + size)
+        if any(start < s_end and s_start < end for s_start, s_end in selected):
+            continue
+        # 每个窗口额外计入 "...\n" 分隔符
+        length = sum(len(units[i]) + 1 for i in range(start, end)) + 4
+        if used + length > max_chars and selected:
+            continue
+        selected.append((start, end))
+        used += length
+
+    # 按原文顺序组合，相邻窗口合并
+    segments = []
+    prev_end = -1
+    for start, end in sorted(selected):
+        if start != prev_end:
             segments.append("...")
-        segments.append(lines[idx])
-        prev_idx = idx
+        segments.extend(units[start:end])
+        prev_end = end
+
+    # 只有第一个窗口就超出预算时才会截断
+    return '\n'.join(segments)[:max_chars]
+
 
-    return '\n'.join(segments)
+# CJK 字符范围（中日韩统一表意文字、假名、全角标点）
+_CJK_PATTERN = re.compile(r'[\u3000-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff00-\uffef]')
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    本地估算文本的 token 数（不调用分词器）
+
+    按 DeepSeek/GPT 类 BPE 分词器的经验比例：
+    一个中文字符约 0.6 token，其他字符约 0.3 token（约 3-4 个字符一个 token）
+    """
+    if not text:
+        return 0
+    cjk = len(_CJK_PATTERN.findall(text))
+    other = len(text) - cjk
+    return int(cjk * 0.6 + other * 0.3) + 1
 
 
 def split_into_paragraphs(text: str) -> List[str]:
@@ -131,6 +285,7 @@ def calculate_text_similarity(text1: str, text2: str) -> float:
     Returns:
         0-1 之间的相似度分数
     """
+    jieba = get_jieba()
     words1 = set(jieba.cut(text1.lower()))
     words2 = set(jieba.cut(text2.lower()))
 
@@ -0,0 +1,107 @@
+"""
+关键词定位微基准：locate_relevant_segments 与改动前实现的耗时对比
+
+- baseline：改动前的实现，逐行小写，每行对每个关键词做子串判断，按命中行取上下文
+- current：当前实现，按块用一个关键词交替式正则统计命中，BM25 给窗口打分
+
+页面为随机生成的中英文混排文本，density 为每个词是关键词的概率（1% 稀疏，10% 密集），
+报告 7 次运行中的最短耗时。
+
+用法：python scripts/bench_keyword_positions.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.utils.text_processing import (  # noqa: E402
+    _find_chunk_hits,
+    _normalize_keywords,
+    locate_relevant_segments,
+)
+
+KEYWORDS = ["大模型", "推理", "成本", "GPU", "latency", "量化", "throughput", "数据中心", "benchmark", "芯片"]
+FILLER = [f"词{i}" for i in range(2000)] + ["the", "and", "of", "system", "model", "data"] * 50
+CASES = [(1, 0.01, 10), (1, 0.1, 10), (4, 0.01, 10), (1, 0.01, 30), (4, 0.01, 30)]
+
+
+def make_page(megabytes: float, density: float, keyword_count: int):
+    """生成约 megabytes MB 的页面，density 为每个词是关键词的概率"""
+    keywords = KEYWORDS + [f"关键{i}" for i in range(keyword_count - len(KEYWORDS))]
+    lines, size = [], 0
+    while size < megabytes * 1_000_000:
+        line = " ".join(
+            random.choice(keywords) if random.random() < density else random.choice(FILLER)
+            for _ in range(random.randint(5, 40))
+        )
+        lines.append(line)
+        size += len(line) + 1
+    return "\n".join(lines), keywords
+
+
+def locate_baseline(content: str, keywords, context_lines: int = 2, max_segments: int = 5) -> str:
+    """对照组：改动前的 locate_relevant_segments（逐行小写，每行对每个关键词做子串判断）"""
+    if not content or not keywords:
+        return content[:1000] if content else ""
+
+    lines = content.split('\n')
+    line_scores = []
+    for i, line in enumerate(lines):
+        line_lower = line.lower()
+        score = sum(1 for kw in keywords if kw.lower() in line_lower)
+        if score > 0:
+            line_scores.append((i, score))
+    line_scores.sort(key=lambda x: x[1], reverse=True)
+
+    selected_lines = set()
+    for line_idx, _ in line_scores[:max_segments]:
+        start = max(0, line_idx - context_lines)
+        end = min(len(lines), line_idx + context_lines + 1)
+        for i in range(start, end):
+            selected_lines.add(i)
+
+    if not selected_lines:
+        head = '\n'.join(lines[:10])
+        tail = '\n'.join(lines[-5:]) if len(lines) > 15 else ""
+        return f"{head}\n...\n{tail}" if tail else head
+
+    segments = []
+    prev_idx = -2
+    for idx in sorted(selected_lines):
+        if idx > prev_idx + 1:
+            segments.append("...")
+        segments.append(lines[idx])
+        prev_idx = idx
+    return '\n'.join(segments)
+
+
+def best_of(func, *args, runs: int = 7) -> float:
+    """最短耗时（毫秒）"""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def main():
+    random.seed(1)
+    print(f"{'page':>24}  {'baseline':>9}  {'current':>9}  {'speedup':>7}")
+    for megabytes, density, keyword_count in CASES:
+        content, keywords = make_page(megabytes, density, keyword_count)
+        baseline_ms = best_of(locate_baseline, content, keywords)
+        current_ms = best_of(locate_relevant_segments, content, keywords)
+        label = f"{megabytes}MB {density:.0%} kw={keyword_count}"
+        print(f"{label:>24}  {baseline_ms:7.1f}ms  {current_ms:7.1f}ms  {baseline_ms / current_ms:6.2f}x")
+
+    # 长词优先：关键词互相包含时只计入较长的一个
+    overlap = _find_chunk_hits("大模型推理成本", _normalize_keywords(["模型", "大模型", "推理"]), [7])
+    print("overlap:", overlap)
+    assert overlap == [["大模型", "推理"]], overlap
+
+
+if __name__ == "__main__":
+    main()
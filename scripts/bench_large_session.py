@@ -0,0 +1,164 @@
+"""
+大会话基准：数百个来源的研究会话中，最终状态的两种获取方式的 CPU 与内存对比
+
+- replay：只订阅 updates，按节点输出手工合并出最终状态（sources 用 merge_sources，
+  列表字段每次拼接出新列表）——research_stream 早先的做法
+- values：同时订阅 values，直接取 LangGraph 归约后的最后一个状态——当前的做法
+
+LLM 和 Tavily 用本地桩代替（不发出网络请求），每个查询返回 30 条结果，
+Analyzer 每轮都要求新的查询并复述已有发现，10 轮后约 600 个来源。
+报告每种方式的进程 CPU 时间、其中手工合并的 CPU 时间和 tracemalloc 峰值（两者分开运行测量）。
+
+用法：python scripts/bench_large_session.py [迭代次数]
+"""
+import asyncio
+import itertools
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# 桩环境：不读写缓存、检查点和产物，不限速
+os.environ.update(
+    CACHE_DB_PATH="",
+    LLM_CACHE_ENABLED="false",
+    SEARCH_CACHE_ENABLED="false",
+    REPORT_CACHE_ENABLED="false",
+    CHECKPOINT_DB_PATH="",
+    ARTIFACTS_ENABLED="false",
+    LLM_RATE_LIMIT_RPM="0",
+    LLM_RATE_LIMIT_TPM="0",
+    SEARCH_RATE_LIMIT_RPM="0",
+    SEARCH_SESSION_MAX_REQUESTS="0",
+    PREFETCH_TOP_K="0",
+    DEEPSEEK_API_KEY=os.environ.get("DEEPSEEK_API_KEY") or "sk-bench",
+)
+
+import backend.utils.llm_client as llm_client  # noqa: E402
+import backend.utils.tavily_client as tavily_client  # noqa: E402
+from backend.graph.state import merge_findings, merge_sources  # noqa: E402
+from backend.graph.workflow import compile_research_graph  # noqa: E402
+from backend.main import ResearchRequest, _initial_state  # noqa: E402
+
+RESULTS_PER_QUERY = 30
+_query_ids = itertools.count()
+
+
+class _Response:
+    def __init__(self, content: str):
+        self.content = content
+        self.usage_metadata = None
+
+
+class _StubLLM:
+    """按 prompt 类型返回固定结构的 JSON"""
+
+    def __init__(self):
+        self.rounds = 0
+
+    def bind(self, **kwargs):
+        return self
+
+    async def ainvoke(self, prompt: str):
+        if "研究规划" in prompt:
+            return _Response(json.dumps({"sub_queries": ["a", "b"], "keywords": ["k"], "reasoning": ""}))
+        if "研究分析" in prompt:
+            self.rounds += 1
+            return _Response(json.dumps({
+                "decision": "new_query",
+                "reasoning": "继续扩展",
+                "current_coverage": 0.5,
+                "new_queries": [f"q{next(_query_ids)}", f"q{next(_query_ids)}"],
+                "key_findings": [f"发现 {i}" for i in range(self.rounds * 10)],
+            }))
+        ids = [line.split(":", 1)[1].strip() for line in prompt.splitlines() if line.startswith("### source_id:")]
+        if ids:
+            return _Response(json.dumps({"sources": [
+                {"source_id": source_id, "summary": "摘要" * 100, "key_points": ["要点" * 20] * 5, "relevance": 0.9}
+                for source_id in ids
+            ]}))
+        return _Response(json.dumps({"summary": "摘要" * 100, "key_points": ["要点" * 20] * 5, "relevance": 0.9}))
+
+    async def astream(self, prompt: str):
+        yield _Response("报告")
+
+
+class _StubSearch:
+    async def search(self, query: str, **kwargs):
+        return {"results": [
+            {"title": f"{query} {i}", "url": f"http://{query}.example/{i}", "content": f"内容 {query} {i} " * 200, "score": 1}
+            for i in range(RESULTS_PER_QUERY)
+        ]}
+
+    async def extract(self, urls, **kwargs):
+        return {"results": [{"url": url, "raw_content": "全文 " * 500} for url in urls]}
+
+    async def close(self):
+        pass
+
+
+def _initial(iterations: int):
+    state = _initial_state(f"bench-{time.time_ns()}", ResearchRequest(topic="基准主题"))
+    state["max_iterations"] = iterations
+    return state
+
+
+async def replay(graph, iterations: int):
+    """只订阅 updates，手工合并最终状态"""
+    final = _initial(iterations)
+    merge_cpu = 0.0
+    async for update in graph.astream(dict(final), stream_mode="updates"):
+        for output in update.values():
+            start = time.process_time()
+            for key, value in (output or {}).items():
+                if key == "sources":
+                    final[key] = merge_sources(final.get(key, []), value)
+                elif key == "all_findings":
+                    final[key] = merge_findings(final.get(key, []), value)
+                elif key in ("messages", "near_duplicates"):
+                    final[key] = final.get(key, []) + value
+                else:
+                    final[key] = value
+            merge_cpu += time.process_time() - start
+    return final, merge_cpu
+
+
+async def values(graph, iterations: int):
+    """同时订阅 values，取归约后的最后一个状态"""
+    final = None
+    async for mode, chunk in graph.astream(_initial(iterations), stream_mode=["updates", "values"]):
+        if mode == "values":
+            final = chunk
+    return final, 0.0
+
+
+async def main(iterations: int):
+    llm = _StubLLM()
+    llm_client.get_llm = lambda temperature=0.3: llm
+    tavily_client.get_search_transport().async_client = _StubSearch()
+    graph = compile_research_graph()
+
+    print(f"{'mode':>7}  {'sources':>7}  {'messages':>8}  {'findings':>8}  {'cpu':>7}  {'merge':>7}  {'peak':>8}")
+    for name, run in (("replay", replay), ("values", values)) * 2:
+        # CPU 在不开 tracemalloc 时测量（tracemalloc 会让运行慢数倍），峰值内存另跑一次
+        llm.rounds = 0
+        start = time.process_time()
+        final, merge_cpu = await run(graph, iterations)
+        cpu = time.process_time() - start
+
+        llm.rounds = 0
+        tracemalloc.start()
+        await run(graph, iterations)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(
+            f"{name:>7}  {len(final['sources']):>7}  {len(final['messages']):>8}  {len(final['all_findings']):>8}  "
+            f"{cpu:6.2f}s  {merge_cpu * 1000:5.1f}ms  {peak / 1e6:6.1f}MB"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 10))
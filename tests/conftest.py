@@ -0,0 +1,156 @@
+"""
+测试夹具：用本地桩替换 DeepSeek 和 Tavily，不发出任何网络请求
+
+配置在导入时读取环境变量，因此在导入 backend 之前设置：关闭缓存、产物和限速，
+检查点和会话内容存储写到临时目录。
+"""
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+
+_tmp = tempfile.mkdtemp(prefix="deep-research-tests-")
+os.environ.update(
+    DEEPSEEK_API_KEY="sk-test",
+    TAVILY_API_KEY="tvly-test",
+    CACHE_DB_PATH="",
+    LLM_CACHE_ENABLED="false",
+    SEARCH_CACHE_ENABLED="false",
+    REPORT_CACHE_ENABLED="false",
+    ARTIFACTS_ENABLED="false",
+    WARMUP_ON_STARTUP="false",
+    CHECKPOINT_DB_PATH=os.path.join(_tmp, "checkpoints.sqlite3"),
+    CONTENT_STORE_DIR=os.path.join(_tmp, "content"),
+    LLM_RATE_LIMIT_RPM="0",
+    LLM_RATE_LIMIT_TPM="0",
+    SEARCH_RATE_LIMIT_RPM="0",
+    PREFETCH_TOP_K="0",
+    JOB_WORKERS="4",
+)
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+import backend.main as main  # noqa: E402
+import backend.utils.llm_client as llm_client  # noqa: E402
+import backend.utils.tavily_client as tavily_client  # noqa: E402
+
+
+class _Response:
+    def __init__(self, content: str):
+        self.content = content
+        self.usage_metadata = None
+
+
+class StubLLM:
+    """
+    按 prompt 类型返回固定 JSON：规划出 sub_queries，分析直接给出 sufficient，摘要按 source_id 逐条返回
+
+    fail_analyzer 为 True 时 Analyzer 调用抛出异常（模拟 worker 中途失败）；
+    calls 记录每次调用的 (开始, 结束) 时间
+    """
+
+    def __init__(self, sub_queries=("a", "b", "c")):
+        self.sub_queries = list(sub_queries)
+        self.fail_analyzer = False
+        self.calls = []
+
+    def bind(self, **kwargs):
+        return self
+
+    async def ainvoke(self, prompt: str):
+        start = time.perf_counter()
+        try:
+            await asyncio.sleep(0.005 + random.random() * 0.01)
+            return self._respond(prompt)
+        finally:
+            self.calls.append((start, time.perf_counter()))
+
+    def _respond(self, prompt: str):
+        if "研究规划" in prompt:
+            return _Response(json.dumps({"sub_queries": self.sub_queries, "keywords": ["k"], "reasoning": ""}))
+        if "研究分析" in prompt:
+            if self.fail_analyzer:
+                raise RuntimeError("analyzer crashed")
+            return _Response(json.dumps({
+                "decision": "sufficient",
+                "reasoning": "覆盖充分",
+                "current_coverage": 0.9,
+                "key_findings": ["发现"],
+            }))
+        ids = [line.split(":", 1)[1].strip() for line in prompt.splitlines() if line.startswith("### source_id:")]
+        if ids:
+            return _Response(json.dumps({"sources": [
+                {"source_id": source_id, "summary": "摘要", "key_points": ["要点"], "relevance": 0.9}
+                for source_id in ids
+            ]}))
+        return _Response(json.dumps({"summary": "摘要", "key_points": ["要点"], "relevance": 0.9}))
+
+    async def astream(self, prompt: str):
+        for chunk in ("报告", "正文"):
+            yield _Response(chunk)
+
+
+class StubSearch:
+    """
+    每个查询返回固定的结果，响应延迟随机（结果到达顺序与查询顺序无关）
+
+    calls 记录每次搜索的 (开始, 结束) 时间
+    """
+
+    def __init__(self):
+        self.calls = []
+
+    async def search(self, query: str, max_results: int = 3, **kwargs):
+        start = time.perf_counter()
+        await asyncio.sleep(0.02 + random.random() * 0.05)
+        self.calls.append((start, time.perf_counter()))
+        return {"results": [
+            {
+                "title": f"{query} {i}",
+                "url": f"https://{query}.example.com/{i}",
+                "content": f"{query} 的第 {i} 条结果 " + " ".join(f"w{query}{i}_{j}" for j in range(40)),
+                "score": 1.0,
+            }
+            for i in range(max_results)
+        ]}
+
+    async def extract(self, urls, **kwargs):
+        return {"results": [{"url": url, "raw_content": f"{url} 全文"} for url in urls]}
+
+    async def close(self):
+        pass
+
+
+@pytest.fixture
+def llm(monkeypatch) -> StubLLM:
+    stub = StubLLM()
+    monkeypatch.setattr(llm_client, "get_llm", lambda temperature=0.3: stub)
+    return stub
+
+
+@pytest.fixture
+def search() -> StubSearch:
+    return StubSearch()
+
+
+@pytest.fixture
+def client(llm, search):
+    """启动应用（含任务 worker 和检查点），搜索使用 StubSearch"""
+    with TestClient(main.app) as test_client:
+        tavily_client.get_search_transport().async_client = search
+        yield test_client
+
+
+def parse_events(body: str):
+    """把 SSE 响应体解析为 [(事件类型, 数据)]"""
+    events = []
+    event = None
+    for line in body.splitlines():
+        if line.startswith("event: "):
+            event = line[len("event: "):]
+        elif line.startswith("data: "):
+            events.append((event, json.loads(line[len("data: "):])))
+    return events
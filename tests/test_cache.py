@@ -0,0 +1,116 @@
+"""两级缓存：TTL 过期、LRU 淘汰、内存层大小上限和磁盘层"""
+import asyncio
+
+import pytest
+
+import backend.utils.cache as cache_module
+from backend.utils.cache import TieredCache
+
+
+class _Clock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> _Clock:
+    clock = _Clock()
+    monkeypatch.setattr(cache_module.time, "time", clock)
+    return clock
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = TieredCache("t", ttl=10)
+    cache.set("default", 1)
+    cache.set("short", 2, ttl=1)
+
+    clock.now += 5
+    assert cache.get("default") == 1
+    assert cache.get("short") is None
+
+    clock.now += 10
+    assert cache.get("default") is None
+    assert cache.stats()["expired"] == 2
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = TieredCache("t", ttl=60, max_memory_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # a 变为最近使用
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_memory_tier_respects_byte_cap():
+    cache = TieredCache("t", ttl=60, max_memory_bytes=100)
+    for i in range(5):
+        cache.set(f"k{i}", "x" * 30)  # 每个约 32 字节
+        assert cache.stats()["memory_bytes"] <= 100
+
+    stats = cache.stats()
+    assert stats["memory_entries"] == 3
+    assert cache.get("k0") is None and cache.get("k4") == "x" * 30
+
+    # 单个值超过上限时不进入内存层
+    cache.set("big", "x" * 200)
+    assert cache.get("big") is None
+    assert cache.get("k4") == "x" * 30
+
+
+def test_disk_tier_survives_restart_and_backfills_memory(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = TieredCache("t", ttl=60, db_path=path)
+    cache.set("k", {"v": [1, 2]})
+    cache.flush()
+
+    reopened = TieredCache("t", ttl=60, db_path=path)
+    assert reopened.get("k") == {"v": [1, 2]}
+    assert reopened.get("k") == {"v": [1, 2]}
+    stats = reopened.stats()
+    assert (stats["disk_hits"], stats["memory_hits"]) == (1, 1)
+
+    # 命名空间互相隔离
+    assert TieredCache("other", ttl=60, db_path=path).get("k") is None
+
+
+def test_disk_tier_expires_and_evicts_by_access_time(tmp_path, clock):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = TieredCache("t", ttl=60, max_memory_entries=1, max_disk_entries=2, db_path=path)
+    cache.set("old", 1)
+    clock.now += 1
+    cache.set("new", 2)
+    clock.now += 1
+    cache.set("newest", 3)
+    cache.flush()
+
+    stats = cache.stats()
+    assert stats["disk_entries"] == 2
+    assert stats["evictions"] >= 1
+    assert cache.get("old") is None
+    assert cache.get("new") == 2
+
+    clock.now += 120
+    assert cache.get("new") is None
+    cache.flush()
+    assert cache.stats()["disk_entries"] == 1
+
+
+def test_aget_many_reads_memory_and_disk(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    writer = TieredCache("t", ttl=60, db_path=path)
+    writer.set("disk", 1)
+    writer.flush()
+
+    cache = TieredCache("t", ttl=60, db_path=path)
+    cache.set("memory", 2)
+    hits = asyncio.run(cache.aget_many(["memory", "disk", "missing", "disk"]))
+
+    assert hits == {"memory": 2, "disk": 1}
+    assert cache.stats()["misses"] == 1
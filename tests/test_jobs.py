@@ -0,0 +1,80 @@
+"""任务事件日志：报告分块合并、字节上限和订阅回放"""
+import asyncio
+
+from backend.utils.jobs import CHUNK_MERGE_BYTES, COMPLETED, Job
+
+
+def _chunk(content: str) -> dict:
+    return {"event": "report_chunk", "data": {"content": content}}
+
+
+def _report(events) -> str:
+    return "".join(event["data"]["content"] for event in events if event["event"] == "report_chunk")
+
+
+async def _collect(job: Job, after: int = 0):
+    return [event async for event in job.subscribe(after)]
+
+
+def test_report_chunks_are_coalesced_in_the_log():
+    job = Job("j", None)
+    job.append({"event": "report_start", "data": {}})
+    tokens = [f"t{i} " for i in range(2000)]
+    for token in tokens:
+        job.append(_chunk(token))
+    job.append({"event": "complete", "data": {}})
+    job.finish(COMPLETED)
+
+    # 每条合并后的分块不超过 CHUNK_MERGE_BYTES，日志条目数远少于 token 数
+    assert len(job.events) < len(tokens) / 100
+    assert all(len(event["data"]["content"]) <= CHUNK_MERGE_BYTES for event in list(job.events)[1:-1])
+    assert job.info()["events"] == len(job.events)
+
+    events = asyncio.run(_collect(job))
+    assert events[0]["event"] == "report_start" and events[-1]["event"] == "complete"
+    assert _report(events) == "".join(tokens)
+
+
+def test_live_subscriber_receives_tokens_appended_to_a_merged_chunk():
+    async def main():
+        job = Job("j", None)
+        received = []
+
+        async def subscriber():
+            async for event in job.subscribe():
+                received.append(event)
+
+        task = asyncio.create_task(subscriber())
+        tokens = []
+        for i in range(50):
+            tokens.append(f"t{i}")
+            job.append(_chunk(tokens[-1]))
+            await asyncio.sleep(0)
+            # 合并进同一条日志的 token 也立即推送，且不重复
+            assert _report(received) == "".join(tokens)
+        job.finish(COMPLETED)
+        await task
+        return job, received
+
+    job, received = asyncio.run(main())
+    assert len(job.events) == 1
+    assert len(received) == 50
+
+
+def test_byte_cap_drops_oldest_events():
+    job = Job("j", None, max_bytes=1000)
+    for i in range(100):
+        job.append({"event": "node_output", "data": {"index": i, "text": "x" * 40}})
+    job.finish(COMPLETED)
+
+    info = job.info()
+    assert info["event_bytes"] <= 1000
+    assert info["dropped_events"] > 0
+    assert info["events"] == 100
+
+    events = asyncio.run(_collect(job))
+    assert events[0] == {"event": "events_dropped", "data": {"dropped": job.dropped, "next": job.dropped}}
+    assert [event["data"]["index"] for event in events[1:]] == list(range(job.dropped, 100))
+
+    # 回放位置仍在日志内时不受影响
+    assert [event["data"]["index"] for event in asyncio.run(_collect(job, after=98))] == [98, 99]
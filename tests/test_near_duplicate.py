@@ -0,0 +1,77 @@
+"""近似重复检测：MinHash 相似度估计和 LSH 阈值行为"""
+import random
+
+from backend.utils.near_duplicate import (
+    NearDuplicateIndex,
+    choose_bands,
+    estimate_similarity,
+    minhash_signature,
+    text_shingles,
+)
+
+
+def _article(seed: int, words: int = 300) -> str:
+    rng = random.Random(seed)
+    return " ".join(f"w{rng.randrange(5000)}" for _ in range(words))
+
+
+def _edit(text: str, fraction: float, seed: int = 0) -> str:
+    """替换 fraction 比例的词"""
+    rng = random.Random(seed)
+    words = text.split()
+    for i in rng.sample(range(len(words)), int(len(words) * fraction)):
+        words[i] = f"x{rng.randrange(5000)}"
+    return " ".join(words)
+
+
+def _jaccard(a: str, b: str) -> float:
+    sa, sb = text_shingles(a), text_shingles(b)
+    return len(sa & sb) / len(sa | sb)
+
+
+def test_choose_bands_puts_s_curve_knee_near_threshold():
+    for threshold in (0.5, 0.7, 0.8, 0.9):
+        bands, rows = choose_bands(64, threshold)
+        assert bands * rows == 64
+        assert abs((1 / bands) ** (1 / rows) - threshold) < 0.1
+
+
+def test_signature_estimates_jaccard():
+    base = _article(1)
+    for fraction in (0.02, 0.1, 0.3, 0.6):
+        other = _edit(base, fraction)
+        estimate = estimate_similarity(minhash_signature(base, 128), minhash_signature(other, 128))
+        assert abs(estimate - _jaccard(base, other)) < 0.15, fraction
+
+
+def test_signature_ignores_case_whitespace_and_punctuation():
+    # 只有前 MAX_SIGNATURE_CHARS 个字符参与签名，用短文本避免格式变化改变截断位置
+    text = _article(2, words=100)
+    assert minhash_signature(text) == minhash_signature(text.upper().replace(" ", "  ,"))
+    assert minhash_signature("") is None
+    assert minhash_signature("... !!!") is None
+
+
+def test_index_collapses_near_duplicates_above_threshold():
+    index = NearDuplicateIndex(threshold=0.8)
+    original = _article(3)
+    assert index.add("src_1", original) is None
+
+    # 转载时改了几个词：Jaccard 远高于阈值，折叠到原文
+    match = index.add("src_2", _edit(original, 0.01))
+    assert match is not None and match[0] == "src_1" and match[1] >= 0.8
+
+    # 改写了一半内容、完全无关的文章都不折叠，并登记为新文档
+    assert index.add("src_3", _edit(original, 0.5, seed=1)) is None
+    assert index.add("src_4", _article(4)) is None
+    assert len(index) == 3
+
+
+def test_index_matches_the_most_similar_document():
+    index = NearDuplicateIndex(threshold=0.5)
+    original = _article(5)
+    for key, fraction in (("far", 0.15), ("near", 0.02)):
+        index.insert(key, index.signature(_edit(original, fraction, seed=1)))
+
+    match = index.query(index.signature(original))
+    assert match is not None and match[0] == "near"
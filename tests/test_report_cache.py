@@ -0,0 +1,97 @@
+"""研究报告缓存：新鲜/过期判定和 stale-while-revalidate"""
+import asyncio
+import time
+
+import pytest
+
+import backend.utils.cache as cache_module
+import backend.utils.report_cache as report_cache_module
+from backend.utils.report_cache import ReportCache
+from tests.conftest import parse_events
+
+
+class _Clock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch) -> _Clock:
+    clock = _Clock()
+    monkeypatch.setattr(cache_module.time, "time", clock)
+    return clock
+
+
+def test_entries_are_fresh_then_stale_then_gone(clock):
+    cache = ReportCache(ttl=10, stale_ttl=20)
+    cache.set("k", "报告", sources_count=3, iterations=2)
+
+    entry, stale = asyncio.run(cache.get("k"))
+    assert (entry["report"], entry["sources_count"], entry["iterations"], stale) == ("报告", 3, 2, False)
+
+    clock.now += 15
+    assert asyncio.run(cache.get("k"))[1] is True
+
+    clock.now += 20
+    assert asyncio.run(cache.get("k")) is None
+
+    stats = cache.stats()
+    assert (stats["fresh_hits"], stats["stale_hits"]) == (1, 1)
+
+
+def test_without_stale_window_expired_reports_miss(clock):
+    cache = ReportCache(ttl=10)
+    cache.set("k", "报告", sources_count=1, iterations=1)
+    clock.now += 11
+    assert asyncio.run(cache.get("k")) is None
+
+
+def test_refresh_is_registered_once_per_key():
+    cache = ReportCache()
+    assert cache.begin_refresh("k")
+    assert not cache.begin_refresh("k")
+    assert cache.begin_refresh("other")
+    cache.end_refresh("k")
+    assert cache.begin_refresh("k")
+    assert cache.stats()["refreshes"] == 3
+
+
+def test_key_normalizes_topic_and_separates_parameters():
+    assert ReportCache.key("  大模型 推理 ", "balanced", 2, 1) == ReportCache.key("大模型 推理", "balanced", 2, 1)
+    assert ReportCache.key("主题", "balanced", 2, 1) != ReportCache.key("主题", "depth", 2, 1)
+    assert ReportCache.key("主题", "balanced", 2, 1) != ReportCache.key("主题", "balanced", 3, 1)
+
+
+def _research(client, topic: str):
+    response = client.post("/research", json={"topic": topic, "max_iterations": 1})
+    assert response.status_code == 202
+    events = parse_events(client.get(f"/research/{response.json()['research_id']}/events").text)
+    start = dict(events)["start"]
+    return start.get("cached", False), start.get("stale", False)
+
+
+def test_stale_report_is_replayed_and_refreshed_in_background(client, llm, monkeypatch):
+    cache = ReportCache(ttl=0.5, stale_ttl=60)
+    monkeypatch.setattr(report_cache_module, "_report_cache", cache)
+    topic = "过期刷新主题"
+
+    assert _research(client, topic) == (False, False)
+    calls = len(llm.calls)
+    assert _research(client, topic) == (True, False)
+    assert len(llm.calls) == calls
+
+    time.sleep(0.55)
+    # 过期报告立即回放，同时提交后台刷新
+    assert _research(client, topic) == (True, True)
+    deadline = time.monotonic() + 10
+    while cache.stats()["refreshing"] and time.monotonic() < deadline:
+        time.sleep(0.02)
+
+    stats = cache.stats()
+    assert (stats["refreshes"], stats["refreshing"]) == (1, 0)
+    assert len(llm.calls) > calls
+    # 刷新完成后报告重新变为新鲜
+    assert _research(client, topic) == (True, False)
@@ -0,0 +1,110 @@
+"""
+研究流程的端到端测试（LLM 和搜索均为桩）
+
+- 并发提交的多个会话同时推进并全部完成，期间事件循环不被阻塞
+- 来源 ID 按查询顺序分配，与搜索结果的到达顺序无关
+- 中途失败的研究可以从检查点恢复，恢复结束后不会残留运行登记
+"""
+import asyncio
+
+import backend.main as main
+from backend.config import config
+from backend.graph.workflow import compile_research_graph
+from tests.conftest import parse_events
+
+
+def _event_names(events):
+    return [name for name, _ in events]
+
+
+async def _watch_loop_lag(running, lags, interval: float = 0.005):
+    """在应用的事件循环中反复 sleep，记录每次比预期晚醒来多久（阻塞调用会拉高延迟）"""
+    loop = asyncio.get_running_loop()
+    while running:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        lags.append(loop.time() - start - interval)
+
+
+def _peak_overlap(intervals):
+    """同一时刻进行中的区间数的最大值"""
+    edges = sorted([(start, 1) for start, _ in intervals] + [(end, -1) for _, end in intervals])
+    peak = current = 0
+    for _, delta in edges:
+        current += delta
+        peak = max(peak, current)
+    return peak
+
+
+def test_concurrent_sessions_make_progress_together(client, llm, search):
+    # 会话数等于 worker 数，全部会话同时运行而不是排队
+    sessions = config.JOB_WORKERS
+    running, lags = [True], []
+    watcher = client.portal.start_task_soon(_watch_loop_lag, running, lags)
+
+    ids = []
+    for i in range(sessions):
+        response = client.post("/research", json={"topic": f"并发主题 {i}", "max_iterations": 1})
+        assert response.status_code == 202
+        ids.append(response.json()["research_id"])
+
+    for research_id in ids:
+        events = parse_events(client.get(f"/research/{research_id}/events").text)
+        names = _event_names(events)
+        assert "error" not in names, events
+        assert "complete" in names
+
+    running.clear()
+    watcher.result(timeout=5)
+
+    infos = [client.get(f"/research/{research_id}").json() for research_id in ids]
+    assert all(info["status"] == "completed" for info in infos)
+    assert main._active_research == set()
+
+    # 所有会话的运行区间有共同的时刻，总耗时远小于各会话耗时之和（串行执行时两者相等）
+    starts = [info["started_at"] for info in infos]
+    ends = [info["finished_at"] for info in infos]
+    assert max(starts) < min(ends)
+    assert max(ends) - min(starts) < sum(end - start for start, end in zip(starts, ends)) / 2
+
+    # 单个会话最多同时发出 len(sub_queries) 个搜索，更高的峰值说明不同会话的请求交错进行
+    assert _peak_overlap(search.calls) > len(llm.sub_queries)
+
+    # 会话运行期间事件循环没有被同步调用阻塞
+    assert lags and max(lags) < 0.1, max(lags)
+
+
+def test_source_ids_follow_query_order(client):
+    async def run_once(session_id):
+        graph = compile_research_graph()
+        state = await graph.ainvoke(
+            main._initial_state(session_id, main.ResearchRequest(topic="来源编号", max_iterations=1))
+        )
+        return [(source["id"], source["url"]) for source in state["sources"]]
+
+    runs = {tuple(client.portal.call(run_once, f"ids-{i}")) for i in range(5)}
+
+    # 搜索延迟随机，多次运行的 ID → URL 映射仍然一致，且按查询顺序连续编号
+    assert len(runs) == 1
+    sources = runs.pop()
+    assert [source_id for source_id, _ in sources] == [f"src_{i}" for i in range(1, len(sources) + 1)]
+    assert [url for _, url in sources][:3] == [f"https://a.example.com/{i}" for i in range(3)]
+
+
+def test_resume_after_failure(client, llm):
+    # 最后一轮的 Analyzer 不调用 LLM，需要两轮才会走到失败点
+    llm.fail_analyzer = True
+    events = parse_events(client.post("/research/stream", json={"topic": "恢复主题", "max_iterations": 2}).text)
+    start, error = events[0][1], events[-1]
+    research_id = start["research_id"]
+    assert error[0] == "error" and error[1]["resumable"]
+
+    llm.fail_analyzer = False
+    events = parse_events(client.post(f"/research/{research_id}/resume").text)
+    names = _event_names(events)
+    assert events[0][1]["resumed"] and events[0][1]["next"] == ["analyzer"]
+    assert "complete" in names and "error" not in names
+    assert research_id not in main._active_research
+
+    # 完成后检查点已删除
+    assert client.post(f"/research/{research_id}/resume").status_code == 404
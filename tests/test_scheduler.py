@@ -0,0 +1,122 @@
+"""出站调用调度：优先级、会话公平排队、429 暂停与重新排队"""
+import asyncio
+import time
+
+import pytest
+
+import backend.utils.llm_client as llm_client
+import backend.utils.scheduler as scheduler_module
+from backend.utils.scheduler import (
+    PRIORITY_BACKGROUND,
+    PRIORITY_INTERACTIVE,
+    PRIORITY_NORMAL,
+    RateLimitExhaustedError,
+    RateScheduler,
+    TokenBucket,
+)
+
+
+def _scheduler(rate_per_minute: float = 600) -> RateScheduler:
+    """每秒 rate_per_minute / 60 个请求、容量 1 的单桶调度器：排队中的请求逐个放行"""
+    return RateScheduler({"requests": TokenBucket(rate_per_minute, 0.1)}, {"api": ["requests"]})
+
+
+async def _run(scheduler: RateScheduler, calls):
+    """先用一个请求取空令牌桶，再按顺序提交 calls = [(名称, 会话, 优先级)]，返回放行顺序"""
+    order = []
+
+    async def call(name, session, priority):
+        async with scheduler.acquire("api", session, priority):
+            order.append(name)
+
+    await call("warmup", "warmup", PRIORITY_NORMAL)
+    await asyncio.gather(*(call(*args) for args in calls))
+    return order[1:]
+
+
+def test_higher_priority_requests_go_first():
+    order = asyncio.run(_run(_scheduler(), [
+        ("background", "s", PRIORITY_BACKGROUND),
+        ("normal", "s", PRIORITY_NORMAL),
+        ("interactive", "s", PRIORITY_INTERACTIVE),
+    ]))
+    assert order == ["interactive", "normal", "background"]
+
+
+def test_sessions_are_interleaved_within_a_priority():
+    calls = [(f"a{i}", "a", PRIORITY_NORMAL) for i in range(4)]
+    calls += [(f"b{i}", "b", PRIORITY_NORMAL) for i in range(2)]
+    order = asyncio.run(_run(_scheduler(), calls))
+    # 会话 a 先提交了 4 个请求，会话 b 的请求不必排在它们全部之后
+    assert order == ["a0", "b0", "a1", "b1", "a2", "a3"]
+
+
+def test_throttle_pauses_even_unlimited_buckets():
+    scheduler = _scheduler(rate_per_minute=0)
+
+    async def main():
+        async with scheduler.acquire("api"):
+            pass
+        scheduler.throttle("api", 0.2)
+        start = time.monotonic()
+        async with scheduler.acquire("api"):
+            return time.monotonic() - start
+
+    assert asyncio.run(main()) >= 0.19
+    assert scheduler.stats()["api"]["rate_limited"] == 1
+
+
+class _RateLimited(Exception):
+    status_code = 429
+
+    class response:
+        headers = {"retry-after": "0.05"}
+
+
+class _FlakyLLM:
+    """前 failures 次调用返回 429"""
+
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.calls = []
+
+    def bind(self, **kwargs):
+        return self
+
+    async def ainvoke(self, prompt):
+        self.calls.append(time.monotonic())
+        if len(self.calls) <= self.failures:
+            raise _RateLimited("too many requests")
+        return type("Response", (), {"content": "ok", "usage_metadata": None})()
+
+
+@pytest.fixture
+def scheduler(monkeypatch) -> RateScheduler:
+    monkeypatch.setattr(scheduler_module, "_scheduler", None)
+    return scheduler_module.get_scheduler()
+
+
+def test_llm_429_pauses_and_requeues(monkeypatch, scheduler):
+    llm = _FlakyLLM(failures=2)
+    monkeypatch.setattr(llm_client, "get_llm", lambda temperature=0.3: llm)
+
+    assert asyncio.run(llm_client.ainvoke_llm("prompt", use_cache=False)) == "ok"
+
+    # 每次 429 后按 Retry-After 暂停再重新排队
+    assert len(llm.calls) == 3
+    assert all(later - earlier >= 0.045 for earlier, later in zip(llm.calls, llm.calls[1:]))
+    stats = scheduler.stats()["llm"]
+    assert (stats["rate_limited"], stats["exhausted"], stats["granted"]) == (2, 0, 3)
+
+
+def test_llm_429_retries_are_bounded(monkeypatch, scheduler):
+    monkeypatch.setattr(llm_client.config, "RATE_LIMIT_RETRIES", 1)
+    llm = _FlakyLLM(failures=10)
+    monkeypatch.setattr(llm_client, "get_llm", lambda temperature=0.3: llm)
+
+    with pytest.raises(RateLimitExhaustedError) as raised:
+        asyncio.run(llm_client.ainvoke_llm("prompt", use_cache=False))
+
+    assert raised.value.resource == "llm" and raised.value.attempts == 2
+    assert len(llm.calls) == 2
+    assert scheduler.stats()["llm"]["exhausted"] == 1
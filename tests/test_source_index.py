@@ -0,0 +1,47 @@
+"""来源身份索引：URL 规范化、内容指纹和去重"""
+from backend.utils.source_index import canonicalize_url, content_fingerprint, deduplicate_results
+
+
+def test_canonicalize_url_collapses_equivalent_forms():
+    canonical = "https://example.com/a/b?id=1&page=2"
+    for url in [
+        "https://example.com/a/b?id=1&page=2",
+        "http://www.Example.com:80/a//b/?page=2&id=1",
+        "https://example.com:443/a/b?utm_source=x&id=1&page=2&gclid=y#top",
+    ]:
+        assert canonicalize_url(url) == canonical, url
+
+
+def test_canonicalize_url_keeps_meaningful_differences():
+    assert canonicalize_url("https://example.com:8080/a") == "https://example.com:8080/a"
+    assert canonicalize_url("https://example.com/a?id=1") != canonicalize_url("https://example.com/a?id=2")
+    assert canonicalize_url("https://example.com/a") != canonicalize_url("https://example.com/b")
+    # 非 http(s) 和空 URL 原样返回
+    assert canonicalize_url("ftp://example.com/a") == "ftp://example.com/a"
+    assert canonicalize_url("") == ""
+
+
+def test_content_fingerprint_ignores_whitespace_case_and_punctuation():
+    fingerprint = content_fingerprint("Hello, World! 大模型推理")
+    assert fingerprint
+    assert content_fingerprint("hello world\n\n大模型 推理。") == fingerprint
+    assert content_fingerprint("ＨＥＬＬＯ　ｗｏｒｌｄ 大模型推理") == fingerprint
+    assert content_fingerprint("hello world 大模型训练") != fingerprint
+    assert content_fingerprint("") == ""
+    assert content_fingerprint("!!! ...") == ""
+
+
+def test_deduplicate_results_against_sources_and_batch():
+    sources = [{"id": "src_1", "url": "https://example.com/a", "fingerprint": ""}]
+    results = [
+        {"id": "src_2", "url": "http://www.example.com/a/", "query": "q1", "queries": ["q1"], "fingerprint": ""},
+        {"id": "src_3", "url": "https://other.com/x", "query": "q1", "queries": ["q1"], "fingerprint": "f1"},
+        {"id": "src_4", "url": "https://mirror.com/y", "query": "q2", "queries": ["q2"], "fingerprint": "f1"},
+    ]
+
+    kept, provenance, skipped = deduplicate_results(results, sources)
+
+    assert [result["id"] for result in kept] == ["src_3"]
+    assert kept[0]["queries"] == ["q1", "q2"]
+    assert provenance == [{"id": "src_1", "queries": ["q1"]}]
+    assert skipped == 2
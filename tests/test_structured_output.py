@@ -0,0 +1,80 @@
+"""结构化输出：校验、一次性修复和统计"""
+import asyncio
+from typing import List
+
+import pytest
+from pydantic import BaseModel, Field
+
+import backend.utils.llm_client as llm_client
+from backend.utils.llm_client import StructuredOutputError, ainvoke_structured, structured_output_stats
+
+
+class _Plan(BaseModel):
+    sub_queries: List[str]
+    coverage: float = Field(ge=0, le=1)
+
+
+class _ScriptedLLM:
+    """按顺序返回预设的响应，prompts 记录每次收到的 prompt"""
+
+    def __init__(self, *responses: str):
+        self.responses = list(responses)
+        self.prompts = []
+
+    def bind(self, **kwargs):
+        return self
+
+    async def ainvoke(self, prompt: str):
+        self.prompts.append(prompt)
+        return type("Response", (), {"content": self.responses.pop(0), "usage_metadata": None})()
+
+
+@pytest.fixture
+def script(monkeypatch):
+    def install(*responses: str) -> _ScriptedLLM:
+        llm = _ScriptedLLM(*responses)
+        monkeypatch.setattr(llm_client, "get_llm", lambda temperature=0.3: llm)
+        return llm
+    return install
+
+
+def _stats(node: str) -> dict:
+    stats = structured_output_stats()[node]
+    return {key: stats[key] for key in ("calls", "valid", "repaired", "failed")}
+
+
+def test_valid_output_is_parsed_without_repair(script):
+    llm = script('说明文字 ```json\n{"sub_queries": ["a"], "coverage": 0.5}\n```')
+
+    plan = asyncio.run(ainvoke_structured("原始 prompt", _Plan, node="valid-node"))
+
+    assert plan == _Plan(sub_queries=["a"], coverage=0.5)
+    assert len(llm.prompts) == 1
+    assert _stats("valid-node") == {"calls": 1, "valid": 1, "repaired": 0, "failed": 0}
+
+
+def test_invalid_output_is_repaired_once(script):
+    invalid = '{"sub_queries": ["a"], "coverage": 3}'
+    llm = script(invalid, '{"sub_queries": ["a"], "coverage": 1}')
+
+    plan = asyncio.run(ainvoke_structured("原始 prompt", _Plan, node="repaired-node"))
+
+    assert plan.coverage == 1
+    # 修复 prompt 只带校验错误、原输出和 Schema，不重发原 prompt
+    repair_prompt = llm.prompts[1]
+    assert "原始 prompt" not in repair_prompt
+    assert invalid in repair_prompt
+    assert "coverage" in repair_prompt and "less_than_equal" in repair_prompt
+    assert '"required": ["sub_queries", "coverage"]' in repair_prompt
+    assert _stats("repaired-node") == {"calls": 1, "valid": 0, "repaired": 1, "failed": 0}
+
+
+def test_failed_repair_raises_without_retrying_again(script):
+    llm = script("没有 JSON", '{"sub_queries": "a"}')
+
+    with pytest.raises(StructuredOutputError):
+        asyncio.run(ainvoke_structured("原始 prompt", _Plan, node="failed-node"))
+
+    assert len(llm.prompts) == 2
+    stats = structured_output_stats()["failed-node"]
+    assert stats["failed"] == 1 and stats["failure_rate"] == 1.0
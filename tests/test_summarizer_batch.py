@@ -0,0 +1,110 @@
+"""批量摘要：逐条校验、缺失条目单独重做和失败兜底"""
+import asyncio
+import json
+
+import pytest
+
+import backend.utils.llm_client as llm_client
+from backend.config import config
+from backend.nodes.summarizer import _pack_batches, _parse_batch, _Prepared, summarize_results
+
+
+def _result(source_id: str, content: str = "") -> dict:
+    return {
+        "id": source_id,
+        "title": f"标题 {source_id}",
+        "url": f"https://example.com/{source_id}",
+        "query": "q",
+        "content": content or f"{source_id} 的内容",
+    }
+
+
+def _entry(source_id: str, relevance: float = 0.9) -> dict:
+    return {"source_id": source_id, "summary": f"{source_id} 摘要", "key_points": ["要点"], "relevance": relevance}
+
+
+class _RoutedLLM:
+    """批量 prompt 交给 batch(ids)，单独摘要 prompt 交给 single(prompt)；prompts 记录收到的 prompt"""
+
+    def __init__(self, batch, single):
+        self.batch = batch
+        self.single = single
+        self.prompts = []
+
+    def bind(self, **kwargs):
+        return self
+
+    async def ainvoke(self, prompt: str):
+        self.prompts.append(prompt)
+        ids = [line.split(":", 1)[1].strip() for line in prompt.splitlines() if line.startswith("### source_id:")]
+        content = self.batch(ids) if ids else self.single(prompt)
+        return type("Response", (), {"content": content, "usage_metadata": None})()
+
+
+@pytest.fixture
+def route(monkeypatch):
+    def install(batch, single) -> _RoutedLLM:
+        llm = _RoutedLLM(batch, single)
+        monkeypatch.setattr(llm_client, "get_llm", lambda temperature=0.3: llm)
+        return llm
+    return install
+
+
+def _summarize(results):
+    return asyncio.run(summarize_results(results, "主题", ["k"], asyncio.Semaphore(4), timeout=5))
+
+
+def test_parse_batch_validates_each_entry():
+    content = json.dumps({"sources": [
+        _entry("src_1"),
+        _entry("src_2", relevance=1.5),
+        {"source_id": "src_3", "summary": ""},
+        "not an object",
+        _entry("src_4"),
+    ]})
+    assert sorted(_parse_batch(content)) == ["src_1", "src_4"]
+    assert sorted(_parse_batch("前言 " + json.dumps([_entry("src_5")]))) == ["src_5"]
+    assert _parse_batch("没有 JSON") == {}
+
+
+def test_pack_batches_respects_item_and_length_limits(monkeypatch):
+    monkeypatch.setattr(config, "SUMMARIZER_BATCH_MAX_ITEMS", 2)
+    long_content = "长" * (config.SUMMARIZER_BATCH_MAX_CHARS + 1)
+    prepared = [_Prepared(_result(f"src_{i}"), None, []) for i in range(3)]
+    prepared.insert(1, _Prepared(_result("long", long_content), None, []))
+
+    batches = [[item.result["id"] for item in batch] for batch in _pack_batches(prepared)]
+
+    assert batches == [["long"], ["src_0", "src_1"], ["src_2"]]
+
+
+def test_missing_and_invalid_entries_are_summarized_individually(route):
+    single = json.dumps({"summary": "单独摘要", "key_points": [], "relevance": 0.8})
+    llm = route(
+        batch=lambda ids: json.dumps({"sources": [_entry("src_1"), _entry("src_2", relevance=2)]}),
+        single=lambda prompt: single,
+    )
+
+    outcomes = _summarize([_result("src_1"), _result("src_2"), _result("src_3")])
+
+    assert [processed["id"] for processed, _ in outcomes] == ["src_1", "src_2", "src_3"]
+    assert [processed["summary"] for processed, _ in outcomes] == ["src_1 摘要", "单独摘要", "单独摘要"]
+    assert outcomes[0][1]["batch_size"] == 3
+    # 一次批量调用 + 两个来源各一次单独调用
+    assert len(llm.prompts) == 3
+
+
+def test_failed_batch_falls_back_to_original_content(route):
+    def fail(_):
+        raise RuntimeError("boom")
+
+    llm = route(batch=fail, single=lambda prompt: "没有 JSON")
+
+    outcomes = _summarize([_result("src_1", "第一条原文"), _result("src_2", "第二条原文")])
+
+    for (processed, record), content in zip(outcomes, ["第一条原文", "第二条原文"]):
+        assert processed["summary"].startswith(content)
+        assert processed["relevance"] == 0.5
+        assert record["llm_output"] is None and record["kept"]
+    # 批量失败 → 每个来源单独摘要，解析失败再修复一次后兜底
+    assert len(llm.prompts) == 1 + 2 * 2
@@ -0,0 +1,84 @@
+"""Writer 上下文打包：token 预算、要点去重和引用编号一致性"""
+import asyncio
+import re
+
+import backend.nodes.writer as writer
+from backend.nodes.writer import format_sources_for_writer, pack_sources_for_writer
+from backend.utils import estimate_tokens
+
+
+def _source(source_id: str, relevance: float, points, summary: str = "") -> dict:
+    return {
+        "id": source_id,
+        "title": f"标题 {source_id}",
+        "url": f"https://example.com/{source_id}",
+        "query": "q",
+        "summary": summary or f"{source_id} 的摘要，" + "说明" * 20,
+        "key_points": list(points),
+        "relevance": relevance,
+    }
+
+
+def _cost(sources) -> int:
+    return sum(estimate_tokens(format_sources_for_writer([s], {s["id"]: 1})) for s in sources)
+
+
+_TOPICS = ["推理成本", "显存带宽", "量化精度", "批处理延迟", "缓存命中", "模型蒸馏", "稀疏注意力", "长上下文", "检索增强", "数据清洗"]
+
+
+def _points(offset: int):
+    return [f"{topic}方面的结论{offset}" for topic in _TOPICS[offset:offset + 5]]
+
+
+def _sources():
+    return [
+        _source("src_1", 0.6, _points(5)),
+        _source("src_2", 0.9, _points(0)),
+        # 第一条与 src_2 重复：新颖度 0.5，排序分数低于相关度更低的 src_1
+        _source("src_3", 0.7, [_points(0)[0], "第三个来源独有的发现"]),
+    ]
+
+
+def test_pack_ranks_sources_and_drops_duplicate_points():
+    packed = pack_sources_for_writer(_sources(), budget=100_000)
+
+    assert [s["id"] for s in packed] == ["src_2", "src_1", "src_3"]
+    assert packed[2]["key_points"] == ["第三个来源独有的发现"]
+    assert len(packed[0]["key_points"]) == 5
+
+
+def test_pack_fits_budget_by_trimming_points_then_sources():
+    sources = _sources()
+    full = _cost(pack_sources_for_writer(sources, budget=100_000))
+
+    for budget in (full - 1, full // 2, full // 4):
+        packed = pack_sources_for_writer(sources, budget)
+        assert _cost(packed) <= budget, budget
+
+    # 先裁剪要点，保留全部来源
+    trimmed = pack_sources_for_writer(sources, full - 1)
+    assert len(trimmed) == 3 and all(len(s["key_points"]) <= 3 for s in trimmed)
+
+    # 预算连一个来源都放不下时仍保留排名最高的来源
+    assert [s["id"] for s in pack_sources_for_writer(sources, budget=1)] == ["src_2"]
+
+
+def test_references_use_the_same_ids_as_the_prompt(monkeypatch):
+    prompts = []
+
+    async def fake_astream(prompt, **kwargs):
+        prompts.append(prompt)
+        yield "结论见 [1] 和 [2]。"
+
+    monkeypatch.setattr(writer, "astream_llm", fake_astream)
+    state = {"topic": "主题", "sources": _sources(), "all_findings": [], "session_id": "writer-ids"}
+
+    async def run():
+        return [chunk async for chunk in writer.writer_node_streaming(state)]
+
+    chunks = asyncio.run(run())
+
+    prompt_ids = dict(re.findall(r"^\[(\d+)\]\n标题: (.+)$", prompts[0], re.M))
+    reference_ids = dict(re.findall(r"^\[(\d+)\] (.+) - ", chunks[-1], re.M))
+    assert prompt_ids == reference_ids
+    assert prompt_ids == {"1": "标题 src_2", "2": "标题 src_1", "3": "标题 src_3"}